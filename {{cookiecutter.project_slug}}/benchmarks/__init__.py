@@ -0,0 +1,17 @@
+"""
+Benchmarks for hot paths of the API stack.
+
+`python -m benchmarks` runs the micro-benchmarks of `benchmarks.micro` with JSON output
+and baseline comparison, and `python -m benchmarks.load` drives the API in-process.
+The other modules compare alternative implementations and can be run on their own
+from the project root, e.g. `python -m benchmarks.renderers`.
+"""
+import os
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+
+    import django
+
+    django.setup()
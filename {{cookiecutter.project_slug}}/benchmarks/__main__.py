@@ -0,0 +1,55 @@
+"""
+Run the micro-benchmarks of `benchmarks.micro` and compare them with a baseline.
+
+Exits with status 1 when a benchmark got slower than the baseline by more than
+`--threshold`, so it can gate CI. Benchmarks marked as needing a database run against
+the configured one (in a rolled back transaction); skip them with `--no-database`.
+
+Usage:
+```
+python -m benchmarks --json baseline.json
+python -m benchmarks --baseline baseline.json --threshold 0.1
+python -m benchmarks serializer hashing --repeat 20
+```
+"""
+import argparse
+import sys
+
+from benchmarks import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("names", nargs="*", help="Only run benchmarks whose name starts with one of these.")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per benchmark; the median is compared.")
+    parser.add_argument("--json", metavar="PATH", help="Write the results to PATH.")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare with the results in PATH.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed slowdown against the baseline.")
+    parser.add_argument("--no-database", action="store_true", help="Skip the benchmarks that query the database.")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit.")
+    options = parser.parse_args()
+
+    setup_django()
+
+    from benchmarks import micro  # noqa: F401
+    from benchmarks.suite import BENCHMARKS, compare, read_results, report, run, write_results
+
+    if options.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    results = run(options.names, options.repeat, database=not options.no_database)
+    ratios, regressions = {}, []
+    if options.baseline:
+        ratios, regressions = compare(results, read_results(options.baseline), options.threshold)
+    report(results, ratios, regressions)
+    if options.json:
+        write_results(options.json, results)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than the baseline by more than {options.threshold:.0%}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
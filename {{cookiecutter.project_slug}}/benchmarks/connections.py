@@ -0,0 +1,100 @@
+"""
+Measure database connection churn with and without persistent connections.
+
+Runs the same request load (threads x requests against a view doing one query) once
+with `CONN_MAX_AGE = 0` and once with the configured `DATABASE_CONN_MAX_AGE`, and
+reports how many connections were opened and the resulting throughput. Requests go
+through `WSGIHandler` (not the test client, which keeps connections open), so
+connections are closed or kept exactly as they would be by a WSGI worker.
+
+Needs the configured database to be reachable.
+
+Usage:
+```
+python -m benchmarks.connections --threads 8 --requests 200
+```
+"""
+import argparse
+import threading
+import time
+
+from benchmarks import setup_django
+
+urlpatterns = []
+
+
+def ping(request):
+    from django.db import connection
+    from django.http import HttpResponse
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    return HttpResponse(b"ok")
+
+
+def run_load(conn_max_age, threads, requests):
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+    from django.test import RequestFactory
+    from django.test.utils import override_settings
+
+    connections["default"].settings_dict["CONN_MAX_AGE"] = conn_max_age
+    connections.close_all()
+
+    opened = []
+    lock = threading.Lock()
+
+    def on_connection_created(sender, connection, **kwargs):
+        with lock:
+            opened.append(connection.alias)
+
+    handler = WSGIHandler()
+    factory = RequestFactory()
+
+    def start_response(status, headers):
+        assert status.startswith("200"), status
+
+    def worker():
+        for _ in range(requests):
+            response = handler(factory.get("/ping/").environ, start_response)
+            response.close()
+        connections.close_all()
+
+    connection_created.connect(on_connection_created)
+    try:
+        with override_settings(ROOT_URLCONF=__name__, ALLOWED_HOSTS=["*"], DEBUG=False):
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            start = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - start
+    finally:
+        connection_created.disconnect(on_connection_created)
+    return len(opened), threads * requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent client threads.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per thread.")
+    options = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.urls import path
+
+    urlpatterns.append(path("ping/", ping))
+    configured = settings.DATABASES["default"]["CONN_MAX_AGE"] or 60
+
+    print(f"{'CONN_MAX_AGE':<14} {'connections':>12} {'requests/s':>11}")
+    for conn_max_age in (0, configured):
+        opened, throughput = run_load(conn_max_age, options.threads, options.requests)
+        print(f"{conn_max_age:<14} {opened:>12} {throughput:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Unsaved model instances shared by the benchmarks.
+"""
+import uuid
+from datetime import timedelta
+
+
+def build_media(rows):
+    from django.utils.timezone import now
+
+    from core.models import Media, MediaRendition
+
+    timestamp = now()
+    media = []
+    for i in range(rows):
+        item = Media(
+            title=f"Media {i}",
+            file_path=f"media/{uuid.uuid4().hex}.jpg",
+            media_type="image",
+            width=1920,
+            height=1080,
+            created=timestamp - timedelta(seconds=i),
+            modified=timestamp,
+        )
+        # Behave as if `renditions` was prefetched, so serializing never hits the database.
+        item._prefetched_objects_cache = {"renditions": MediaRendition.objects.none()}
+        media.append(item)
+    return media
+
+
+def build_sessions(rows):
+    from django.utils.timezone import now
+
+    from users.models.user import User, UserSession
+
+    timestamp = now()
+    user = User(pk=1)
+    return [
+        UserSession(
+            user=user,
+            ip_address="192.168.1.1",
+            agent={"browser": "Chrome", "os": "Linux", "version": "119.0"},
+            created=timestamp - timedelta(seconds=i),
+            modified=timestamp,
+        )
+        for i in range(rows)
+    ]
+
+
+def user_session_serializer_class(base):
+    """
+    Return a `fields = "__all__"` serializer for `UserSession` deriving from `base`.
+    """
+    from users.models.user import UserSession
+
+    class UserSessionSerializer(base):
+        class Meta:
+            model = UserSession
+            fields = "__all__"
+
+    return UserSessionSerializer
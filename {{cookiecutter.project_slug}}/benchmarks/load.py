@@ -0,0 +1,169 @@
+"""
+Load the API in-process with concurrent clients and report throughput and latency percentiles.
+
+Each thread sends GET requests to the given paths in turn for `--duration` seconds.
+Requests go through `WSGIHandler` with the full middleware stack, as a WSGI worker
+would serve them, without a network or server in between. With `--authenticate` a
+temporary user and session are created and every request carries their access token;
+both are deleted afterwards. Results use the format of `benchmarks.suite`, with the
+median latency compared against `--baseline`.
+
+Needs the configured database to be reachable.
+
+Usage:
+```
+python -m benchmarks.load /api/v1/media/uploads/ --authenticate --threads 8 --duration 10
+python -m benchmarks.load /api/v1/media/uploads/ --authenticate --baseline load.json --threshold 0.2
+```
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from benchmarks import setup_django
+
+
+@contextmanager
+def access_token():
+    """
+    Yield an access token for a temporary user and session, deleted on exit.
+    """
+    import uuid
+
+    from core.session_cache import session_cache
+    from core.tokens import SessionTokenObtainPairSerializer
+    from users.models.user import User, UserSession
+
+    user = User.objects.create_user(f"load-{uuid.uuid4().hex}@example.com", "password")
+    session = UserSession.objects.create(user=user, ip_address="127.0.0.1", agent={"browser": "benchmarks.load"})
+    try:
+        yield str(SessionTokenObtainPairSerializer.get_token(user, session.id).access_token)
+    finally:
+        session_cache.invalidate(session.id)
+        user.delete(soft=False)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_load(paths, threads, duration, warmup, headers):
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+    from django.test import RequestFactory
+
+    handler = WSGIHandler()
+    factory = RequestFactory()
+    latencies = {path: [] for path in paths}
+    errors = {path: 0 for path in paths}
+    lock = threading.Lock()
+
+    def request(path):
+        status = []
+        environ = factory.get(path, secure=True, **headers).environ
+        start = time.perf_counter()
+        response = handler(environ, lambda code, response_headers: status.append(code))
+        for _ in response:
+            pass
+        response.close()
+        return time.perf_counter() - start, status[0]
+
+    def worker():
+        own = {path: [] for path in paths}
+        failed = {path: 0 for path in paths}
+        for index in range(warmup):
+            request(paths[index % len(paths)])
+        deadline = time.perf_counter() + duration
+        index = 0
+        while time.perf_counter() < deadline:
+            path = paths[index % len(paths)]
+            elapsed, status = request(path)
+            own[path].append(elapsed)
+            if not status.startswith(("2", "3")):
+                failed[path] += 1
+            index += 1
+        connections.close_all()
+        with lock:
+            for path in paths:
+                latencies[path].extend(own[path])
+                errors[path] += failed[path]
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    results = {}
+    for path in paths:
+        values = sorted(latencies[path])
+        if not values:
+            continue
+        results[f"load GET {path}"] = {
+            "median": statistics.median(values),
+            "best": values[0],
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+            "requests": len(values),
+            "errors": errors[path],
+            "throughput": len(values) / duration,
+            "threads": threads,
+            "unit": "s",
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="Paths to request, e.g. /api/v1/media/uploads/.")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent client threads.")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load after the warmup.")
+    parser.add_argument("--warmup", type=int, default=20, help="Unrecorded requests per thread before timing.")
+    parser.add_argument("--authenticate", action="store_true", help="Send a token of a temporary user.")
+    parser.add_argument("--header", action="append", default=[], help='Extra request header, e.g. "Accept: */*".')
+    parser.add_argument("--json", metavar="PATH", help="Write the results to PATH.")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare with the results in PATH.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed median slowdown against the baseline.")
+    options = parser.parse_args()
+
+    setup_django()
+
+    from django.test.utils import override_settings
+
+    from benchmarks.suite import compare, format_time, read_results, write_results
+
+    headers = {}
+    for header in options.header:
+        name, _, value = header.partition(":")
+        headers["HTTP_" + name.strip().upper().replace("-", "_")] = value.strip()
+
+    with ExitStack() as stack:
+        stack.enter_context(override_settings(ALLOWED_HOSTS=["*"]))
+        if options.authenticate:
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {stack.enter_context(access_token())}"
+        results = run_load(options.paths, options.threads, options.duration, options.warmup, headers)
+
+    ratios, regressions = {}, []
+    if options.baseline:
+        ratios, regressions = compare(results, read_results(options.baseline), options.threshold)
+
+    print(f"{'path':<40} {'req/s':>8} {'median':>10} {'p95':>10} {'p99':>10} {'errors':>7} {'vs baseline':>12}")
+    for name, result in results.items():
+        change = f"{(ratios[name] - 1) * 100:+.1f}%" if name in ratios else ""
+        print(
+            f"{name.removeprefix('load GET '):<40} {result['throughput']:>8.0f} {format_time(result['median']):>10} "
+            f"{format_time(result['p95']):>10} {format_time(result['p99']):>10} {result['errors']:>7} {change:>12}"
+        )
+    if options.json:
+        write_results(options.json, results)
+    if regressions:
+        print(f"\n{len(regressions)} path(s) slower than the baseline by more than {options.threshold:.0%}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
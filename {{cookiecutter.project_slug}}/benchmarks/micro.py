@@ -0,0 +1,104 @@
+"""
+Micro-benchmarks of the request hot paths, registered with `benchmarks.suite`.
+
+Serializer and field benchmarks use unsaved instances; the authentication benchmarks
+create a user and session inside a transaction that is rolled back afterwards.
+"""
+from contextlib import contextmanager
+
+from benchmarks.fixtures import build_media
+from benchmarks.suite import benchmark
+
+ROWS = 100
+
+
+@contextmanager
+def rollback():
+    from django.db import transaction
+
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+@benchmark(f"serializer.media[{ROWS}]")
+def media_serializer():
+    from core.serializers import MediaSerializer
+
+    media = build_media(ROWS)
+    yield lambda: MediaSerializer(media, many=True).data
+
+
+@benchmark("field.unix_timestamp.to_representation")
+def unix_timestamp_to_representation():
+    from core.serializers import UnixTimestampField
+
+    field = UnixTimestampField()
+    yield lambda: field.to_representation(1700000000000)
+
+
+@benchmark("field.unix_timestamp.to_internal_value")
+def unix_timestamp_to_internal_value():
+    from core.serializers import UnixTimestampField
+
+    field = UnixTimestampField()
+    yield lambda: field.to_internal_value("1700000000000")
+
+
+@benchmark("hashing.make_password")
+def make_password():
+    from django.contrib.auth.hashers import make_password
+
+    yield lambda: make_password("correct horse battery staple")
+
+
+@benchmark("hashing.check_password")
+def check_password():
+    from django.contrib.auth.hashers import check_password, make_password
+
+    encoded = make_password("correct horse battery staple")
+    yield lambda: check_password("correct horse battery staple", encoded)
+
+
+@contextmanager
+def session_token():
+    """
+    Yield a validated access token for a new user and session, both rolled back afterwards.
+    """
+    import uuid
+
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from core.tokens import SessionTokenObtainPairSerializer
+    from users.models.user import User, UserSession
+
+    with rollback():
+        user = User.objects.create_user(f"benchmark-{uuid.uuid4().hex}@example.com", "password")
+        session = UserSession.objects.create(user=user, ip_address="127.0.0.1", agent={"browser": "benchmark"})
+        refresh = SessionTokenObtainPairSerializer.get_token(user, session.id)
+        yield AccessToken(str(refresh.access_token))
+
+
+@benchmark("auth.get_user.cached", database=True)
+def get_user_cached():
+    from core.authentications import CustomJWTAuthentication
+
+    authentication = CustomJWTAuthentication()
+    with session_token() as token:
+        authentication.get_user(token)
+        yield lambda: authentication.get_user(token)
+
+
+@benchmark("auth.get_user.uncached", database=True)
+def get_user_uncached():
+    from core.authentications import CustomJWTAuthentication
+    from core.session_cache import session_cache
+
+    authentication = CustomJWTAuthentication()
+
+    def get_user(token):
+        session_cache.invalidate(token[authentication.claim_id])
+        return authentication.get_user(token)
+
+    with session_token() as token:
+        yield lambda: get_user(token)
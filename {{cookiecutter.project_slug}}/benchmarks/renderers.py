@@ -0,0 +1,80 @@
+"""
+Compare `JSONRenderer`/`JSONParser` with `core.renderers.ORJSONRenderer`/`core.parsers.ORJSONParser`.
+
+Renders a page of serialized `Media` and `UserSession` rows (the strings produced by
+the serializers) and the same rows as raw `.values()` dicts (UUID and datetime objects),
+then parses the rendered JSON back.
+
+Usage:
+```
+python -m benchmarks.renderers --rows 500 --repeat 20
+```
+"""
+import argparse
+import io
+import timeit
+
+from benchmarks import setup_django
+from benchmarks.fixtures import build_media, build_sessions, user_session_serializer_class
+
+
+def build_payloads(rows):
+    from rest_framework.serializers import ModelSerializer
+
+    from core.serializers import MediaSerializer
+
+    media, sessions = build_media(rows), build_sessions(rows)
+    raw_fields = ["id", "created", "modified", "title", "media_type", "width", "height"]
+    return {
+        "Media (serialized)": MediaSerializer(media, many=True).data,
+        "UserSession (serialized)": user_session_serializer_class(ModelSerializer)(sessions, many=True).data,
+        "Media (raw values)": [{field: getattr(item, field) for field in raw_fields} for item in media],
+        "UserSession (raw values)": [
+            {"id": item.id, "user": item.user_id, "agent": item.agent, "created": item.created, "expire_at": None}
+            for item in sessions
+        ],
+    }
+
+
+def run(rows, repeat):
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from core.parsers import ORJSONParser
+    from core.renderers import ORJSONRenderer
+
+    results = []
+    for name, payload in build_payloads(rows).items():
+        body = JSONRenderer().render(payload)
+        for label, renderer, parser in (
+            ("json", JSONRenderer(), JSONParser()),
+            ("orjson", ORJSONRenderer(), ORJSONParser()),
+        ):
+            render = min(timeit.repeat(lambda: renderer.render(payload), number=1, repeat=repeat))
+            parse = min(timeit.repeat(lambda: parser.parse(io.BytesIO(body)), number=1, repeat=repeat))
+            results.append((name, label, render, parse))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500, help="Rows per payload.")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per case; the best one is reported.")
+    options = parser.parse_args()
+
+    setup_django()
+    results = run(options.rows, options.repeat)
+
+    print(f"{'payload':<26} {'engine':<8} {'render ms':>10} {'parse ms':>10}")
+    baseline = {}
+    for name, label, render, parse in results:
+        speedup = ""
+        if label == "json":
+            baseline[name] = render
+        else:
+            speedup = f"  x{baseline[name] / render:.1f} render"
+        print(f"{name:<26} {label:<8} {render * 1000:>10.2f} {parse * 1000:>10.2f}{speedup}")
+
+
+if __name__ == "__main__":
+    main()
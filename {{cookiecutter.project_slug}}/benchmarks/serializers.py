@@ -0,0 +1,72 @@
+"""
+Compare DRF's `ModelSerializer` with `core.serializers.BaseModelSerializer`.
+
+Measures building a serializer (field introspection) and serializing a page of
+`Media` and `UserSession` rows with `many=True`.
+
+Usage:
+```
+python -m benchmarks.serializers --rows 2000 --repeat 10
+```
+"""
+import argparse
+import timeit
+
+from benchmarks import setup_django
+from benchmarks.fixtures import build_media, build_sessions, user_session_serializer_class
+
+
+def media_serializer_class(base):
+    from core.models import Media
+
+    class MediaSerializer(base):
+        class Meta:
+            model = Media
+            fields = "__all__"
+
+    return MediaSerializer
+
+
+def run(rows, repeat):
+    from rest_framework.serializers import ModelSerializer
+
+    from core.serializers import BaseModelSerializer
+
+    cases = {
+        "Media": (media_serializer_class, build_media(rows)),
+        "UserSession": (user_session_serializer_class, build_sessions(rows)),
+    }
+    results = []
+    for name, (make_class, instances) in cases.items():
+        for label, base in (("ModelSerializer", ModelSerializer), ("BaseModelSerializer", BaseModelSerializer)):
+            serializer_class = make_class(base)
+            build = min(timeit.repeat(lambda: serializer_class().fields, number=100, repeat=repeat)) / 100
+            serialize = min(
+                timeit.repeat(lambda: serializer_class(instances, many=True).data, number=1, repeat=repeat)
+            )
+            results.append((name, label, build, serialize))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000, help="Rows per payload.")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per case; the best one is reported.")
+    options = parser.parse_args()
+
+    setup_django()
+    results = run(options.rows, options.repeat)
+
+    print(f"{'model':<12} {'serializer':<20} {'build us':>9} {'serialize ms':>13}")
+    baseline = {}
+    for name, label, build, serialize in results:
+        speedup = ""
+        if label == "ModelSerializer":
+            baseline[name] = (build, serialize)
+        else:
+            speedup = f"  x{baseline[name][0] / build:.1f} build, x{baseline[name][1] / serialize:.1f} serialize"
+        print(f"{name:<12} {label:<20} {build * 1e6:>9.1f} {serialize * 1000:>13.2f}{speedup}")
+
+
+if __name__ == "__main__":
+    main()
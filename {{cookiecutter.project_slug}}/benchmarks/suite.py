@@ -0,0 +1,123 @@
+"""
+Registry, timing and result files shared by the benchmarks.
+
+Results are written as JSON:
+```
+{
+    "environment": {"python": "3.10.13", "django": "4.2.7", "database": "postgresql", ...},
+    "results": {
+        "serializer.media": {"median": 0.0041, "best": 0.0039, "runs": 20, "number": 5, "unit": "s"},
+        ...
+    }
+}
+```
+`median` is the time of one call; `compare` flags a benchmark whose median grew by
+more than the threshold against a baseline file written by an earlier run.
+"""
+import json
+import platform
+import statistics
+import timeit
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+BENCHMARKS = {}
+
+
+def benchmark(name, database=False):
+    """
+    Register a benchmark; the decorated generator sets up, yields the callable to time and cleans up.
+
+    Example:
+    ```
+    @benchmark("hashing.check_password")
+    def check_password():
+        encoded = make_password("secret")
+        yield lambda: django_check_password("secret", encoded)
+    ```
+    """
+
+    def decorator(func):
+        BENCHMARKS[name] = {"setup": contextmanager(func), "database": database}
+        return func
+
+    return decorator
+
+
+def measure(func, repeat, min_time=0.2):
+    """
+    Time `func` in `repeat` runs of as many calls as fill `min_time` seconds; return per-call figures.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time and number < 1_000_000:
+        number *= 2
+    times = [elapsed / number for elapsed in timer.repeat(repeat=repeat, number=number)]
+    return {"median": statistics.median(times), "best": min(times), "runs": repeat, "number": number, "unit": "s"}
+
+
+def run(names=None, repeat=10, database=True):
+    """
+    Run the registered benchmarks matching `names` (prefixes), skipping those needing a database unless `database`.
+    """
+    results = {}
+    for name, entry in BENCHMARKS.items():
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        if entry["database"] and not database:
+            continue
+        with entry["setup"]() as func:
+            results[name] = measure(func, repeat)
+    return results
+
+
+def environment():
+    import django
+    from django.db import connection
+
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "time": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def write_results(path, results):
+    with open(path, "w") as file:
+        json.dump({"environment": environment(), "results": results}, file, indent=2)
+
+
+def read_results(path):
+    with open(path) as file:
+        return json.load(file)["results"]
+
+
+def compare(results, baseline, threshold):
+    """
+    Return `{name: ratio}` of current to baseline median, and the names slower by more than `threshold`.
+    """
+    ratios = {
+        name: result["median"] / baseline[name]["median"] for name, result in results.items() if name in baseline
+    }
+    regressions = [name for name, ratio in ratios.items() if ratio > 1 + threshold]
+    return ratios, regressions
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def report(results, ratios=None, regressions=()):
+    ratios = ratios or {}
+    print(f"{'benchmark':<40} {'median':>12} {'best':>12} {'vs baseline':>12}")
+    for name, result in results.items():
+        change = ""
+        if name in ratios:
+            change = f"{(ratios[name] - 1) * 100:+.1f}%" + (" !" if name in regressions else "")
+        print(f"{name:<40} {format_time(result['median']):>12} {format_time(result['best']):>12} {change:>12}")
@@ -6,7 +6,7 @@ from django.views.generic.base import RedirectView
 DEFAULT_VERSION = "v1"
 
 urlpatterns = [
-    path("v1/", include("CoinQuant.apis.v1")),
+    path("v1/", include("config.apis.v1")),
     # the 'api-root' from django rest-frameworks default router
     # http://www.django-rest-framework.org/api-guide/routers/#defaultrouter
     re_path(
@@ -3,4 +3,5 @@ from django.urls import include, path
 app_name = "v1"
 
 urlpatterns = [
+    path("", include("core.urls")),
 ]
@@ -0,0 +1,119 @@
+"""
+Gunicorn configuration, used with `gunicorn -c config/gunicorn.py`.
+
+Every value can be overridden from the environment (or `.env`):
+
+- `GUNICORN_BIND`: Address to listen on, default `0.0.0.0:8000`.
+- `GUNICORN_WORKERS`: Worker processes, default `2 * CPUs + 1`.
+- `GUNICORN_THREADS`: Threads per worker for the `gthread` worker class, default 4.
+- `GUNICORN_WORKER_CLASS`: {% if cookiecutter.use_async == "y" %}Default `uvicorn.workers.UvicornWorker`, serving `config.asgi`;
+  set `gthread` to serve `config.wsgi` with threads instead.{% else %}Default `gthread`.{% endif %}
+- `GUNICORN_MAX_REQUESTS`, `GUNICORN_MAX_REQUESTS_JITTER`: Restart a worker after this many
+  requests (plus up to the jitter, so workers do not restart together), default 1000 and 100.
+- `GUNICORN_MAX_WORKER_MEMORY`: Restart a worker once its resident memory exceeds this
+  many MiB, checked every `GUNICORN_MEMORY_CHECK_INTERVAL` seconds; 0 disables the check.
+- `GUNICORN_TIMEOUT`, `GUNICORN_GRACEFUL_TIMEOUT`, `GUNICORN_KEEPALIVE`: Seconds.
+- `GUNICORN_PRELOAD`: Load the application in the master before forking, default True.
+- `GUNICORN_RELOAD`: Restart workers on code changes, for development only.
+
+With preload the master imports Django and the project once; `when_ready` then freezes
+the objects created so far out of the garbage collector, so workers keep sharing those
+memory pages copy-on-write instead of touching (and copying) them on every collection.
+"""
+import gc
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+# Gunicorn reads every module-level name as a setting, and `config` is one of them.
+from decouple import config as env
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+{% if cookiecutter.use_async == "y" -%}
+worker_class = env("GUNICORN_WORKER_CLASS", default="uvicorn.workers.UvicornWorker")
+wsgi_app = "config.wsgi:application" if worker_class in ("sync", "gthread") else "config.asgi:application"
+{%- else -%}
+worker_class = env("GUNICORN_WORKER_CLASS", default="gthread")
+wsgi_app = "config.wsgi:application"
+{%- endif %}
+
+bind = env("GUNICORN_BIND", default="0.0.0.0:8000")
+workers = env("GUNICORN_WORKERS", default=multiprocessing.cpu_count() * 2 + 1, cast=int)
+threads = env("GUNICORN_THREADS", default=4, cast=int)
+
+max_requests = env("GUNICORN_MAX_REQUESTS", default=1000, cast=int)
+max_requests_jitter = env("GUNICORN_MAX_REQUESTS_JITTER", default=100, cast=int)
+max_worker_memory = env("GUNICORN_MAX_WORKER_MEMORY", default=512, cast=int)
+memory_check_interval = env("GUNICORN_MEMORY_CHECK_INTERVAL", default=10, cast=int)
+
+timeout = env("GUNICORN_TIMEOUT", default=30, cast=int)
+graceful_timeout = env("GUNICORN_GRACEFUL_TIMEOUT", default=30, cast=int)
+keepalive = env("GUNICORN_KEEPALIVE", default=5, cast=int)
+
+preload_app = env("GUNICORN_PRELOAD", default=True, cast=bool)
+reload = env("GUNICORN_RELOAD", default=False, cast=bool)
+
+# Heartbeat files in memory; a worker blocked on a slow overlay filesystem would be killed as hung.
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+forwarded_allow_ips = env("GUNICORN_FORWARDED_ALLOW_IPS", default="*")
+accesslog = env("GUNICORN_ACCESS_LOG", default="-")
+errorlog = "-"
+
+
+def restore_logging(log, cfg):
+    """
+    Set gunicorn's loggers up again after loading the application applied the LOGGING setting,
+    which disables and resets every logger it does not name.
+    """
+    log.setup(cfg)
+    log.error_log.disabled = log.access_log.disabled = False
+
+
+def on_starting(server):
+    if preload_app:
+        restore_logging(server.log, server.cfg)
+
+
+def when_ready(server):
+    """
+    Prepare the preloaded master for forking workers.
+    """
+    if not preload_app:
+        return
+    from django.db import connections
+
+    # Sockets opened while loading must not be shared by the workers.
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
+
+
+def resident_memory():
+    """
+    Return the resident memory of the current process in MiB.
+    """
+    with open("/proc/self/statm") as statm:
+        pages = int(statm.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def watch_memory(worker):
+    while True:
+        time.sleep(memory_check_interval)
+        memory = resident_memory()
+        if memory > max_worker_memory:
+            worker.log.info("Worker using %.0f MiB (limit %s MiB), restarting", memory, max_worker_memory)
+            # A graceful shutdown: in-flight requests finish and the master starts a replacement.
+            os.kill(os.getpid(), signal.SIGTERM)
+            return
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        restore_logging(worker.log, worker.cfg)
+    if max_worker_memory and os.path.exists("/proc/self/statm"):
+        threading.Thread(target=watch_memory, args=(worker,), name="memory-watchdog", daemon=True).start()
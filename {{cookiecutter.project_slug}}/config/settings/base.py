@@ -1,4 +1,6 @@
 import json
+import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
@@ -78,7 +80,10 @@ AUTH_USER_MODEL = "users.User"
 # ==============================================================================
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.QueryBudgetMiddleware",
+    "core.middleware.ReplicaPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     {% if cookiecutter.use_drf == "y" %}
     "corsheaders.middleware.CorsMiddleware",
@@ -90,6 +95,29 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Request metrics, see core.metrics. Worker processes share them through snapshot files in DIR, written
+# every FLUSH_INTERVAL seconds; leave DIR empty to report the serving process only. /admin/metrics/ serves
+# them in the Prometheus text format to staff users and to scrapers sending "Authorization: Bearer <TOKEN>".
+METRICS = {
+    "ENABLED": config("METRICS", default=True, cast=bool),
+    "DIR": config("METRICS_DIR", default=str(Path(tempfile.gettempdir()) / "{{ cookiecutter.project_slug }}_metrics")),
+    "FLUSH_INTERVAL": config("METRICS_FLUSH_INTERVAL", default=5.0, cast=float),
+    "TOKEN": config("METRICS_TOKEN", default=""),
+}
+
+# Per-request query budget, see core.middleware.QueryBudgetMiddleware; views override it with
+# core.queries.query_budget. MAX_TIME is in milliseconds and MAX_DUPLICATES is how often one SQL statement
+# may repeat before it is reported as an N+1. Exceeding the budget logs a warning, or raises with RAISE.
+# SERVER_TIMING adds the totals to the Server-Timing header, which exposes them to clients.
+QUERY_BUDGET = {
+    "ENABLED": config("QUERY_BUDGET", default=True, cast=bool),
+    "MAX_QUERIES": config("QUERY_BUDGET_MAX_QUERIES", default=30, cast=int),
+    "MAX_TIME": config("QUERY_BUDGET_MAX_TIME", default=500, cast=int),
+    "MAX_DUPLICATES": config("QUERY_BUDGET_MAX_DUPLICATES", default=5, cast=int),
+    "RAISE": False,
+    "SERVER_TIMING": config("QUERY_BUDGET_SERVER_TIMING", default=DEBUG, cast=bool),
+}
+
 {% if cookiecutter.use_simple_jwt == "y" %}
 # ==============================================================================
 # SESSION SETTINGS
@@ -98,6 +126,76 @@ SESSION_COOKIE_AGE = 24 * 60 * 60  # 1 day in seconds
 REMEMBER_ME_SESSION_COOKIE_AGE = 30 * 24 * 60 * 60  # 30 day in seconds
 {% endif %}
 
+# ==============================================================================
+# CACHE SETTINGS
+# ==============================================================================
+{% if cookiecutter.use_redis == "y" %}
+# Redis through core.cache_backends.FallbackRedisCache: every process keeps a pool of up to MAX_CONNECTIONS
+# connections, and serves cache misses for FALLBACK_RETRY_AFTER seconds whenever Redis is unreachable.
+CACHES = {
+    "default": {
+        "BACKEND": "core.cache_backends.FallbackRedisCache",
+        "LOCATION": config(
+            "REDIS_CACHE_URL",
+            default="redis://{}:{}/1".format(
+                config("REDIS_HOST", default="localhost"), config("REDIS_PORT", default=6379, cast=int)
+            ),
+        ),
+        "TIMEOUT": config("CACHE_TIMEOUT", default=300, cast=int),
+        "KEY_PREFIX": config("CACHE_KEY_PREFIX", default="{{ cookiecutter.project_slug }}"),
+        "OPTIONS": {
+            "max_connections": config("REDIS_CACHE_MAX_CONNECTIONS", default=50, cast=int),
+            "socket_connect_timeout": config("REDIS_CACHE_CONNECT_TIMEOUT", default=1.0, cast=float),
+            "socket_timeout": config("REDIS_CACHE_SOCKET_TIMEOUT", default=1.0, cast=float),
+            "FALLBACK_RETRY_AFTER": config("REDIS_CACHE_FALLBACK_RETRY_AFTER", default=30, cast=int),
+        },
+    }
+}
+{% else %}
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "TIMEOUT": config("CACHE_TIMEOUT", default=300, cast=int),
+    }
+}
+{% endif %}
+
+# ==============================================================================
+# USER SESSION CACHE SETTINGS
+# ==============================================================================
+# Used by core.session_cache to resolve JWT session ids without hitting the database on every request.
+# CACHE_ALIAS enables the shared tier (e.g. a Redis entry in CACHES), which every process sees invalidations of.
+# A revocation only clears the local tier of the process that made it, so other processes keep serving a revoked
+# session for up to LOCAL_TTL seconds; the local tier is therefore off unless LOCAL_TTL is raised.
+USER_SESSION_CACHE = {
+    "MAXSIZE": config("USER_SESSION_CACHE_MAXSIZE", default=10000, cast=int),
+    "LOCAL_TTL": config("USER_SESSION_CACHE_LOCAL_TTL", default=0, cast=int),
+    "CACHE_ALIAS": config("USER_SESSION_CACHE_ALIAS", default=""),
+    "TTL": config("USER_SESSION_CACHE_TTL", default=60, cast=int),
+}
+
+# Revoked sessions are kept for RETENTION and then hard-deleted by users.jobs.purge_expired_sessions,
+# BATCH_SIZE rows per DELETE statement, every INTERVAL.
+USER_SESSION_PURGE = {
+    "RETENTION": timedelta(days=config("USER_SESSION_PURGE_RETENTION_DAYS", default=7, cast=int)),
+    "BATCH_SIZE": config("USER_SESSION_PURGE_BATCH_SIZE", default=5000, cast=int),
+    "MAX_BATCHES": config("USER_SESSION_PURGE_MAX_BATCHES", default=1000, cast=int),
+    "INTERVAL": timedelta(minutes=config("USER_SESSION_PURGE_INTERVAL_MINUTES", default=60, cast=int)),
+}
+
+# Opt-in PostgreSQL range partitioning of UserSession by `created` month, see users.partitions.
+# The users 0002 migration converts the table when this is enabled as it runs; enable it later and convert
+# once with `manage.py user_session_partitions --convert`. The purge job then keeps MONTHS_AHEAD partitions
+# ready and detaches (or drops, with DROP_EXPIRED) months older than RETENTION_MONTHS. Every retained month
+# adds a partition that session lookups by id alone probe, see users.partitions.
+# RETENTION_MONTHS must stay above the refresh token lifetime, as whole months are removed at once.
+USER_SESSION_PARTITIONING = {
+    "ENABLED": config("USER_SESSION_PARTITIONING", default=False, cast=bool),
+    "MONTHS_AHEAD": config("USER_SESSION_PARTITION_MONTHS_AHEAD", default=3, cast=int),
+    "RETENTION_MONTHS": config("USER_SESSION_PARTITION_RETENTION_MONTHS", default=3, cast=int),
+    "DROP_EXPIRED": config("USER_SESSION_PARTITION_DROP_EXPIRED", default=False, cast=bool),
+}
+
 # ==============================================================================
 # TEMPLATES SETTINGS
 # ==============================================================================
@@ -123,6 +221,15 @@ TEMPLATES = [
 # DATABASES SETTINGS
 # ==============================================================================
 
+# Connections are kept open for DATABASE_CONN_MAX_AGE seconds and checked before reuse, so a request
+# only pays for connecting when a worker starts or the server went away. Each worker thread holds one
+# connection; size max_connections (or the PgBouncer pool) for processes x threads.
+# Under ASGI, config/asgi.py defaults DATABASE_CONN_MAX_AGE to 0, as async requests do not run on a
+# fixed thread; pool through PgBouncer instead. With DATABASE_PGBOUNCER, point DATABASE_HOST at a
+# PgBouncer in transaction pooling mode (the "pgbouncer" compose service); server-side cursors are
+# then disabled, as they cannot outlive a transaction.
+DATABASE_PGBOUNCER = config("DATABASE_PGBOUNCER", default=False, cast=bool)
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -131,9 +238,50 @@ DATABASES = {
         "PASSWORD": config("DATABASE_PASSWORD"),
         "HOST": config("DATABASE_HOST"),
         "PORT": config("DATABASE_PORT"),
+        "CONN_MAX_AGE": config("DATABASE_CONN_MAX_AGE", default=60, cast=int),
+        "CONN_HEALTH_CHECKS": config("DATABASE_CONN_HEALTH_CHECKS", default=True, cast=bool),
+        "DISABLE_SERVER_SIDE_CURSORS": DATABASE_PGBOUNCER,
+        "OPTIONS": {
+            "connect_timeout": config("DATABASE_CONNECT_TIMEOUT", default=10, cast=int),
+        },
     }
 }
 
+# Read replicas as a comma separated list of host[:port], see core.routers.ReplicaRouter. They share the
+# credentials of the primary and become the "replica_<n>" aliases. Reads fall back to the primary inside
+# transactions, after a write in the same request, for PIN_SECONDS after a client wrote (PIN_COOKIE, or for
+# clients without cookies their Authorization header in the PIN_CACHE_ALIAS cache), and while a replica lags by
+# more than MAX_LAG seconds (checked every LAG_CHECK_INTERVAL seconds). JWT session lookups always use the primary.
+DATABASE_REPLICA_HOSTS = config("DATABASE_REPLICA_HOSTS", default="", cast=Csv())
+
+for index, replica_host in enumerate(DATABASE_REPLICA_HOSTS):
+    replica_hostname, _, replica_port = replica_host.partition(":")
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "HOST": replica_hostname,
+        "PORT": replica_port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"] if DATABASE_REPLICA_HOSTS else []
+
+DATABASE_REPLICA = {
+    "MAX_LAG": config("DATABASE_REPLICA_MAX_LAG", default=2.0, cast=float),
+    "LAG_CHECK_INTERVAL": config("DATABASE_REPLICA_LAG_CHECK_INTERVAL", default=5.0, cast=float),
+    "PIN_SECONDS": config("DATABASE_REPLICA_PIN_SECONDS", default=5, cast=int),
+    "PIN_COOKIE": "db_pin",
+    "PIN_CACHE_ALIAS": "default",
+}
+
+# Soft-deleted rows (see core.models.SoftDeleteModel) are kept for RETENTION and then moved to ArchivedRow by
+# core.archive, BATCH_SIZE rows per transaction and at most MAX_BATCHES per model and run, every INTERVAL.
+ARCHIVE_REMOVED = {
+    "RETENTION": timedelta(days=config("ARCHIVE_REMOVED_RETENTION_DAYS", default=30, cast=int)),
+    "BATCH_SIZE": config("ARCHIVE_REMOVED_BATCH_SIZE", default=500, cast=int),
+    "MAX_BATCHES": config("ARCHIVE_REMOVED_MAX_BATCHES", default=200, cast=int),
+    "INTERVAL": timedelta(hours=config("ARCHIVE_REMOVED_INTERVAL_HOURS", default=24, cast=int)),
+}
+
 
 # ==============================================================================
 # AUTHENTICATION AND AUTHORIZATION SETTINGS
@@ -158,6 +306,20 @@ AUTHENTICATION_BACKENDS = [
     "django.contrib.auth.backends.ModelBackend",
 ]
 
+# Passwords are hashed and checked on a pool of WORKERS processes in every server process, see users.hashing;
+# 0 hashes inline. A host thus runs GUNICORN_WORKERS * WORKERS hashing processes, and the default shares the
+# CPUs among the server processes (at least one each). Up to MAX_PENDING more hashes wait for a worker, each
+# for at most QUEUE_TIMEOUT seconds, before the request fails with 503. Outdated hashes are upgraded in the
+# background after a sign-in.
+cpu_count = os.cpu_count() or 1
+server_processes = config("GUNICORN_WORKERS", default=cpu_count * 2 + 1, cast=int)
+PASSWORD_HASHING = {
+    "WORKERS": config("PASSWORD_HASHING_WORKERS", default=max(1, cpu_count // server_processes), cast=int),
+    "MAX_PENDING": config("PASSWORD_HASHING_MAX_PENDING", default=8, cast=int),
+    "QUEUE_TIMEOUT": config("PASSWORD_HASHING_QUEUE_TIMEOUT", default=5.0, cast=float),
+    "START_METHOD": config("PASSWORD_HASHING_START_METHOD", default="forkserver"),
+}
+
 # ==============================================================================
 # I18N AND L10N SETTINGS
 # ==============================================================================
@@ -197,6 +359,42 @@ MEDIA_URL = "/media/"
 
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Resumable chunked uploads, see core.uploads. Chunks are streamed into STAGING_DIR through a BUFFER_SIZE
+# buffer; keep STAGING_DIR on the same filesystem as MEDIA_ROOT so completed files are renamed, not copied.
+MEDIA_UPLOAD = {
+    "STAGING_DIR": config("MEDIA_UPLOAD_STAGING_DIR", default=str(MEDIA_ROOT / ".uploads")),
+    "BUFFER_SIZE": config("MEDIA_UPLOAD_BUFFER_SIZE", default=64 * 1024, cast=int),
+    "MAX_CHUNK_SIZE": config("MEDIA_UPLOAD_MAX_CHUNK_SIZE", default=16 * 1024 * 1024, cast=int),
+    "MAX_SIZE": config("MEDIA_UPLOAD_MAX_SIZE", default=5 * 1024 * 1024 * 1024, cast=int),
+}
+
+# Store media content-addressed, see core.blobs. Identical files are kept once under blobs/ and shared by
+# reference-counted MediaBlob rows; the file is deleted with the last Media row pointing at it.
+MEDIA_CONTENT_ADDRESSED = config("MEDIA_CONTENT_ADDRESSED", default=False, cast=bool)
+
+{% if cookiecutter.use_django_rq == "y" %}
+# Background processing of saved media, see core.jobs.process_media. Image renditions fit into SIZES
+# (width, height) and are rendered in a pool of PROCESSES processes started for each job; 0 renders inline.
+MEDIA_RENDITIONS = {
+    "ENABLED": config("MEDIA_RENDITIONS", default=True, cast=bool),
+    "QUEUE": config("MEDIA_RENDITIONS_QUEUE", default="default"),
+    "PROCESSES": config("MEDIA_RENDITIONS_PROCESSES", default=2, cast=int),
+    "FORMAT": "WEBP",
+    "QUALITY": 80,
+    "SIZES": {
+        "thumbnail": (160, 160),
+        "small": (480, 480),
+        "medium": (1024, 1024),
+    },
+}
+{% endif %}
+
+# ==============================================================================
+# EMAIL SETTINGS
+# ==============================================================================
+
+# Seconds before an SMTP connect/send gives up; without it a hung mail server blocks the sender forever.
+EMAIL_TIMEOUT = config("EMAIL_TIMEOUT", default=10, cast=int)
 
 # ==============================================================================
 # LOGGING SETTINGS
@@ -204,6 +402,16 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 DEFAULT_EXCEPTION_REPORTER_FILTER = "django.views.debug.SafeExceptionReporterFilter"
 SERVER_KEY = "django.server"
+
+# Loggers only write to core.log.QueueHandlers (named to sort after their targets); per-process listener
+# threads run the file and console handlers and, on a listener of their own, the email handler, so neither a
+# request nor the log files ever wait on SMTP. Files are written per running process, in slots reused by
+# recycled workers (LOG_DIR/app.<slot>.log), as LOG_FORMAT "verbose" or "json", and admin emails are
+# throttled to LOG_MAIL_ADMINS_RATE per minute.
+LOG_DIR = config("LOG_DIR", default=str(BASE_DIR / "logs"))
+LOG_FORMAT = config("LOG_FORMAT", default="verbose")
+LOG_QUEUE_SIZE = config("LOG_QUEUE_SIZE", default=10000, cast=int)
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": True,
@@ -214,6 +422,7 @@ LOGGING = {
         },
         "verbose": {"format": "%(levelname)s %(asctime)s %(module)s %(process)d %(thread)d %(message)s"},
         "simple": {"format": "%(levelname)s %(message)s"},
+        "json": {"()": "core.log.JSONFormatter"},
     },
     "filters": {
         "require_debug_true": {
@@ -224,7 +433,7 @@ LOGGING = {
         },
     },
     "handlers": {
-        "server": {
+        "django_server": {
             "level": "INFO",
             "class": "logging.StreamHandler",
             "formatter": "django.server",
@@ -237,49 +446,70 @@ LOGGING = {
         },
         "app_file": {
             "level": "INFO",
-            "class": "logging.handlers.RotatingFileHandler",
-            "filename": "./app.log",
+            "class": "core.log.ProcessRotatingFileHandler",
+            "filename": str(Path(LOG_DIR) / "app.{slot}.log"),
             "maxBytes": 1024 * 1024 * 5,  # 5 MB
             "backupCount": 5,
-            "formatter": "verbose",
+            "formatter": LOG_FORMAT,
         },
         "error_file": {
             "level": "ERROR",
-            "class": "logging.handlers.RotatingFileHandler",
-            "filename": "./error.log",
+            "class": "core.log.ProcessRotatingFileHandler",
+            "filename": str(Path(LOG_DIR) / "error.{slot}.log"),
             "maxBytes": 1024 * 1024 * 5,  # 5 MB
             "backupCount": 5,
-            "formatter": "verbose",
+            "formatter": LOG_FORMAT,
             "filters": ["require_debug_false"],
         },
         "mail_admins": {
             "level": "ERROR",
-            "class": "django.utils.log.AdminEmailHandler",
+            "()": "core.log.ThrottledAdminEmailHandler",
+            "rate": config("LOG_MAIL_ADMINS_RATE", default=10, cast=int),
+            "per": 60,
             "include_html": True,
             "formatter": "verbose",
             "filters": ["require_debug_false"],
         },
+        "queue": {
+            "()": "core.log.QueueHandler",
+            "handlers": ["cfg://handlers.console", "cfg://handlers.app_file", "cfg://handlers.error_file"],
+            "queue_size": LOG_QUEUE_SIZE,
+        },
+        "queue_server": {
+            "()": "core.log.QueueHandler",
+            "handlers": ["cfg://handlers.django_server", "cfg://handlers.app_file"],
+            "queue_size": LOG_QUEUE_SIZE,
+        },
+        "queue_mail_admins": {
+            "()": "core.log.QueueHandler",
+            "handlers": ["cfg://handlers.mail_admins"],
+            "queue_size": LOG_QUEUE_SIZE,
+            "listener": "mail",
+        },
+    },
+    "root": {
+        "handlers": ["queue"],
+        "level": "WARNING",
     },
     "loggers": {
         "django": {
-            "handlers": ["app_file", "error_file"],
+            "handlers": ["queue"],
             "level": "INFO",
             "propagate": False,
         },
         SERVER_KEY: {
-            "handlers": [
-                "server",
-                "app_file",
-            ],
+            "handlers": ["queue_server"],
             "level": "INFO",
             "propagate": False,
         },
         "django.request": {
-            "handlers": ["mail_admins", "error_file"],
+            # Also written to the files through "django".
+            "handlers": ["queue_mail_admins"],
             "level": "ERROR",
             "propagate": True,
         },
-        "django.db.backends": {"handlers": ["app_file"], "level": "INFO"},
+        # Per-request query counts come from core.middleware.QueryBudgetMiddleware; keep SQL logging off.
+        "django.db.backends": {"level": "INFO"},
     },
 }
 
@@ -288,15 +518,24 @@ LOGGING = {
 # ==============================================================================
 {% if cookiecutter.use_drf == "y" %}
 # Django Rest Framework
+# The browsable API renders HTML forms (running extra queries for them) for every browser request.
+# Production disables it unless API_BROWSABLE is set.
+API_BROWSABLE = config("API_BROWSABLE", default=True, cast=bool)
+
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": config("DJANGO_PAGINATION_LIMIT", default=10, cast=int),
     "DEFAULT_RENDERER_CLASSES": (
-        "rest_framework.renderers.JSONRenderer",
-        "rest_framework.renderers.BrowsableAPIRenderer",
+        "core.renderers.ORJSONRenderer",
+        *(("rest_framework.renderers.BrowsableAPIRenderer",) if API_BROWSABLE else ()),
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "core.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
-        "rest_framework.permissions.IsAuthenticated",
+        "core.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": (
         {% if cookiecutter.use_simple_jwt == "y" %}
@@ -308,6 +547,10 @@ REST_FRAMEWORK = {
         {% endif %}
     ),
     "DEFAULT_SCHEMA_CLASS": "rest_framework.schemas.coreapi.AutoSchema",
+    # Per client IP, for the token views; see core.throttling.LoginRateThrottle.
+    "DEFAULT_THROTTLE_RATES": {
+        "login": config("LOGIN_THROTTLE_RATE", default="10/min"),
+    },
 }
 
 # Cors Header Configuration
@@ -328,6 +571,19 @@ SWAGGER_SETTINGS = {
 
 {% endif %}
 
+{% if cookiecutter.use_django_rq == "y" %}
+# Django RQ
+RQ_QUEUES = {
+    "default": {
+        "HOST": config("REDIS_HOST", default="localhost"),
+        "PORT": config("REDIS_PORT", default=6379, cast=int),
+        "DB": config("REDIS_DB", default=0, cast=int),
+        "DEFAULT_TIMEOUT": 360,
+    },
+}
+
+{% endif %}
+
 {% if cookiecutter.use_jazzmin == "y" %}
 # Jazzmin Configuration
 JAZZMIN_SETTINGS = None
@@ -11,9 +11,28 @@ CSRF_COOKIE_HTTPONLY = True
 
 SECURE_HSTS_SECONDS = 60 * 60 * 24 * 7 * 52  # one year
 SECURE_HSTS_INCLUDE_SUBDOMAINS = True
-SECURE_SSL_REDIRECT = True
+# Off only when nothing in front terminates TLS, e.g. running the compose stack locally.
+SECURE_SSL_REDIRECT = config("SECURE_SSL_REDIRECT", default=True, cast=bool)
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 
 SESSION_COOKIE_SECURE = True
+
+# ==============================================================================
+# REST FRAMEWORK SETTINGS
+# ==============================================================================
+
+# JSON only; set API_BROWSABLE=True to bring back the browsable API.
+if not config("API_BROWSABLE", default=False, cast=bool):
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = ("core.renderers.ORJSONRenderer",)
+
+# ==============================================================================
+# STATIC FILES SETTINGS
+# ==============================================================================
+
+# Collected into the image at build time; hashed names let the files be cached forever.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"},
+}
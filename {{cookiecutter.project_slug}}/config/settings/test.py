@@ -3,6 +3,11 @@
 from .base import *
 
 PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+PASSWORD_HASHING = {**PASSWORD_HASHING, "WORKERS": 0}
+
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+QUERY_BUDGET = {**QUERY_BUDGET, "RAISE": True}
 
 
 class DisableMigrations:
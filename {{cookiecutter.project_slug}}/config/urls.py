@@ -2,16 +2,21 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
+
+from core.views import metrics
 {% if cookiecutter.use_simple_jwt == "y" %}
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from core.throttling import LoginRateThrottle
 {% endif %}
 
 urlpatterns = [
+    path("admin/metrics/", metrics, name="metrics"),
     path("admin/", admin.site.urls),
 
     {% if cookiecutter.use_simple_jwt == "y" %}
     #JWT tokens urls
-    path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path("token/", TokenObtainPairView.as_view(throttle_classes=[LoginRateThrottle]), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     {% endif %}
 
@@ -22,7 +27,7 @@ urlpatterns = [
 
     {% if cookiecutter.use_drf == "y" %}
     # API
-    path("api/v1/", include("config.api", namespace="v1")),
+    path("api/v1/", include("config.apis.v1", namespace="v1")),
     {% else %}
     path("user/", include("users.urls")),
     {% endif %}
@@ -1,17 +1,41 @@
 from django.contrib import admin
 
-from core.models import Media
+from core.models import Media, MediaBlob, MediaRendition, MediaUpload
 
 
 class CustomModelAdmin(admin.ModelAdmin):
     actions = []
 
 
+class MediaRenditionInline(admin.TabularInline):
+    model = MediaRendition
+    fields = ["name", "file", "width", "height"]
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
 class MediaAdmin(CustomModelAdmin):
     list_display = ["title", "file_path", "media_type"]
+    inlines = [MediaRenditionInline]
 
     def has_add_permission(self, request):
         return super().has_add_permission(request)
 
 
+class MediaUploadAdmin(CustomModelAdmin):
+    list_display = ["filename", "user", "size", "offset", "media"]
+    raw_id_fields = ["user", "media"]
+
+
+class MediaBlobAdmin(CustomModelAdmin):
+    list_display = ["digest", "file", "size", "ref_count"]
+    readonly_fields = ["digest", "file", "size", "ref_count"]
+
+    def has_add_permission(self, request):
+        return False
+
+
 admin.site.register(Media, MediaAdmin)
+admin.site.register(MediaBlob, MediaBlobAdmin)
+admin.site.register(MediaUpload, MediaUploadAdmin)
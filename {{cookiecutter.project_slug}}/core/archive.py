@@ -0,0 +1,79 @@
+"""
+Archival of rows soft-deleted long ago.
+
+A removed row stays in its table, and in the indexes that are not partial, until it is
+archived: `archive_removed` moves rows removed before a cutoff into `ArchivedRow`, one
+short transaction per batch, so live tables only carry recently removed rows.
+
+Each batch is copied and then deleted through `QuerySet.delete()`, so cascades,
+`SET_NULL` and `post_delete` receivers apply as on a hard delete. A soft delete leaves
+files alone so that `restore()` can bring a row back whole; archiving is what releases
+the blob of a removed media and deletes its renditions. The archive keeps the row data
+only, and many-to-many links are not archived.
+"""
+from django.apps import apps
+from django.core import serializers
+from django.db import router, transaction
+
+from core.models import ArchivedRow
+
+
+def removable_models():
+    """
+    Return the installed models that soft-delete rows.
+    """
+    return [model for model in apps.get_models() if getattr(model, "soft_delete", False)]
+
+
+def archive_removed_batch(model, before, batch_size):
+    """
+    Move at most `batch_size` rows of `model` removed before `before` into `ArchivedRow`.
+
+    Rows locked by another transaction are skipped and left to the next batch.
+
+    Returns:
+    - int: The number of archived rows.
+    """
+    using = router.db_for_write(model)
+    fields = [field.name for field in model._meta.concrete_fields if not field.primary_key]
+    with transaction.atomic(using=using):
+        rows = list(
+            model._base_manager.using(using)
+            .filter(is_removed=True, removed_at__lt=before)
+            .order_by("removed_at")
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        if not rows:
+            return 0
+        ArchivedRow.objects.using(using).bulk_create(
+            ArchivedRow(source_table=model._meta.db_table, object_id=str(data["pk"]), data=data)
+            for data in serializers.serialize("python", rows, fields=fields)
+        )
+        model._base_manager.using(using).filter(pk__in=[row.pk for row in rows]).delete()
+    return len(rows)
+
+
+def archive_removed(before, batch_size=500, max_batches=None, models=None):
+    """
+    Archive the rows of every soft-deleting model removed before `before`, one bounded batch at a time.
+
+    Args:
+    - before: Rows with `removed_at` older than this datetime are archived.
+    - batch_size: Maximum number of rows moved per transaction.
+    - max_batches: Optional cap on the number of batches per model for a single run.
+    - models: The models to archive, by default `removable_models()`.
+
+    Returns:
+    - dict: The number of archived rows per model label.
+    """
+    archived = {}
+    for model in removable_models() if models is None else models:
+        count = batches = 0
+        while max_batches is None or batches < max_batches:
+            moved = archive_removed_batch(model, before, batch_size)
+            count += moved
+            batches += 1
+            if moved < batch_size:
+                break
+        archived[model._meta.label] = count
+    return archived
@@ -0,0 +1,167 @@
+import hashlib
+import os
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from core.models import Media, MediaBlob
+
+BLOCK_SIZE = 4 * 1024 * 1024
+DIGEST_LENGTH = hashlib.sha256().digest_size
+
+
+class ContentHasher:
+    """
+    Incremental content hash: the SHA-256 of the SHA-256 digests of every 4 MiB block.
+
+    Hashing per block means the hash of a chunked upload can be resumed at any block
+    boundary from the stored block digests, without keeping hash state between requests
+    or re-reading the bytes already written.
+
+    Example:
+    ```
+    hasher = ContentHasher()
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    digest = hasher.hexdigest()
+    ```
+    """
+
+    def __init__(self, block_digests=()):
+        self.block_digests = list(block_digests)
+        self.block = hashlib.sha256()
+        self.block_length = 0
+
+    def update(self, data):
+        view = memoryview(data)
+        while view:
+            take = min(len(view), BLOCK_SIZE - self.block_length)
+            self.block.update(view[:take])
+            self.block_length += take
+            view = view[take:]
+            if self.block_length == BLOCK_SIZE:
+                self.block_digests.append(self.block.digest())
+                self.block = hashlib.sha256()
+                self.block_length = 0
+
+    def digests(self, final=False):
+        """
+        Return the digests of the complete blocks, plus the trailing partial block if `final`.
+        """
+        if final and self.block_length:
+            return [*self.block_digests, self.block.digest()]
+        return list(self.block_digests)
+
+    def hexdigest(self):
+        return combine_digests(self.digests(final=True))
+
+
+def combine_digests(block_digests):
+    return hashlib.sha256(b"".join(block_digests)).hexdigest()
+
+
+def split_block_hashes(block_hashes):
+    """
+    Split the concatenated hex digests stored in `MediaUpload.block_hashes` into raw digests.
+    """
+    step = DIGEST_LENGTH * 2
+    return [bytes.fromhex(block_hashes[i : i + step]) for i in range(0, len(block_hashes), step)]
+
+
+def content_hash(file):
+    """
+    Compute the content hash of a Django `File`, reading it once in `BLOCK_SIZE` chunks.
+    """
+    hasher = ContentHasher()
+    for chunk in file.chunks(BLOCK_SIZE):
+        hasher.update(chunk)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+def blob_name(digest, filename):
+    """
+    Return the storage path for content with `digest`, e.g. `blobs/ab/cd/abcd....png`.
+
+    The extension of the first upload is kept so that the file is served with a sensible type.
+    """
+    _, file_extension = os.path.splitext(filename)
+    return os.path.join("blobs", digest[:2], digest[2:4], f"{digest}{file_extension.lower()}")
+
+
+def acquire_blob(digest, size, filename, write):
+    """
+    Return the `MediaBlob` for `digest` with one more reference, storing the content if it is new.
+
+    Args:
+    - digest: Content hash of the file.
+    - size: Size of the file in bytes.
+    - filename: Original filename, used for the extension of a new blob.
+    - write: Callable storing the content under the given name and returning the name actually used.
+      It is only called when no blob with `digest` exists yet.
+
+    Returns:
+    - MediaBlob: The new or existing blob.
+    """
+    storage = MediaBlob._meta.get_field("file").storage
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(digest=digest).first()
+        if blob is None:
+            name = write(blob_name(digest, filename))
+            try:
+                with transaction.atomic():
+                    return MediaBlob.objects.create(digest=digest, file=name, size=size, ref_count=1)
+            except IntegrityError:
+                # Lost the race against a concurrent upload of the same content; use its blob.
+                storage.delete(name)
+                blob = MediaBlob.objects.select_for_update().get(digest=digest)
+
+        MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+        blob.ref_count += 1
+    return blob
+
+
+def release_blob(blob_id):
+    """
+    Drop one reference to a blob, deleting the blob and its file once nothing points at it.
+
+    The file is only removed after the transaction commits, so a rollback never leaves a
+    `Media` row without its file. A blob acquired concurrently is stored under a new name
+    (storages never overwrite), so the deferred delete cannot remove its file either.
+    """
+    storage = MediaBlob._meta.get_field("file").storage
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") - 1)
+            return
+        name = blob.file.name
+        blob.delete()
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+def attach_blob(media):
+    """
+    Point `media` at the blob for its uncommitted file, storing the content only if it is new.
+
+    Called before `media` is saved. Afterwards `media.file_path` names the shared file and
+    is marked as committed, so `FileField.pre_save` does not write it again.
+    """
+    file = media.file_path
+    storage = Media._meta.get_field("file_path").storage
+    previous_blob_id = media.blob_id
+
+    blob = acquire_blob(
+        content_hash(file),
+        file.size,
+        file.name,
+        lambda name: storage.save(name, file.file, max_length=Media._meta.get_field("file_path").max_length),
+    )
+    media.blob = blob
+    media.file_path.name = blob.file.name
+    media.file_path._committed = True
+
+    if previous_blob_id is not None and previous_blob_id != blob.pk:
+        release_blob(previous_blob_id)
@@ -0,0 +1,53 @@
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+
+GENERATION_KEY = "generation:{label}"
+
+# Labels (`app_label.modelname`) of the models whose saves and deletes bump a generation, see `core.signals`.
+tracked_models = set()
+
+
+def track_model(model):
+    """
+    Bump the cache generation of `model` whenever one of its rows is saved or deleted.
+    """
+    tracked_models.add(model._meta.label_lower)
+
+
+def generation_key(label):
+    return GENERATION_KEY.format(label=label)
+
+
+def get_generations(models, alias="default"):
+    """
+    Return the current cache generation of each model, starting unknown ones at the current time.
+
+    Starting from a timestamp rather than 1 means an evicted generation never comes back
+    with a value that older cached entries were stored under.
+    """
+    cache = caches[alias]
+    keys = [generation_key(model._meta.label_lower) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns())
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generation(label, alias="default"):
+    """
+    Invalidate every cache entry keyed by the generation of the model with `label`.
+    """
+    cache = caches[alias]
+    key = generation_key(label)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns())
+
+
+def bump_generation_on_commit(label, alias="default"):
+    transaction.on_commit(lambda: bump_generation(label, alias))
@@ -0,0 +1,290 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from django.utils.log import AdminEmailHandler
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class LogListener:
+    """
+    Background thread that hands queued records to the target handlers of their `QueueHandler`.
+
+    Each named listener runs its own thread and queue per process, started with the first
+    record it gets; records put while the bounded queue is full are dropped and reported
+    once the listener catches up, so logging never blocks the calling thread, and a slow
+    target (e.g. an SMTP server that does not answer) only holds up its own listener.
+    """
+
+    def __init__(self, maxsize, name="default"):
+        self.queue = queue.Queue(maxsize)
+        self.pid = os.getpid()
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, name=f"log-listener-{name}", daemon=True)
+        self.thread.start()
+
+    def put(self, handler, record):
+        try:
+            self.queue.put_nowait((handler, record))
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            handler, record = item
+            if self.dropped:
+                dropped, self.dropped = self.dropped, 0
+                handler.dispatch(self.dropped_record(dropped))
+            handler.dispatch(record)
+
+    def dropped_record(self, count):
+        return logging.makeLogRecord(
+            {
+                "name": __name__,
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": "%d log records were dropped, the log queue was full",
+                "args": (count,),
+            }
+        )
+
+    def stop(self, timeout=5):
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+
+
+_listeners = {}
+_listener_lock = threading.Lock()
+
+
+def get_listener(maxsize, name="default"):
+    listener = _listeners.get(name)
+    if listener is None:
+        with _listener_lock:
+            listener = _listeners.get(name)
+            if listener is None:
+                listener = _listeners[name] = LogListener(maxsize, name)
+    return listener
+
+
+def stop_listener():
+    """
+    Deliver the records still queued in this process; runs at interpreter exit.
+    """
+    for listener in list(_listeners.values()):
+        listener.stop()
+
+
+def _reset_after_fork():
+    # Listener threads do not survive fork (e.g. gunicorn --preload); a child starts its own.
+    global _listeners, _listener_lock
+    _listeners = {}
+    _listener_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+atexit.register(stop_listener)
+
+
+class QueueHandler(logging.Handler):
+    """
+    Handler that queues records for the target `handlers`, which run on the `LogListener` thread.
+
+    The calling thread only merges the message arguments (so later changes to them do not
+    leak into the log); formatting, file writes, rotation and SMTP all happen on the
+    listener. The levels and filters of the target handlers still apply. Queue handlers
+    share the `listener` of the same name; give targets that may block on the network
+    (mail, HTTP) a listener of their own so they cannot hold up the log files.
+
+    Targets are given as `cfg://handlers.<name>` references. `dictConfig` creates
+    handlers in name order, so their names must sort before the name of the queue handler.
+
+    Example:
+    ```
+    "handlers": {
+        "app_file": {"class": "core.log.ProcessRotatingFileHandler", "filename": "logs/app.{slot}.log"},
+        "queue": {"()": "core.log.QueueHandler", "handlers": ["cfg://handlers.app_file"]},
+    },
+    ```
+    """
+
+    def __init__(self, handlers, queue_size=10000, level=logging.NOTSET, listener="default"):
+        super().__init__(level)
+        # Indexing (unlike iterating) a dictConfig list resolves the cfg:// references.
+        self.targets = [handlers[index] for index in range(len(handlers))]
+        for target in self.targets:
+            if not isinstance(target, logging.Handler):
+                raise ValueError(
+                    f"{target!r} is not a configured handler; name the queue handler so it sorts after its targets."
+                )
+        self.queue_size = queue_size
+        self.listener = listener
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def emit(self, record):
+        try:
+            get_listener(self.queue_size, self.listener).put(self, self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def dispatch(self, record):
+        for handler in self.targets:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+class ProcessRotatingFileHandler(RotatingFileHandler):
+    """
+    `RotatingFileHandler` writing one file per running process, with `{slot}` in `filename` replaced by a slot number.
+
+    Several gunicorn workers rotating the same file lose and interleave records, so each
+    process writes its own file. Naming files by pid would leave a new set behind every
+    time a worker is recycled (`max_requests`, memory limit); instead a process claims the
+    lowest slot nobody else holds, with an exclusive `flock` on `<file>.lock` that is
+    released when it exits, and its replacement reuses the slot. The number of files is
+    thus bounded by the number of processes running at once. The file (and its directory)
+    is created on the first record, and a forked child claims a slot of its own. Without
+    `fcntl` (Windows) the slot is the process id.
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        self.filename_template = str(filename)
+        self.pid = None
+        self.lock_file = None
+        kwargs["delay"] = True
+        super().__init__(self.filename_template.format(slot=0), *args, **kwargs)
+
+    def claim_slot(self):
+        if self.lock_file is not None:
+            # Inherited from the parent, which keeps its lock (and slot) through its own copy.
+            self.lock_file.close()
+            self.lock_file = None
+        self.pid = os.getpid()
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        if fcntl is None:
+            self.baseFilename = os.path.abspath(self.filename_template.format(slot=self.pid))
+            return
+        slot = 0
+        while True:
+            filename = os.path.abspath(self.filename_template.format(slot=slot))
+            lock_file = open(f"{filename}.lock", "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                slot += 1
+                continue
+            self.lock_file = lock_file
+            self.baseFilename = filename
+            return
+
+    def _open(self):
+        if self.pid != os.getpid():
+            self.claim_slot()
+        return super()._open()
+
+    def emit(self, record):
+        if self.pid is not None and self.pid != os.getpid():
+            # The parent's stream; a new one is opened on the slot claimed by this process.
+            self.stream = None
+        super().emit(record)
+
+    def close(self):
+        with self.lock:
+            super().close()
+            if self.lock_file is not None and self.pid == os.getpid():
+                self.lock_file.close()
+                self.lock_file = None
+                self.pid = None
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line, including any `extra` attributes.
+    """
+
+    reserved = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record):
+        data = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "process": record.process,
+            "thread": record.thread,
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc_info"] = record.exc_text
+        if record.stack_info:
+            data["stack_info"] = self.formatStack(record.stack_info)
+        for key, value in vars(record).items():
+            if key not in self.reserved and not key.startswith("_"):
+                data[key] = value
+        return json.dumps(data, default=str)
+
+
+class ThrottledAdminEmailHandler(AdminEmailHandler):
+    """
+    `AdminEmailHandler` that sends at most `rate` emails every `per` seconds.
+
+    An error raised from the same line is mailed once per `per` seconds; the next email
+    reports how many were suppressed in between. Used behind a `QueueHandler`, so SMTP
+    never blocks a request.
+    """
+
+    def __init__(self, rate=10, per=60, **kwargs):
+        super().__init__(**kwargs)
+        self.rate = rate
+        self.per = per
+        self.sent = deque()
+        self.last_sent = {}
+        self.suppressed = 0
+
+    def emit(self, record):
+        now = time.monotonic()
+        while self.sent and now - self.sent[0] >= self.per:
+            self.sent.popleft()
+        if len(self.last_sent) > 1000:
+            self.last_sent = {key: at for key, at in self.last_sent.items() if now - at < self.per}
+
+        key = (record.name, record.pathname, record.lineno)
+        if len(self.sent) >= self.rate or now - self.last_sent.get(key, -self.per) < self.per:
+            self.suppressed += 1
+            return
+
+        self.sent.append(now)
+        self.last_sent[key] = now
+        if self.suppressed:
+            record = copy.copy(record)
+            record.msg = f"{record.getMessage()} ({self.suppressed} more errors suppressed)"
+            record.args = None
+            self.suppressed = 0
+        super().emit(record)
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+
+from core.archive import archive_removed
+
+
+class Command(BaseCommand):
+    help = "Move rows soft-deleted long ago to the ArchivedRow table in bounded batches, or schedule the job."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="Schedule the recurring django_rq archival job instead of archiving now.",
+        )
+        parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_REMOVED["BATCH_SIZE"])
+        parser.add_argument("--max-batches", type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options["schedule"]:
+            if "django_rq" not in settings.INSTALLED_APPS:
+                raise CommandError("Scheduling the archival job requires django_rq.")
+            from core.jobs import schedule_archive_removed_rows
+
+            job = schedule_archive_removed_rows()
+            self.stdout.write(self.style.SUCCESS(f"Scheduled archival job {job.id}."))
+            return
+
+        archived = archive_removed(
+            before=now() - settings.ARCHIVE_REMOVED["RETENTION"],
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+        )
+        for label, count in archived.items():
+            self.stdout.write(f"{label}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"Archived {sum(archived.values())} removed rows."))
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import CommandError
+from django.core.management.commands.migrate import Command as MigrateCommand
+from django.db import connections
+
+# Any constant works: advisory locks are scoped to the database, and nothing else in the project takes one.
+MIGRATE_LOCK_ID = 4_735_201_908
+
+
+class Command(MigrateCommand):
+    help = (
+        "Apply migrations while holding a PostgreSQL advisory lock, so that release jobs started together "
+        "migrate one after the other. Connect directly to PostgreSQL, not through PgBouncer in transaction "
+        "mode, which does not keep session locks."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--lock-timeout",
+            type=int,
+            default=600,
+            help="Seconds to wait for another run to release the lock before giving up.",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor != "postgresql":
+            return super().handle(*args, **options)
+
+        self.acquire_lock(connection, options["lock_timeout"])
+        try:
+            # Whoever waited finds the migrations applied and has nothing left to do.
+            return super().handle(*args, **options)
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [MIGRATE_LOCK_ID])
+
+    def acquire_lock(self, connection, timeout):
+        deadline = time.monotonic() + timeout
+        waiting = False
+        with connection.cursor() as cursor:
+            while True:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", [MIGRATE_LOCK_ID])
+                if cursor.fetchone()[0]:
+                    return
+                if time.monotonic() >= deadline:
+                    raise CommandError(f"Another migration run still holds the lock after {timeout} seconds.")
+                if not waiting:
+                    self.stdout.write("Waiting for another migration run to finish...")
+                    waiting = True
+                time.sleep(1)
@@ -0,0 +1,268 @@
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.db import models, router, transaction
+from django.dispatch import Signal
+from django.utils.timezone import now
+
+# Sent by the bulk methods of `BaseQuerySet` once per batch, and by the soft delete of a queryset, in place of a
+# post_save per row, with:
+# - `instances`: The saved batch.
+# - `created`: The instances of the batch that were inserted.
+# - `update_fields`: The fields written to existing rows, None for `create_many`.
+# - `using`: The database alias.
+post_bulk_save = Signal()
+
+
+def _batches(objs, batch_size):
+    objs = iter(objs)
+    while batch := list(islice(objs, batch_size)):
+        yield batch
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    """
+    QuerySet whose `delete()` soft-deletes the rows of models with `soft_delete` set.
+
+    A soft delete of a queryset sends one `post_bulk_save` for the removed rows instead of
+    a `post_save` per row, so that receivers invalidating caches (e.g. the cached sessions
+    of removed users, see `users.signals`) also see `QuerySet.delete()` and the admin
+    "delete selected" action. Like `QuerySet.delete()`, it loads the rows to do so when
+    the model has receivers.
+    """
+
+    def delete(self):
+        if not self.model.soft_delete:
+            return super().delete()
+        timestamp = now()
+        values = {"is_removed": True, "removed_at": timestamp}
+        if any(field.name == "modified" for field in self.model._meta.concrete_fields):
+            values["modified"] = timestamp
+        queryset = self.filter(is_removed=False)
+        if not post_bulk_save.has_listeners(self.model):
+            count = queryset.update(**values)
+            return count, {self.model._meta.label: count}
+
+        using = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=using, savepoint=False):
+            instances = list(queryset.using(using))
+            count = self.model._base_manager.using(using).filter(
+                pk__in=[obj.pk for obj in instances], is_removed=False
+            ).update(**values)
+            for obj in instances:
+                for name, value in values.items():
+                    setattr(obj, name, value)
+            post_bulk_save.send(
+                sender=self.model, instances=instances, created=[], update_fields=frozenset(values), using=using
+            )
+        return count, {self.model._meta.label: count}
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def hard_delete(self):
+        """
+        Delete the rows for good, with the cascades and signals of `QuerySet.delete()`.
+        """
+        return super().delete()
+
+    hard_delete.alters_data = True
+    hard_delete.queryset_only = True
+
+
+class SoftDeleteManagerMixin:
+    """
+    Hide soft-deleted rows unless the manager is created with `include_removed=True`.
+    """
+
+    def __init__(self, *args, include_removed=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.include_removed = include_removed
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.include_removed:
+            return queryset
+        return queryset.filter(is_removed=False)
+
+
+class BaseQuerySet(SoftDeleteQuerySet):
+    """
+    QuerySet for `BaseModel` with batched writes that keep `save()` semantics.
+
+    `create_many`, `update_many` and `upsert_many` consume any iterable lazily, write it
+    one statement per `batch_size` rows in a transaction per batch, set `modified` the way
+    `save()` does and mark the written fields as saved on the `tracker`, so a later
+    `save()` of the same instances only writes what changed since. Instead of the per-row
+    save signals, each batch sends one `post_bulk_save`; `pre_save` handlers do not run.
+
+    Example:
+    ```
+    Media.objects.create_many(Media(title=row["title"], file_path=row["path"]) for row in rows)
+    Media.objects.upsert_many(media, unique_fields=["file_path"], update_fields=["title"])
+    ```
+    """
+
+    def create_many(self, objs, batch_size=1000):
+        """
+        Insert `objs` with one INSERT per batch.
+
+        `created` keeps the value set when the instance was built, and `modified` starts
+        equal to it unless set explicitly, as with `save()`.
+
+        Returns:
+        - int: The number of inserted rows.
+        """
+        using = self._db or router.db_for_write(self.model)
+        count = 0
+        for batch in _batches(objs, batch_size):
+            self.bulk_create(batch, batch_size=batch_size)
+            self._mark_saved(batch)
+            post_bulk_save.send(sender=self.model, instances=batch, created=batch, update_fields=None, using=using)
+            count += len(batch)
+        return count
+
+    def update_many(self, objs, fields=None, batch_size=1000):
+        """
+        Write `fields` of `objs` to their rows with one UPDATE per batch, bumping `modified`.
+
+        Args:
+        - objs: Iterable of saved instances.
+        - fields: The fields to write. By default each batch writes the fields its
+          instances changed according to the tracker, and skips unchanged instances.
+        - batch_size: Instances per statement.
+
+        Returns:
+        - int: The number of updated rows.
+
+        Raises:
+        - ValueError: If `fields` is missing and the model does not track changes.
+        """
+        if fields is None and not self.model._has_own_tracker():
+            raise ValueError(f"{self.model.__name__} does not track changes, pass the fields to update.")
+        using = self._db or router.db_for_write(self.model)
+        count = 0
+        for batch in _batches(objs, batch_size):
+            if fields is None:
+                changes = [(obj, obj.tracker.changed()) for obj in batch]
+                batch = [obj for obj, changed in changes if changed]
+                batch_fields = set().union(*(changed for obj, changed in changes))
+            else:
+                batch_fields = set(fields)
+            if not batch:
+                continue
+            batch_fields = self._with_derived_fields(batch_fields)
+
+            timestamp = now()
+            for obj in batch:
+                obj.modified = timestamp
+            count += self.bulk_update(batch, batch_fields, batch_size=batch_size)
+            self._mark_saved(batch, batch_fields)
+            post_bulk_save.send(
+                sender=self.model, instances=batch, created=[], update_fields=frozenset(batch_fields), using=using
+            )
+        return count
+
+    def upsert_many(self, objs, unique_fields, update_fields=None, batch_size=1000):
+        """
+        Insert `objs`, updating the existing row instead where `unique_fields` match one.
+
+        Runs one INSERT ... ON CONFLICT DO UPDATE and one SELECT per batch. An existing row
+        keeps its primary key and `created`, which are copied back onto the instance, and
+        gets `update_fields` and a new `modified`. `unique_fields` must match a unique
+        constraint and be distinct within a batch.
+
+        Args:
+        - objs: Iterable of unsaved instances.
+        - unique_fields: The fields identifying a row.
+        - update_fields: The fields written to existing rows, by default all but the
+          primary key, `unique_fields` and `created`.
+        - batch_size: Instances per statement.
+
+        Returns:
+        - tuple: The number of inserted and of updated rows.
+        """
+        opts = self.model._meta
+        unique_fields = list(unique_fields)
+        if update_fields is None:
+            update_fields = [
+                field.name
+                for field in opts.concrete_fields
+                if not field.primary_key and field.name not in unique_fields and field.name != "created"
+            ]
+        update_fields = self._with_derived_fields(update_fields)
+        using = self._db or router.db_for_write(self.model)
+        inserted = updated = 0
+        for batch in _batches(objs, batch_size):
+            timestamp = now()
+            for obj in batch:
+                obj.modified = timestamp
+            with transaction.atomic(using=using, savepoint=False):
+                self.bulk_create(
+                    batch,
+                    batch_size=batch_size,
+                    update_conflicts=True,
+                    unique_fields=unique_fields,
+                    update_fields=update_fields,
+                )
+                created = self._sync_stored_rows(batch, unique_fields, using)
+            self._mark_saved(batch)
+            post_bulk_save.send(
+                sender=self.model,
+                instances=batch,
+                created=created,
+                update_fields=frozenset(update_fields),
+                using=using,
+            )
+            inserted += len(created)
+            updated += len(batch) - len(created)
+        return inserted, updated
+
+    def _sync_stored_rows(self, batch, unique_fields, using):
+        """
+        Copy the primary key and `created` of rows that already existed onto `batch`; return the inserted instances.
+
+        Without RETURNING for upserts (Django 5.0), an instance is known to be inserted when
+        the stored row has its primary key.
+        """
+        attnames = [self.model._meta.get_field(name).attname for name in unique_fields]
+        instances = {tuple(getattr(obj, attname) for attname in attnames): obj for obj in batch}
+        if len(attnames) == 1:
+            condition = models.Q(**{f"{attnames[0]}__in": [key[0] for key in instances]})
+        else:
+            condition = reduce(or_, (models.Q(**dict(zip(attnames, key))) for key in instances))
+
+        created = []
+        rows = self.model._base_manager.using(using).filter(condition).values_list(*attnames, "pk", "created")
+        for *key, pk, created_at in rows:
+            obj = instances.get(tuple(key))
+            if obj is None:
+                continue
+            if obj.pk == pk:
+                created.append(obj)
+            else:
+                obj.pk = pk
+                obj.created = created_at
+        return created
+
+    def _with_derived_fields(self, fields):
+        # Field names rather than the attnames reported by the tracker, so that no column is listed twice.
+        fields = {self.model._meta.get_field(name).name for name in fields}
+        for name in list(fields):
+            fields.update(self.model.save_with.get(name, ()))
+        return fields | {"modified"}
+
+    def _mark_saved(self, instances, fields=None):
+        if not self.model._has_own_tracker():
+            return
+        if fields is not None:
+            fields = [self.model._meta.get_field(name).attname for name in fields]
+        for obj in instances:
+            obj.tracker.set_saved_fields(fields)
+
+
+class BaseManager(SoftDeleteManagerMixin, models.Manager.from_queryset(BaseQuerySet)):
+    """
+    Default manager of `BaseModel`, hiding soft-deleted rows; see `BaseQuerySet` for the bulk methods.
+    """
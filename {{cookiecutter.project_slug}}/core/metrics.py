@@ -0,0 +1,279 @@
+import atexit
+import fcntl
+import json
+import os
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+ARCHIVE = "archive.json"
+
+
+def as_samples(values):
+    """
+    Convert `{labels: value}` to the JSON friendly `[[labels, value], ...]` of the snapshot files.
+    """
+    return [[list(labels), list(value) if isinstance(value, list) else value] for labels, value in values.items()]
+
+
+class Metric:
+    """
+    Base class of the in-process metrics; values are keyed by the tuple of label values.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def snapshot(self):
+        with self.lock:
+            return as_samples(self.values)
+
+    def reset(self):
+        with self.lock:
+            self.values.clear()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    Gauge summed across the live processes only.
+    """
+
+    type = "gauge"
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """
+    Histogram whose value per label set is `[count per bucket..., count above the last bucket, sum]`.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.values.get(labels)
+            if counts is None:
+                counts = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+
+class Registry:
+    """
+    The metrics of this process, merged with the other worker processes through `METRICS["DIR"]`.
+
+    Every process writes a snapshot of its metrics to `<DIR>/<pid>.json` from a background
+    thread every `METRICS["FLUSH_INTERVAL"]` seconds, so recording a value never touches
+    the disk. `collect()` sums the snapshots of all processes; snapshots of processes that
+    have exited are folded into `archive.json`, keeping counters monotonic across worker
+    restarts while gauges only count live processes. Without `DIR` only the metrics of
+    the serving process are reported.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.flusher = None
+        self.flusher_lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    @property
+    def directory(self):
+        return settings.METRICS["DIR"]
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def start(self):
+        """
+        Start the flusher thread of this process; called on the first recorded request.
+        """
+        if self.flusher is not None or not self.directory:
+            return
+        with self.flusher_lock:
+            if self.flusher is None:
+                self.flusher = threading.Thread(target=self.run, name="metrics-flusher", daemon=True)
+                self.flusher.start()
+
+    def run(self):
+        while not self.stopped.wait(settings.METRICS["FLUSH_INTERVAL"]):
+            self.flush()
+
+    def flush(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        with open(f"{path}.tmp", "w") as file:
+            json.dump(self.snapshot(), file)
+        os.replace(f"{path}.tmp", path)
+
+    def stop(self):
+        if self.flusher is not None:
+            self.stopped.set()
+            self.flush()
+
+    def reset_after_fork(self):
+        # A forked worker starts from zero and flushes to a file of its own.
+        for metric in self.metrics.values():
+            metric.reset()
+        self.flusher = None
+        self.flusher_lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def collect(self):
+        """
+        Return `{name: {labels: value}}` summed over every process.
+        """
+        totals = {name: {} for name in self.metrics}
+        if not self.directory:
+            self.merge(totals, self.snapshot(), live=True)
+            return totals
+
+        self.flush()
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            archive = self.read(ARCHIVE)
+            exited = []
+            for filename in os.listdir(self.directory):
+                pid = filename.removesuffix(".json")
+                if not pid.isdigit():
+                    continue
+                if process_alive(int(pid)):
+                    self.merge(totals, self.read(filename), live=True)
+                else:
+                    exited.append(filename)
+
+            if exited:
+                merged = {}
+                for snapshot in [archive, *map(self.read, exited)]:
+                    self.merge(merged, snapshot, live=False)
+                archive = {name: as_samples(values) for name, values in merged.items()}
+                with open(os.path.join(self.directory, ARCHIVE), "w") as file:
+                    json.dump(archive, file)
+                for filename in exited:
+                    os.remove(os.path.join(self.directory, filename))
+
+        self.merge(totals, archive, live=False)
+        return totals
+
+    def read(self, filename):
+        try:
+            with open(os.path.join(self.directory, filename)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def merge(self, totals, snapshot, live):
+        for name, samples in snapshot.items():
+            metric = self.metrics.get(name)
+            if metric is None or (metric.type == "gauge" and not live):
+                continue
+            values = totals.setdefault(name, {})
+            for labels, value in samples:
+                labels = tuple(labels)
+                current = values.get(labels)
+                if current is None:
+                    values[labels] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    values[labels] = [a + b for a, b in zip(current, value)]
+                else:
+                    values[labels] = current + value
+
+    def render(self):
+        """
+        Render the collected metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for labels, value in sorted(values.items()):
+                pairs = list(zip(metric.labelnames, labels))
+                if metric.type != "histogram":
+                    lines.append(f"{name}{format_labels(pairs)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip((*metric.buckets, "+Inf"), value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(pairs + [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(pairs)} {value[-1]}")
+                lines.append(f"{name}_count{format_labels(pairs)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (
+        f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry.reset_after_fork)
+atexit.register(registry.stop)
+
+http_requests = registry.counter(
+    "http_requests_total", "Requests served, by view and status code.", ("method", "view", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time to produce a response.", ("method", "view")
+)
+http_requests_in_progress = registry.gauge("http_requests_in_progress", "Requests being served.")
+db_queries = registry.counter("db_queries_total", "Database queries run by requests.", ("view",))
+db_query_duration = registry.counter(
+    "db_query_duration_seconds_total", "Time requests spent in database queries.", ("view",)
+)
+cache_requests = registry.counter("cache_requests_total", "Application cache lookups.", ("cache", "result"))
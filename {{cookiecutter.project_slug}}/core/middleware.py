@@ -0,0 +1,209 @@
+import hashlib
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+
+from core import metrics
+from core.queries import QueryBudgetExceeded, collect_queries
+from core.routers import replica_aliases, use_replicas
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+KNOWN_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"))
+
+
+class ReplicaPinningMiddleware:
+    """
+    Open a `core.routers.use_replicas` scope for every request.
+
+    Unsafe methods and pinned clients read from the primary. A request that writes pins
+    its client for `DATABASE_REPLICA["PIN_SECONDS"]`, so the same client keeps reading its
+    own writes until the replicas have caught up. Browsers are pinned with the pin cookie;
+    clients that send no cookies (e.g. JWT API clients) are pinned by their
+    `Authorization` header, whose hash is kept in the `PIN_CACHE_ALIAS` cache.
+
+    Works for both WSGI and ASGI; place it before any middleware that queries the
+    database (e.g. `SessionMiddleware`).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def get_pin_key(self, request):
+        credentials = request.headers.get("Authorization")
+        if not credentials or not replica_aliases():
+            return None
+        return "db-pin:" + hashlib.sha256(credentials.encode()).hexdigest()
+
+    def get_pin_cache(self):
+        return caches[settings.DATABASE_REPLICA["PIN_CACHE_ALIAS"]]
+
+    def is_pinned(self, request):
+        if request.method not in SAFE_METHODS or settings.DATABASE_REPLICA["PIN_COOKIE"] in request.COOKIES:
+            return True
+        key = self.get_pin_key(request)
+        return key is not None and self.get_pin_cache().get(key) is not None
+
+    async def ais_pinned(self, request):
+        if request.method not in SAFE_METHODS or settings.DATABASE_REPLICA["PIN_COOKIE"] in request.COOKIES:
+            return True
+        key = self.get_pin_key(request)
+        return key is not None and await self.get_pin_cache().aget(key) is not None
+
+    def set_pin_cookie(self, request, response):
+        options = settings.DATABASE_REPLICA
+        response.set_cookie(
+            options["PIN_COOKIE"],
+            "1",
+            max_age=options["PIN_SECONDS"],
+            secure=request.is_secure(),
+            httponly=True,
+            samesite="Lax",
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with use_replicas(pinned=self.is_pinned(request)) as state:
+            response = self.get_response(request)
+        if state.written:
+            self.set_pin_cookie(request, response)
+            key = self.get_pin_key(request)
+            if key is not None:
+                self.get_pin_cache().set(key, 1, settings.DATABASE_REPLICA["PIN_SECONDS"])
+        return response
+
+    async def __acall__(self, request):
+        with use_replicas(pinned=await self.ais_pinned(request)) as state:
+            response = await self.get_response(request)
+        if state.written:
+            self.set_pin_cookie(request, response)
+            key = self.get_pin_key(request)
+            if key is not None:
+                await self.get_pin_cache().aset(key, 1, settings.DATABASE_REPLICA["PIN_SECONDS"])
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the queries and database time of every request and check them against `QUERY_BUDGET`.
+
+    A request exceeding `MAX_QUERIES`, `MAX_TIME` (ms) or repeating one SQL statement
+    more than `MAX_DUPLICATES` times (an N+1) is logged as a warning, or raises
+    `core.queries.QueryBudgetExceeded` with `RAISE` (the test settings). Views override
+    the limits with `core.queries.query_budget`. With `SERVER_TIMING` the totals are
+    added to the `Server-Timing` response header, shown by browser developer tools.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+        request.query_budget = getattr(view_func, "query_budget", None) or getattr(view, "query_budget", {})
+
+    def process_response(self, request, response, collector):
+        budget = {**settings.QUERY_BUDGET, **getattr(request, "query_budget", {})}
+        duration = collector.duration * 1000
+        logger.debug("%s %s: %d queries in %.1fms", request.method, request.path, collector.count, duration)
+
+        problems = collector.check(budget["MAX_QUERIES"], budget["MAX_TIME"], budget["MAX_DUPLICATES"])
+        if problems:
+            message = f"Query budget exceeded by {request.method} {request.path}: " + "; ".join(problems)
+            if budget["RAISE"]:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra={"queries": collector.count, "db_time": round(duration, 1)})
+
+        if budget["SERVER_TIMING"]:
+            timing = f'db;dur={duration:.1f};desc="{collector.count} queries"'
+            existing = response.get("Server-Timing")
+            response["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect_queries() as collector:
+            response = self.get_response(request)
+        return self.process_response(request, response, collector)
+
+    async def __acall__(self, request):
+        with collect_queries() as collector:
+            response = await self.get_response(request)
+        return self.process_response(request, response, collector)
+
+
+class MetricsMiddleware:
+    """
+    Record the latency, status, in-flight count and database time of every request in `core.metrics`.
+
+    Requests are labelled by view name (e.g. "v1:mediaupload-detail") rather than path,
+    which keeps the number of series bounded. Recording takes a few microseconds and
+    never touches the disk. Place it first, so the latency covers the other middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        # Checked once here rather than per request, as `iscoroutinefunction` costs about a microsecond.
+        self.is_async = iscoroutinefunction(self.get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def record(self, request, response, duration, collector):
+        match = request.resolver_match
+        view = match.view_name if match is not None else "unmatched"
+        method = request.method if request.method in KNOWN_METHODS else "other"
+        metrics.http_requests.inc(method, view, str(response.status_code))
+        metrics.http_request_duration.observe(duration, method, view)
+        if collector.count:
+            metrics.db_queries.inc(view, amount=collector.count)
+            metrics.db_query_duration.inc(view, amount=collector.duration)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics.registry.start()
+        metrics.http_requests_in_progress.inc()
+        start = time.perf_counter()
+        try:
+            with collect_queries() as collector:
+                response = self.get_response(request)
+        finally:
+            metrics.http_requests_in_progress.dec()
+        self.record(request, response, time.perf_counter() - start, collector)
+        return response
+
+    async def __acall__(self, request):
+        metrics.registry.start()
+        metrics.http_requests_in_progress.inc()
+        start = time.perf_counter()
+        try:
+            with collect_queries() as collector:
+                response = await self.get_response(request)
+        finally:
+            metrics.http_requests_in_progress.dec()
+        self.record(request, response, time.perf_counter() - start, collector)
+        return response
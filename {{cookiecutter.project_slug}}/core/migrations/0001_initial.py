@@ -0,0 +1,124 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:49
+
+import core.models
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_table', models.CharField(db_column='source_table', max_length=63, verbose_name='Source Table')),
+                ('object_id', models.CharField(db_column='object_id', max_length=64, verbose_name='Object ID')),
+                ('data', models.JSONField(db_column='data', encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Data')),
+                ('archived_at', models.DateTimeField(db_column='archived_at', default=django.utils.timezone.now, verbose_name='Archived At')),
+            ],
+            options={
+                'verbose_name': 'Archived Row',
+                'verbose_name_plural': 'Archived Rows',
+                'db_table': 'ArchivedRow',
+            },
+        ),
+        migrations.CreateModel(
+            name='Media',
+            fields=[
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('is_removed', models.BooleanField(default=False)),
+                ('id', model_utils.fields.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('removed_at', models.DateTimeField(blank=True, db_column='removed_at', editable=False, null=True, verbose_name='Removed At')),
+                ('title', models.CharField(blank=True, db_column='title', max_length=250, verbose_name='Title')),
+                ('file_path', models.FileField(db_column='file_path', upload_to=core.models.file_upload_path, verbose_name='File Path')),
+                ('media_type', models.CharField(choices=[('image', 'Image'), ('video', 'Video'), ('document', 'Document')], db_column='media_type', default='image', max_length=250, verbose_name='Media Type')),
+                ('width', models.PositiveIntegerField(blank=True, db_column='width', null=True, verbose_name='Width')),
+                ('height', models.PositiveIntegerField(blank=True, db_column='height', null=True, verbose_name='Height')),
+                ('duration', models.FloatField(blank=True, db_column='duration', null=True, verbose_name='Duration')),
+            ],
+            options={
+                'verbose_name': 'Media',
+                'verbose_name_plural': 'Media',
+                'db_table': 'Media',
+                'ordering': ['created'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('is_removed', models.BooleanField(default=False)),
+                ('id', model_utils.fields.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('removed_at', models.DateTimeField(blank=True, db_column='removed_at', editable=False, null=True, verbose_name='Removed At')),
+                ('digest', models.CharField(db_column='digest', max_length=64, unique=True, verbose_name='Digest')),
+                ('file', models.FileField(db_column='file', max_length=250, upload_to='', verbose_name='File')),
+                ('size', models.PositiveBigIntegerField(db_column='size', verbose_name='Size')),
+                ('ref_count', models.PositiveIntegerField(db_column='ref_count', default=0, verbose_name='Reference Count')),
+            ],
+            options={
+                'verbose_name': 'Media Blob',
+                'verbose_name_plural': 'Media Blobs',
+                'db_table': 'MediaBlob',
+                'ordering': ['created'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MediaRendition',
+            fields=[
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('is_removed', models.BooleanField(default=False)),
+                ('id', model_utils.fields.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('removed_at', models.DateTimeField(blank=True, db_column='removed_at', editable=False, null=True, verbose_name='Removed At')),
+                ('name', models.CharField(db_column='name', max_length=50, verbose_name='Name')),
+                ('file', models.FileField(db_column='file', upload_to=core.models.rendition_upload_path, verbose_name='File')),
+                ('width', models.PositiveIntegerField(db_column='width', verbose_name='Width')),
+                ('height', models.PositiveIntegerField(db_column='height', verbose_name='Height')),
+            ],
+            options={
+                'verbose_name': 'Media Rendition',
+                'verbose_name_plural': 'Media Renditions',
+                'db_table': 'MediaRendition',
+                'ordering': ['created'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MediaUpload',
+            fields=[
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('is_removed', models.BooleanField(default=False)),
+                ('id', model_utils.fields.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('removed_at', models.DateTimeField(blank=True, db_column='removed_at', editable=False, null=True, verbose_name='Removed At')),
+                ('title', models.CharField(blank=True, db_column='title', max_length=250, verbose_name='Title')),
+                ('media_type', models.CharField(choices=[('image', 'Image'), ('video', 'Video'), ('document', 'Document')], db_column='media_type', default='image', max_length=250, verbose_name='Media Type')),
+                ('filename', models.CharField(db_column='filename', max_length=250, verbose_name='Filename')),
+                ('size', models.PositiveBigIntegerField(db_column='size', verbose_name='Size')),
+                ('offset', models.PositiveBigIntegerField(db_column='offset', default=0, verbose_name='Offset')),
+                ('block_hashes', models.TextField(blank=True, db_column='block_hashes', default='', verbose_name='Block Hashes')),
+                ('media', models.OneToOneField(blank=True, db_column='media', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='core.media', verbose_name='Media')),
+            ],
+            options={
+                'verbose_name': 'Media Upload',
+                'verbose_name_plural': 'Media Uploads',
+                'db_table': 'MediaUpload',
+                'ordering': ['created'],
+                'abstract': False,
+            },
+        ),
+    ]
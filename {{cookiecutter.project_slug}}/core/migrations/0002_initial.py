@@ -0,0 +1,73 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaupload',
+            name='user',
+            field=models.ForeignKey(db_column='user', on_delete=django.db.models.deletion.CASCADE, related_name='media_uploads', to=settings.AUTH_USER_MODEL, verbose_name='User'),
+        ),
+        migrations.AddField(
+            model_name='mediarendition',
+            name='media',
+            field=models.ForeignKey(db_column='media', on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='core.media', verbose_name='Media'),
+        ),
+        migrations.AddIndex(
+            model_name='mediablob',
+            index=models.Index(condition=models.Q(('is_removed', False)), fields=['created', 'id'], name='mediablob_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mediablob',
+            index=models.Index(condition=models.Q(('is_removed', True)), fields=['removed_at'], name='mediablob_removed_idx'),
+        ),
+        migrations.AddField(
+            model_name='media',
+            name='blob',
+            field=models.ForeignKey(blank=True, db_column='blob', editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='media', to='core.mediablob', verbose_name='Blob'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedrow',
+            index=models.Index(fields=['source_table', 'object_id'], name='archivedrow_source_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mediaupload',
+            index=models.Index(condition=models.Q(('is_removed', False)), fields=['created', 'id'], name='mediaupload_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mediaupload',
+            index=models.Index(condition=models.Q(('is_removed', True)), fields=['removed_at'], name='mediaupload_removed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mediarendition',
+            index=models.Index(condition=models.Q(('is_removed', False)), fields=['created', 'id'], name='mediarendition_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mediarendition',
+            index=models.Index(condition=models.Q(('is_removed', True)), fields=['removed_at'], name='mediarendition_removed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='mediarendition',
+            constraint=models.UniqueConstraint(fields=('media', 'name'), name='mediarendition_media_name_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(condition=models.Q(('is_removed', False)), fields=['created', 'id'], name='media_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='media',
+            index=models.Index(condition=models.Q(('is_removed', True)), fields=['removed_at'], name='media_removed_idx'),
+        ),
+    ]
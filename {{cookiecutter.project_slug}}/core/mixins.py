@@ -1,4 +1,17 @@
-from rest_framework import authentication, permissions
+import hashlib
+from functools import wraps
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db.models import Count, Max
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.cache import get_generations, track_model
+from core.metrics import cache_requests
+from core.permissions import IsAdminUser
 
 
 class AdminMixin:
@@ -9,4 +22,212 @@ class AdminMixin:
     - Uses session authentication.
     """
 
-    permission_classes = [permissions.IsAdminUser]
+    permission_classes = [IsAdminUser]
+
+
+def _wrap_actions(cls, actions, decorator):
+    """
+    Replace each of `actions` defined on `cls` by `decorator(action)`, once per decorator.
+    """
+    marker = f"wrapped_by_{decorator.__name__}"
+    for action in actions:
+        handler = getattr(cls, action, None)
+        if handler is not None and not getattr(handler, marker, False):
+            wrapped = decorator(handler)
+            setattr(wrapped, marker, True)
+            setattr(cls, action, wrapped)
+
+
+def _cache_action(handler):
+    @wraps(handler)
+    def cached_handler(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return handler(self, request, *args, **kwargs)
+
+        cache = caches[self.cache_alias]
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            cache_requests.inc("response", "hit")
+            return Response(data)
+
+        cache_requests.inc("response", "miss")
+        response = handler(self, request, *args, **kwargs)
+        if response.status_code == 200 and not response.exception:
+            timeout = DEFAULT_TIMEOUT if self.cache_timeout is None else self.cache_timeout
+            cache.set(key, response.data, timeout)
+        return response
+
+    return cached_handler
+
+
+class CachedResponseMixin:
+    """
+    Mixin for DRF viewsets that caches the data of `list` and `retrieve` responses.
+
+    Entries are keyed by the view, action, full URL, user (unless `cache_per_user` is
+    False) and the cache generation of `queryset.model` and every model in
+    `cache_dependencies`. Saving or deleting a row of any of these models bumps its
+    generation once the transaction commits (see `core.signals`), so every cached
+    response that may contain it is missed from then on. Authentication, permissions and
+    throttling still run on every request; only the queryset and serializer work is
+    skipped.
+
+    `QuerySet.update()`, `bulk_create()` and raw SQL do not send signals; call
+    `core.cache.bump_generation` after them. The `BaseQuerySet` bulk methods do.
+
+    Attributes:
+    - `cache_timeout`: Seconds to keep a response, `None` for the cache's `TIMEOUT`.
+    - `cache_alias`: The `CACHES` alias to use.
+    - `cache_per_user`: Key responses by user, for views whose data depends on who asks.
+    - `cache_dependencies`: Other models rendered by the serializer (e.g. nested relations).
+    - `cached_actions`: The actions to cache, including extra `@action` names.
+
+    Example:
+    ```
+    class MediaViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+        queryset = Media.objects.prefetch_related("renditions")
+        serializer_class = MediaSerializer
+        cache_dependencies = [MediaRendition]
+    ```
+    """
+
+    cache_timeout = 60
+    cache_alias = "default"
+    cache_per_user = True
+    cache_dependencies = ()
+    cached_actions = ("list", "retrieve")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _wrap_actions(cls, cls.cached_actions, _cache_action)
+        for model in cls.get_cache_models():
+            track_model(model)
+
+    @classmethod
+    def get_cache_models(cls):
+        queryset = getattr(cls, "queryset", None)
+        models = [queryset.model] if queryset is not None else []
+        return [*models, *cls.cache_dependencies]
+
+    def get_response_cache_key(self, request):
+        parts = [
+            f"{type(self).__module__}.{type(self).__qualname__}",
+            self.action,
+            request.build_absolute_uri(),
+        ]
+        if self.cache_per_user:
+            parts.append(str(request.user.pk) if request.user.is_authenticated else "anonymous")
+        parts.extend(map(str, get_generations(self.get_cache_models(), self.cache_alias)))
+        return "response:" + hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def _conditional_action(handler):
+    @wraps(handler)
+    def conditional_handler(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return handler(self, request, *args, **kwargs)
+
+        etag, last_modified = self.get_validators(request)
+        headers = {"ETag": etag}
+        if last_modified is not None:
+            headers["Last-Modified"] = http_date(last_modified)
+        if self.is_not_modified(request, etag, last_modified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response = handler(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            for name, value in headers.items():
+                response[name] = value
+        return response
+
+    return conditional_handler
+
+
+class ConditionalGetMixin:
+    """
+    Mixin for DRF viewsets that answers conditional GETs with `304 Not Modified`.
+
+    `retrieve` derives `ETag` and `Last-Modified` from the `modified` timestamp of the
+    object, `list` from `MAX(modified)` and `COUNT(*)` of the filtered queryset, read in
+    a single aggregate query. The count makes the `ETag` change when rows are deleted;
+    clients sending only `If-Modified-Since` do not see deletions. Both validators are
+    checked before the handler runs, so a `304` skips pagination and serialization.
+    The `ETag` also covers the user and the negotiated media type, as both change the
+    representation.
+
+    Rows of other models rendered by the serializer are listed in
+    `conditional_dependencies` as lookups from the viewed model (e.g. `"renditions"`).
+    Their latest `conditional_field` and their count are read in the same aggregate
+    query (one extra query for `retrieve`), so changing, adding or deleting one of them
+    changes the validators too.
+
+    Combined with `CachedResponseMixin`, list this mixin first so the check runs before
+    the cache lookup.
+
+    Attributes:
+    - `conditional_actions`: The actions to validate, including extra `@action` names.
+    - `conditional_field`: The timestamp field the validators are derived from, on the
+      viewed model and on its dependencies.
+    - `conditional_dependencies`: Lookups of the related rows rendered with each row.
+
+    Example:
+    ```
+    class MediaViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+        queryset = Media.objects.prefetch_related("renditions")
+        serializer_class = MediaSerializer
+        conditional_dependencies = ["renditions"]
+    ```
+    """
+
+    conditional_actions = ("list", "retrieve")
+    conditional_field = "modified"
+    conditional_dependencies = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _wrap_actions(cls, cls.conditional_actions, _conditional_action)
+
+    def get_object(self):
+        # `get_validators` already fetched (and permission checked) the object of this request.
+        obj = getattr(self, "_conditional_object", None)
+        return obj if obj is not None else super().get_object()
+
+    def get_validators(self, request):
+        """
+        Return the `(etag, last_modified)` of the current response, `last_modified` as a Unix timestamp.
+        """
+        field = self.conditional_field
+        if self.detail:
+            obj = self._conditional_object = self.get_object()
+            queryset = type(obj)._base_manager.filter(pk=obj.pk)
+            values = {"pk": obj.pk, "modified": getattr(obj, field)}
+            aggregates = {}
+        else:
+            queryset = self.filter_queryset(self.get_queryset()).order_by()
+            values = {}
+            aggregates = {"modified": Max(field), "count": Count("pk", distinct=bool(self.conditional_dependencies))}
+        for index, lookup in enumerate(self.conditional_dependencies):
+            aggregates[f"modified_{index}"] = Max(f"{lookup}__{field}")
+            aggregates[f"count_{index}"] = Count(f"{lookup}__pk", distinct=True)
+        if aggregates:
+            values.update(queryset.aggregate(**aggregates))
+
+        timestamps = [value for name, value in values.items() if name.startswith("modified") and value is not None]
+        modified = max(timestamps, default=None)
+        version = ["" if value is None else getattr(value, "isoformat", value.__str__)() for value in values.values()]
+
+        user = request.user.pk if request.user.is_authenticated else ""
+        parts = [self.action, str(user), request.accepted_media_type or "", *version]
+        digest = hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32]
+        return f"W/{quote_etag(digest)}", int(modified.timestamp()) if modified else None
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        if if_none_match:
+            # Weak comparison, as required for If-None-Match.
+            etags = parse_etags(if_none_match)
+            return "*" in etags or etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in etags}
+
+        if_modified_since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+        return if_modified_since is not None and last_modified is not None and last_modified <= if_modified_since
@@ -1,12 +1,21 @@
 import os
 from uuid import uuid4
 
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models.signals import class_prepared, post_init
+from django.dispatch import receiver
+from django.utils.timezone import now
 from django.utils.translation import gettext as _
 
 from model_utils import FieldTracker
 from model_utils.models import TimeStampedModel, UUIDModel, SoftDeletableModel
 
+from core.managers import BaseManager
+
 
 def file_upload_path(instance, filename):
     """
@@ -32,35 +41,268 @@ def file_upload_path(instance, filename):
     return os.path.join(model_name, unique_filename)
 
 
-class BaseModel(UUIDModel, TimeStampedModel):
+class SoftDeleteModel(SoftDeletableModel):
+    """
+    Abstract model adding the removal time to `SoftDeletableModel` of `model_utils`.
+
+    `delete()` marks the row removed instead of deleting it, and `restore()` brings it
+    back. Declare `objects` with a manager that hides removed rows and `all_objects` with
+    one that does not (see `core.managers.SoftDeleteManagerMixin`). Rows removed longer
+    than `ARCHIVE_REMOVED["RETENTION"]` ago are moved to `ArchivedRow` by `core.archive`.
+
+    Attributes:
+    - `is_removed`: Whether the row is soft-deleted.
+    - `removed_at`: When the row was soft-deleted.
+    - `soft_delete`: Set to False on models with a lifecycle of their own; `delete()` and
+      `QuerySet.delete()` then delete rows for good.
     """
-    Abstract base model class combining UUID, timestamp, and change tracking.
+
+    removed_at = models.DateTimeField(
+        verbose_name=_("Removed At"), null=True, blank=True, editable=False, db_column="removed_at"
+    )
+
+    soft_delete = True
+
+    class Meta:
+        abstract = True
+
+    def delete(self, using=None, soft=None, *args, **kwargs):
+        """
+        Soft-delete the row, or delete it for good with `soft=False` or on models without `soft_delete`.
+        """
+        if soft is None:
+            soft = self.soft_delete
+        if not soft:
+            return super().delete(using, False, *args, **kwargs)
+        self.is_removed = True
+        self.removed_at = now()
+        self.save(using=using)
+
+    def restore(self, using=None):
+        self.is_removed = False
+        self.removed_at = None
+        self.save(using=using)
+
+    def _perform_unique_checks(self, unique_checks):
+        """
+        Check unique fields against removed rows too, which keep their values until archived.
+
+        `validate_unique()`, and with it `full_clean()` and model forms, then reports a
+        value taken by a removed row as a validation error instead of the database
+        raising an IntegrityError on save. A DRF `UniqueValidator` needs a queryset that
+        includes removed rows, e.g. `User.all_objects.all()`, for the same effect.
+        """
+        errors = super()._perform_unique_checks(unique_checks)
+        reported = {
+            tuple(error.params["unique_check"])
+            for field_errors in errors.values()
+            for error in field_errors
+            if error.params and "unique_check" in error.params
+        }
+        for model_class, unique_check in unique_checks:
+            if tuple(unique_check) in reported or not issubclass(model_class, SoftDeleteModel):
+                continue
+            lookup = {}
+            for name in unique_check:
+                field = self._meta.get_field(name)
+                value = getattr(self, field.attname)
+                if value is None or (field.primary_key and not self._state.adding):
+                    break
+                lookup[name] = value
+            else:
+                rows = model_class._base_manager.filter(is_removed=True, **lookup)
+                if not self._state.adding:
+                    rows = rows.exclude(pk=self._get_pk_val(model_class._meta))
+                if rows.exists():
+                    key = unique_check[0] if len(unique_check) == 1 else NON_FIELD_ERRORS
+                    errors.setdefault(key, []).append(self.unique_error_message(model_class, unique_check))
+        return errors
+
+
+class BaseModel(UUIDModel, TimeStampedModel, SoftDeleteModel):
+    """
+    Abstract base model class combining UUID, timestamp, soft delete and change tracking.
 
     This abstract base model class inherits from `UUIDModel` and `TimeStampedModel`
     from the `model_utils` package, providing the model with a UUID field, timestamp
-    fields (`created` and `modified`), and change tracking functionality through
-    the `FieldTracker`.
+    fields (`created` and `modified`), soft delete through `SoftDeleteModel`, and
+    change tracking functionality through the `FieldTracker`.
+
+    `objects` leaves soft-deleted rows out and `all_objects` includes them. Related
+    objects are fetched with the base manager, so a foreign key to a removed row still
+    resolves.
+
+    Every concrete subclass gets its own `tracker`, so `save()` on a loaded row writes
+    only the fields that changed, and skips the query (and the save signals) altogether
+    when nothing did. Pass `update_fields` to choose the fields yourself, e.g.
+    `update_fields=["modified"]` to only bump the timestamp.
 
     Attributes:
     - `tracker`: An instance of `FieldTracker` to track changes to model fields.
+    - `track_changes`: Set to False on models loaded in bulk or on hot paths; the tracker
+      copies every field of every instance on `__init__`. Their `save()` writes all fields.
+    - `save_with`: Maps a field to the fields that `pre_save` handlers derive from it,
+      which are saved whenever it is, e.g. `{"file_path": ["blob"]}`.
 
     Meta:
     - `abstract`: Indicates that this model is an abstract base model.
     - `ordering`: Specifies the default ordering for queries, based on the 'created'
       field in ascending order.
+    - `indexes`: A `(created, id)` index over live rows backing the default ordering and
+      `core.pagination.KeysetPagination`, and a `removed_at` index over removed rows for
+      `core.archive`. Partial indexes only serve queries that filter on `is_removed`, as
+      the managers do.
+
+    Subclasses that declare their own `Meta` should inherit it to keep the index:
 
     Example:
     ```
     class YourModel(BaseModel):
         # Your model fields and methods go here
+
+        class Meta(BaseModel.Meta):
+            db_table = "YourModel"
+            indexes = [*BaseModel.Meta.indexes, models.Index(fields=["title"], name="yourmodel_title_idx")]
     ```
     """
 
-    tracker = FieldTracker()
+    track_changes = True
+    save_with = {}
+
+    objects = BaseManager()
+    all_objects = BaseManager(include_removed=True)
 
     class Meta:
         abstract = True
         ordering = ["created"]
+        indexes = [
+            models.Index(fields=["created", "id"], name="%(class)s_created_idx", condition=models.Q(is_removed=False)),
+            models.Index(fields=["removed_at"], name="%(class)s_removed_idx", condition=models.Q(is_removed=True)),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None and self._saves_changes_only(args, kwargs):
+            update_fields = self._tracker.changed()
+            if not update_fields:
+                return
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            for name in list(update_fields):
+                update_fields.update(self.save_with.get(name, ()))
+            kwargs["update_fields"] = update_fields
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def _has_own_tracker(cls):
+        # A multi-table child inherits the parent's tracker, which does not cover the child's fields.
+        tracker = getattr(cls, "tracker", None)
+        return tracker is not None and tracker.model_class._meta.concrete_model is cls._meta.concrete_model
+
+    def _saves_changes_only(self, args, kwargs):
+        # Only a plain save of a row loaded from (or saved to) the same database.
+        return (
+            self._has_own_tracker()
+            and not args
+            and not self._state.adding
+            and not kwargs.get("force_insert")
+            and not kwargs.get("force_update")
+            and kwargs.get("using", self._state.db) == self._state.db
+        )
+
+    def get_cache_key(self, *parts):
+        """
+        Build a cache key for this row that changes whenever the row is saved.
+
+        The key contains the pk and `modified` (in microseconds), so entries cached for an
+        older version of the row are never read again and simply expire.
+
+        Args:
+        - parts: Extra key components, e.g. the name of the cached value.
+
+        Returns:
+        - str: The cache key, e.g. "core.media:<pk>:<modified>:renditions".
+        """
+        version = int(self.modified.timestamp() * 1_000_000) if self.modified else 0
+        return ":".join([self._meta.label_lower, str(self.pk), str(version), *map(str, parts)])
+
+    def cache_get_or_set(self, name, default, timeout=None, alias="default"):
+        """
+        Return the value cached as `name` for the current version of this row, computing it if missing.
+
+        Args:
+        - name: The name of the cached value.
+        - default: The value to cache, or a callable returning it.
+        - timeout: Seconds to keep the value; defaults to the cache's `TIMEOUT`.
+        - alias: The `CACHES` alias to use.
+
+        Example:
+        ```
+        renditions = media.cache_get_or_set("renditions", lambda: list(media.renditions.values()))
+        ```
+        """
+        cache = caches[alias]
+        if timeout is None:
+            return cache.get_or_set(self.get_cache_key(name), default)
+        return cache.get_or_set(self.get_cache_key(name), default, timeout)
+
+
+@receiver(class_prepared)
+def add_field_tracker(sender, **kwargs):
+    """
+    Give every concrete `BaseModel` its own `FieldTracker`.
+
+    A tracker declared on the abstract model would never be set up, as `class_prepared`
+    is not sent for abstract models.
+    """
+    if not issubclass(sender, BaseModel):
+        return
+    tracker = getattr(sender, "tracker", None)
+    if tracker is None:
+        if not sender.track_changes:
+            return
+        tracker = FieldTracker()
+        tracker.contribute_to_class(sender, "tracker")
+        tracker.finalize_class(sender)
+        # model-utils listens to post_init of every model; only this one needs it.
+        post_init.disconnect(tracker.initialize_tracker)
+    # Proxies and multi-table children inherit the patched save_base, which expects the tracker.
+    post_init.connect(tracker.initialize_tracker, sender=sender)
+
+
+class MediaBlob(BaseModel, models.Model):
+    """
+    This table stores a single copy of every distinct media file when
+    `MEDIA_CONTENT_ADDRESSED` is enabled.
+
+    `Media` rows with identical content share one blob; `ref_count` counts them and
+    the stored file is deleted together with the blob once the last one is gone
+    (see `core.blobs`).
+
+    Columns:
+    - `digest`: Content hash of the file (see `core.blobs.ContentHasher`).
+    - `file`: Storage path of the file.
+    - `size`: Size of the file in bytes.
+    - `ref_count`: Number of `Media` rows pointing at this blob.
+
+    Returns: models.Model.
+    """
+
+    digest = models.CharField(verbose_name=_("Digest"), max_length=64, unique=True, db_column="digest")
+    file = models.FileField(verbose_name=_("File"), max_length=250, db_column="file")
+    size = models.PositiveBigIntegerField(verbose_name=_("Size"), db_column="size")
+    ref_count = models.PositiveIntegerField(verbose_name=_("Reference Count"), default=0, db_column="ref_count")
+
+    # Deleted by core.blobs.release_blob once nothing references the blob.
+    soft_delete = False
+
+    def __str__(self):
+        return self.digest
+
+    class Meta(BaseModel.Meta):
+        verbose_name = "Media Blob"
+        verbose_name_plural = "Media Blobs"
+        db_table = "MediaBlob"
 
 
 class Media(BaseModel, models.Model):
@@ -70,6 +312,9 @@ class Media(BaseModel, models.Model):
     Columns:
     - `filepath`: A string representing the path of the media file.
     - `mediatype`: A string representing the type of media (e.g. image, video, audio).
+    - `blob`: The shared `MediaBlob` holding the file, when `MEDIA_CONTENT_ADDRESSED` is enabled.
+    - `width`, `height`: Dimensions in pixels of an image or video, filled in by background processing.
+    - `duration`: Duration in seconds of a video, filled in by background processing.
 
     Returns: models.Model.
     """
@@ -92,11 +337,182 @@ class Media(BaseModel, models.Model):
         choices=MEDIA_TYPE_CHOICE,
         default="image",
     )
+    blob = models.ForeignKey(
+        MediaBlob,
+        verbose_name=_("Blob"),
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        db_column="blob",
+        related_name="media",
+    )
+    width = models.PositiveIntegerField(verbose_name=_("Width"), null=True, blank=True, db_column="width")
+    height = models.PositiveIntegerField(verbose_name=_("Height"), null=True, blank=True, db_column="height")
+    duration = models.FloatField(verbose_name=_("Duration"), null=True, blank=True, db_column="duration")
+
+    # core.signals.deduplicate_media_file points a new file at its blob in pre_save.
+    save_with = {"file_path": ["blob"]}
 
     def __str__(self):
         return str(self.file_path)
 
-    class Meta:
+    class Meta(BaseModel.Meta):
         verbose_name = "Media"
         verbose_name_plural = "Media"
         db_table = "Media"
+
+
+def rendition_upload_path(instance, filename):
+    """
+    Generate the file path of a rendition, e.g. `mediarendition/<media id>/thumbnail.webp`.
+
+    Args:
+    - instance: The `MediaRendition` the file is attached to.
+    - filename: The filename of the rendition.
+
+    Returns:
+    - str: The file path.
+    """
+    return os.path.join("mediarendition", instance.media_id.hex, filename)
+
+
+class MediaRendition(BaseModel, models.Model):
+    """
+    This table stores the derivatives (e.g. thumbnails) generated for an image `Media`.
+
+    Renditions are created in the background (see `core.jobs`) for every size configured
+    in `MEDIA_RENDITIONS["SIZES"]`, so clients can download a small version instead of
+    the original file.
+
+    Columns:
+    - `media`: The media the rendition was generated from.
+    - `name`: Name of the configured size (e.g. thumbnail, small, medium).
+    - `file`: The rendition file.
+    - `width`, `height`: Dimensions of the rendition in pixels.
+
+    Returns: models.Model.
+    """
+
+    media = models.ForeignKey(
+        Media,
+        verbose_name=_("Media"),
+        on_delete=models.CASCADE,
+        db_column="media",
+        related_name="renditions",
+    )
+    name = models.CharField(verbose_name=_("Name"), max_length=50, db_column="name")
+    file = models.FileField(verbose_name=_("File"), upload_to=rendition_upload_path, db_column="file")
+    width = models.PositiveIntegerField(verbose_name=_("Width"), db_column="width")
+    height = models.PositiveIntegerField(verbose_name=_("Height"), db_column="height")
+
+    # Renditions are regenerated from their media and deleted with it.
+    soft_delete = False
+
+    def __str__(self):
+        return f"{self.media_id} ({self.name})"
+
+    class Meta(BaseModel.Meta):
+        verbose_name = "Media Rendition"
+        verbose_name_plural = "Media Renditions"
+        db_table = "MediaRendition"
+        constraints = [models.UniqueConstraint(fields=["media", "name"], name="mediarendition_media_name_uniq")]
+
+
+class MediaUpload(BaseModel, models.Model):
+    """
+    This table tracks resumable, chunked uploads that end up as a `Media` row.
+
+    Chunks are streamed into a staging file (see `core.uploads`) and `offset` records
+    how many bytes have been received so far. Once `offset` reaches `size` the staged
+    file is moved into storage and `media` points at the created `Media` row.
+
+    Columns:
+    - `user`: The user who started the upload.
+    - `title`: Title of the resulting media.
+    - `media_type`: Type of the resulting media (e.g. image, video, document).
+    - `filename`: Original filename, used for the storage path extension.
+    - `size`: Total size of the upload in bytes.
+    - `offset`: Number of bytes received so far.
+    - `block_hashes`: Hex digests of every complete 4 MiB block received so far, used to
+      compute the content hash without re-reading the file (see `core.blobs`).
+    - `media`: The created `Media` row once the upload is complete.
+
+    Returns: models.Model.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name=_("User"),
+        on_delete=models.CASCADE,
+        db_column="user",
+        related_name="media_uploads",
+    )
+    title = models.CharField(verbose_name=_("Title"), max_length=250, db_column="title", blank=True)
+    media_type = models.CharField(
+        verbose_name=_("Media Type"),
+        max_length=250,
+        db_column="media_type",
+        choices=Media.MEDIA_TYPE_CHOICE,
+        default="image",
+    )
+    filename = models.CharField(verbose_name=_("Filename"), max_length=250, db_column="filename")
+    size = models.PositiveBigIntegerField(verbose_name=_("Size"), db_column="size")
+    offset = models.PositiveBigIntegerField(verbose_name=_("Offset"), default=0, db_column="offset")
+    block_hashes = models.TextField(verbose_name=_("Block Hashes"), blank=True, default="", db_column="block_hashes")
+    media = models.OneToOneField(
+        Media,
+        verbose_name=_("Media"),
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_column="media",
+        related_name="upload",
+    )
+
+    # A discarded upload has no data worth keeping.
+    soft_delete = False
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    @property
+    def is_complete(self):
+        return self.offset >= self.size
+
+    class Meta(BaseModel.Meta):
+        verbose_name = "Media Upload"
+        verbose_name_plural = "Media Uploads"
+        db_table = "MediaUpload"
+
+
+class ArchivedRow(models.Model):
+    """
+    This table is the cold storage of rows soft-deleted long ago, moved here by
+    `core.archive` so that the live tables and their indexes stay small.
+
+    `data` holds the row in Django's "python" serialization format, so it is restored
+    with `next(serializers.deserialize("python", [archived.data])).save()`.
+
+    Columns:
+    - `source_table`: Table the row was moved from.
+    - `object_id`: Primary key of the row.
+    - `data`: The serialized row.
+    - `archived_at`: When the row was moved.
+
+    Returns: models.Model.
+    """
+
+    source_table = models.CharField(verbose_name=_("Source Table"), max_length=63, db_column="source_table")
+    object_id = models.CharField(verbose_name=_("Object ID"), max_length=64, db_column="object_id")
+    data = models.JSONField(verbose_name=_("Data"), encoder=DjangoJSONEncoder, db_column="data")
+    archived_at = models.DateTimeField(verbose_name=_("Archived At"), default=now, db_column="archived_at")
+
+    def __str__(self):
+        return f"{self.source_table} {self.object_id}"
+
+    class Meta:
+        verbose_name = "Archived Row"
+        verbose_name_plural = "Archived Rows"
+        db_table = "ArchivedRow"
+        indexes = [models.Index(fields=["source_table", "object_id"], name="archivedrow_source_idx")]
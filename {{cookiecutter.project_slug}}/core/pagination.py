@@ -0,0 +1,200 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from uuid import UUID
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Return the planner's row estimate for `queryset` instead of running a `COUNT(*)`.
+
+    On PostgreSQL the estimate comes from the table statistics (`pg_class.reltuples` and
+    column statistics, kept current by autovacuum/ANALYZE), so it costs the same for any
+    table size. Other databases fall back to an exact count.
+    """
+    queryset = queryset.order_by()
+    if connections[queryset.db].vendor != "postgresql":
+        return queryset.count()
+    plan = json.loads(queryset.explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on `(created, id)` for `BaseModel` subclasses.
+
+    Each page is fetched with
+    `WHERE created >= <last created> AND (created > <last created> OR id > <last id>) LIMIT n`
+    (the inequalities flip for descending or backward pages). The leading `created >=` bound
+    lets the `(created, id)` index of `BaseModel` answer it with a single index range scan,
+    and the `OR` drops the rows of the previous pages that share the boundary `created`.
+    Unlike `PageNumberPagination` there is no `COUNT(*)` and no `OFFSET`, so page 1000
+    costs the same as page 1. The cursor encodes the position itself, which keeps pages
+    stable while rows are inserted.
+
+    A total is only returned when requested with `?count=1`, and is the estimate from
+    `estimate_count`.
+
+    Example:
+    ```
+    class MediaViewSet(viewsets.ReadOnlyModelViewSet):
+        queryset = Media.objects.prefetch_related("renditions")
+        serializer_class = MediaSerializer
+        pagination_class = KeysetPagination
+    ```
+    """
+
+    cursor_query_param = "cursor"
+    cursor_query_description = _("The pagination cursor value.")
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    page_size_query_description = _("Number of results to return per page.")
+    max_page_size = 100
+    count_query_param = "count"
+    count_query_description = _("Include an estimated total count.")
+    invalid_cursor_message = _("Invalid cursor")
+
+    # Ordering field and tie-breaker; prefix the field with "-" for newest first.
+    ordering = "created"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        cursor = self.decode_cursor(request)
+        self.count = estimate_count(queryset) if self.get_count_requested(request) else None
+
+        field = self.ordering.lstrip("-")
+        descending = self.ordering.startswith("-")
+        reverse = cursor is not None and cursor["reverse"]
+        if reverse:
+            descending = not descending
+
+        if cursor is not None:
+            lookup = "lt" if descending else "gt"
+            value = cursor["value"]
+            queryset = queryset.filter(**{f"{field}__{lookup}e": value}).filter(
+                Q(**{f"{field}__{lookup}": value}) | Q(**{f"pk__{lookup}": cursor["pk"]})
+            )
+
+        prefix = "-" if descending else ""
+        results = list(queryset.order_by(f"{prefix}{field}", f"{prefix}pk")[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.first = results[0] if results else None
+        self.last = results[-1] if results else None
+        return results
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                value = int(request.query_params[self.page_size_query_param])
+            except (KeyError, ValueError):
+                pass
+            else:
+                if value > 0:
+                    return min(value, self.max_page_size) if self.max_page_size else value
+        return self.page_size
+
+    def get_count_requested(self, request):
+        return request.query_params.get(self.count_query_param, "").lower() in ("1", "true", "yes")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            value = data["v"]
+            if self.ordering.lstrip("-") in ("created", "modified"):
+                value = parse_datetime(value)
+            if value is None:
+                raise ValueError
+            return {"value": value, "pk": UUID(data["pk"]), "reverse": bool(data.get("r"))}
+        except (AttributeError, TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, reverse):
+        value = getattr(instance, self.ordering.lstrip("-"))
+        data = {"v": value.isoformat() if hasattr(value, "isoformat") else value, "pk": str(instance.pk)}
+        if reverse:
+            data["r"] = 1
+        encoded = urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode("ascii")).decode("ascii")
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self.last, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first is None:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.first, reverse=True)
+
+    def get_paginated_response(self, data):
+        response = OrderedDict([("next", self.get_next_link()), ("previous", self.get_previous_link())])
+        if self.count is not None:
+            response["count"] = self.count
+        response["results"] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "count": {"type": "integer", "description": "Estimated total, only with ?count=1."},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": str(self.cursor_query_description),
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": str(self.page_size_query_description),
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": str(self.count_query_description),
+                "schema": {"type": "boolean"},
+            },
+        ]
@@ -1,7 +1,35 @@
 from rest_framework import permissions
 
 
-class IsOwnerOrAdminOnly(permissions.IsAuthenticated):
+class AsyncPermissionMixin:
+    """
+    Give a permission class the async checks used by `core.views.AsyncAPIView`.
+
+    The default implementations call the sync checks directly, so this mixin must only
+    be applied to permissions that do no I/O. Permissions that query the database
+    should override `ahas_permission` / `ahas_object_permission` with async ORM calls.
+    """
+
+    async def ahas_permission(self, request, view):
+        return self.has_permission(request, view)
+
+    async def ahas_object_permission(self, request, view, obj):
+        return self.has_object_permission(request, view, obj)
+
+
+class IsAuthenticated(AsyncPermissionMixin, permissions.IsAuthenticated):
+    """
+    Allows access only to authenticated users, usable from sync and async views.
+    """
+
+
+class IsAdminUser(AsyncPermissionMixin, permissions.IsAdminUser):
+    """
+    Allows access only to admin users, usable from sync and async views.
+    """
+
+
+class IsOwnerOrAdminOnly(IsAuthenticated):
     """
     Custom permission to only allow owners of an object and administrators to view or edit it.
     """
@@ -0,0 +1,114 @@
+import time
+from contextvars import ContextVar
+
+_collectors = ContextVar("query_collectors", default=())
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised when a block or request runs more (or slower, or more repeated) queries than its budget.
+    """
+
+
+class QueryCollector:
+    """
+    Count the queries, their total time and how often each SQL statement repeats.
+
+    Statements are compared with their parameters left out, so the same query run once
+    per row of a list (an N+1) shows up as one statement with a high count.
+    """
+
+    __slots__ = ("count", "duration", "statements", "token")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = {}
+        self.token = None
+
+    def __enter__(self):
+        self.token = _collectors.set((*_collectors.get(), self))
+        return self
+
+    def __exit__(self, *exc_info):
+        _collectors.reset(self.token)
+
+    def add(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        self.statements[sql] = self.statements.get(sql, 0) + 1
+
+    def duplicates(self, max_repeats):
+        """
+        Return the `(sql, count)` of the statements run more than `max_repeats` times, most repeated first.
+        """
+        repeated = [(sql, count) for sql, count in self.statements.items() if count > max_repeats]
+        return sorted(repeated, key=lambda item: item[1], reverse=True)
+
+    def check(self, max_queries=None, max_time=None, max_duplicates=None):
+        """
+        Return a description of every limit exceeded; `max_time` is in milliseconds, `None` disables a limit.
+        """
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f"{self.count} queries (budget {max_queries})")
+        if max_time is not None and self.duration * 1000 > max_time:
+            problems.append(f"{self.duration * 1000:.1f}ms in the database (budget {max_time}ms)")
+        if max_duplicates is not None:
+            for sql, count in self.duplicates(max_duplicates):
+                problems.append(f"possible N+1, {count} times: {sql}")
+        return problems
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper timing the query into the active `QueryCollector`s, installed on every connection.
+    """
+    collectors = _collectors.get()
+    if not collectors:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        for collector in collectors:
+            collector.add(sql, duration)
+
+
+def collect_queries():
+    """
+    Collect the queries run inside the block, on every database alias.
+
+    Blocks nest: each one collects every query run inside it.
+
+    Example:
+    ```
+    with collect_queries() as queries:
+        list(Media.objects.all())
+    print(queries.count, queries.duration)
+    ```
+    """
+    return QueryCollector()
+
+
+def query_budget(max_queries=None, max_time=None, max_duplicates=None):
+    """
+    Override the `QUERY_BUDGET` limits for a view function or class.
+
+    Limits left as `None` keep the value from settings.
+
+    Example:
+    ```
+    @query_budget(max_queries=100)
+    class ReportViewSet(viewsets.ReadOnlyModelViewSet):
+        ...
+    ```
+    """
+    overrides = {"MAX_QUERIES": max_queries, "MAX_TIME": max_time, "MAX_DUPLICATES": max_duplicates}
+
+    def decorator(view):
+        view.query_budget = {key: value for key, value in overrides.items() if value is not None}
+        return view
+
+    return decorator
@@ -0,0 +1,146 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+REPLICA_PREFIX = "replica_"
+
+_state = ContextVar("replica_routing_state", default=None)
+
+
+class RoutingState:
+    """
+    Per-request routing state; `pinned` sends every read to the primary.
+    """
+
+    __slots__ = ("pinned", "written")
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.written = False
+
+
+@contextmanager
+def use_replicas(pinned=False):
+    """
+    Allow reads inside the block to go to a replica until the first write.
+
+    `core.middleware.ReplicaPinningMiddleware` opens this scope for every request. Outside
+    of it (management commands, rq jobs, shells) every query goes to the primary, so code
+    that reads right after writing is never surprised by replication lag.
+
+    Example:
+    ```
+    with use_replicas():
+        report = build_report(Media.objects.all())
+    ```
+    """
+    state = RoutingState(pinned=pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def pin_primary():
+    """
+    Send every further read of the current request or `use_replicas` block to the primary.
+    """
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+        state.written = True
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+class ReplicaLagMonitor:
+    """
+    Cache the replication lag of each replica for `DATABASE_REPLICA["LAG_CHECK_INTERVAL"]` seconds.
+
+    Lag is read from `pg_last_xact_replay_timestamp()`; a replica that has replayed
+    everything it received reports 0 even when the primary has been idle. A replica that
+    cannot be queried counts as infinitely lagging until the next check.
+    """
+
+    query = """
+        SELECT CASE
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lags = {}
+
+    def lag(self, alias):
+        interval = settings.DATABASE_REPLICA["LAG_CHECK_INTERVAL"]
+        current = time.monotonic()
+        with self.lock:
+            cached = self.lags.get(alias)
+        if cached is not None and current - cached[1] < interval:
+            return cached[0]
+
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(self.query)
+                lag = float(cursor.fetchone()[0] or 0)
+        except DatabaseError:
+            lag = float("inf")
+        with self.lock:
+            self.lags[alias] = (lag, current)
+        return lag
+
+    def healthy(self, aliases):
+        max_lag = settings.DATABASE_REPLICA["MAX_LAG"]
+        return [alias for alias in aliases if self.lag(alias) <= max_lag]
+
+
+lag_monitor = ReplicaLagMonitor()
+
+
+class ReplicaRouter:
+    """
+    Route reads to the replicas configured with `DATABASE_REPLICA_HOSTS` and writes to `default`.
+
+    Reads only go to a replica inside a `use_replicas` scope (every request, through
+    `core.middleware.ReplicaPinningMiddleware`) and only while:
+
+    - nothing has been written in that scope yet (read-your-writes within a request),
+    - the client is not pinned by the cookie set after a write in an earlier request,
+    - no transaction is open on `default`,
+    - the replica lags by less than `DATABASE_REPLICA["MAX_LAG"]` seconds.
+
+    Otherwise the read falls back to the primary.
+    """
+
+    def __init__(self):
+        self.replicas = replica_aliases()
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.pinned or not self.replicas:
+            return "default"
+        if connections["default"].in_atomic_block:
+            return "default"
+        healthy = lag_monitor.healthy(self.replicas)
+        return random.choice(healthy) if healthy else "default"
+
+    def db_for_write(self, model, **hints):
+        pin_primary()
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {"default", *self.replicas}
+        return obj1._state.db in aliases and obj2._state.db in aliases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return not db.startswith(REPLICA_PREFIX)
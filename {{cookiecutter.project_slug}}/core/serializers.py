@@ -1,10 +1,22 @@
+import copy
 from datetime import datetime
 
-from rest_framework import serializers
-from rest_framework.fields import FileField
-from rest_framework.serializers import ModelSerializer, Serializer, ValidationError
+from django.conf import settings
+from django.db import models
 
-from core.models import Media
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import Field, FileField, SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+from rest_framework.serializers import (
+    LIST_SERIALIZER_KWARGS,
+    ListSerializer,
+    ModelSerializer,
+    Serializer,
+    ValidationError,
+)
+
+from core.models import Media, MediaUpload
 
 
 class BaseSerializer(Serializer):
@@ -27,6 +39,27 @@ class BaseSerializer(Serializer):
     ...
 
 
+class FastListSerializer(ListSerializer):
+    """
+    `many=True` serializer for `BaseModelSerializer` that renders rows through the
+    child's precomputed representation plan.
+
+    The plan is resolved once per list instead of walking the bound fields for every
+    row. Children that override `to_representation` still get their override called
+    per row, on top of the plan-based base implementation.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        child = self.child
+        if type(child).to_representation is not BaseModelSerializer.to_representation:
+            return [child.to_representation(item) for item in iterable]
+
+        plan = child.get_representation_plan()
+        represent = child.represent
+        return [represent(item, plan) for item in iterable]
+
+
 class BaseModelSerializer(ModelSerializer):
     """
     Base model serializer class for common functionality and customization.
@@ -37,6 +70,15 @@ class BaseModelSerializer(ModelSerializer):
     to model serializers. Subclasses inheriting from this class can benefit from a
     consistent structure and behavior across serializers that deal with Django models.
 
+    Two things keep serializing many rows cheap:
+
+    - The fields built by `ModelSerializer` introspection are cached per class, so a new
+      serializer instance only clones them. Set `cache_fields = False` on serializers
+      whose `get_fields` depends on the instance, context or request.
+    - `to_representation` reads rows through a plan resolved once per serializer
+      instance, reading plain model columns with `getattr`, and `many=True` uses
+      `FastListSerializer` unless `Meta.list_serializer_class` is set.
+
     Example:
     ```
     class CustomModelSerializer(BaseModelSerializer):
@@ -44,7 +86,126 @@ class BaseModelSerializer(ModelSerializer):
     ```
     """
 
-    ...
+    cache_fields = True
+
+    _fields_cache = {}
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        if getattr(getattr(cls, "Meta", None), "list_serializer_class", None) is not None:
+            return super().many_init(*args, **kwargs)
+
+        # Same as `Serializer.many_init`, defaulting to `FastListSerializer`.
+        list_kwargs = {}
+        for key in ("allow_empty", "max_length", "min_length"):
+            value = kwargs.pop(key, None)
+            if value is not None:
+                list_kwargs[key] = value
+        list_kwargs["child"] = cls(*args, **kwargs)
+        list_kwargs.update({key: value for key, value in kwargs.items() if key in LIST_SERIALIZER_KWARGS})
+        return FastListSerializer(*args, **list_kwargs)
+
+    def get_fields(self):
+        if not self.cache_fields:
+            return super().get_fields()
+
+        fields = self._fields_cache.get(type(self))
+        if fields is None:
+            fields = self._fields_cache[type(self)] = super().get_fields()
+        # Fields are bound to their serializer, so every instance gets its own copies.
+        return copy.deepcopy(fields)
+
+    def get_representation_plan(self):
+        """
+        Return `(field_name, attname, get_attribute, to_representation)` for every readable field.
+
+        `attname` is set for fields reading a single concrete, non-relational model column
+        through the default `Field.get_attribute`; those are read with a plain `getattr`.
+        """
+        plan = self.__dict__.get("_representation_plan")
+        if plan is None:
+            model = getattr(getattr(self, "Meta", None), "model", None)
+            columns = set()
+            if model is not None:
+                columns = {field.attname for field in model._meta.concrete_fields if not field.is_relation}
+            plan = []
+            for field in self._readable_fields:
+                simple = (
+                    type(field).get_attribute is Field.get_attribute
+                    and len(field.source_attrs) == 1
+                    and field.source_attrs[0] in columns
+                )
+                attname = field.source_attrs[0] if simple else None
+                plan.append((field.field_name, attname, field.get_attribute, self.get_field_representation(field)))
+            self._representation_plan = plan
+        return plan
+
+    def get_field_representation(self, field):
+        """
+        Return the callable converting attribute values of `field` to primitives.
+
+        ISO 8601 `DateTimeField`s, e.g. `created` and `modified` on every `BaseModel`, resolve
+        their timezone once per plan instead of once per value. Everything else uses
+        `field.to_representation`.
+        """
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        if type(field) is not serializers.DateTimeField or output_format is None or output_format.lower() != ISO_8601:
+            return field.to_representation
+
+        field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+        if field_timezone is None:
+            return field.to_representation
+
+        def to_representation(value):
+            if type(value) is not datetime or value.tzinfo is None:
+                return field.to_representation(value)
+            value = value.astimezone(field_timezone).isoformat()
+            return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+        return to_representation
+
+    def represent(self, instance, plan):
+        ret = {}
+        for field_name, attname, get_attribute, to_representation in plan:
+            if attname is not None:
+                attribute = getattr(instance, attname)
+            else:
+                try:
+                    attribute = get_attribute(instance)
+                except SkipField:
+                    continue
+
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            ret[field_name] = None if check_for_none is None else to_representation(attribute)
+        return ret
+
+    def to_representation(self, instance):
+        return self.represent(instance, self.get_representation_plan())
+
+
+class RenditionsField(Field):
+    """
+    Read-only field mapping the size names of the renditions of a media to their URL and dimensions.
+
+    It is a plain field of the representation plan, reading `renditions.all()`, so
+    queryset views should `prefetch_related("renditions")` to fetch every rendition of a
+    page in one query.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get("request")
+        return {
+            rendition.name: {
+                "url": request.build_absolute_uri(rendition.file.url) if request else rendition.file.url,
+                "width": rendition.width,
+                "height": rendition.height,
+            }
+            for rendition in value.all()
+        }
 
 
 class MediaSerializer(BaseModelSerializer):
@@ -66,8 +227,11 @@ class MediaSerializer(BaseModelSerializer):
     Attributes:
     - `model`: Specifies the associated model for the serializer.
     - `fields`: A string indicating that all fields of the associated model should be included.
+    - `renditions`: The URLs of the generated renditions, keyed by size name (see `RenditionsField`).
     """
 
+    renditions = RenditionsField()
+
     class Meta:
         model = Media
         fields = "__all__"
@@ -77,18 +241,34 @@ class MediaSerializer(BaseModelSerializer):
             raise ValidationError("Invalid media type.")
         return value
 
-    def create(self, validated_data):
-        file_path = validated_data.pop("file_path")
-        instance = super().create(validated_data)
-        instance.file_path.save(file_path.name, file_path)
-        return instance
 
-    def update(self, instance, validated_data):
-        file_path = validated_data.pop("file_path", None)
-        instance = super().update(instance, validated_data)
-        if file_path is not None:
-            instance.file_path.save(file_path.name, file_path)
-        return instance
+class MediaUploadSerializer(BaseModelSerializer):
+    """
+    Serializer for the MediaUpload model.
+
+    Used to start a resumable chunked upload and to report its progress. `offset` tells
+    the client where to resume, and `media` holds the serialized `Media` once the last
+    chunk has been received.
+
+    Example:
+    ```
+    serializer = MediaUploadSerializer(data={"filename": "clip.mp4", "size": 104857600, "media_type": "video"})
+    serializer.is_valid(raise_exception=True)
+    upload = serializer.save(user=request.user)
+    ```
+    """
+
+    media = MediaSerializer(read_only=True)
+
+    class Meta:
+        model = MediaUpload
+        fields = ["id", "title", "media_type", "filename", "size", "offset", "media", "created"]
+        read_only_fields = ["offset"]
+
+    def validate_size(self, value):
+        if value > settings.MEDIA_UPLOAD["MAX_SIZE"]:
+            raise ValidationError("Upload is larger than the maximum upload size.")
+        return value
 
 
 class MediaFileField(FileField):
@@ -112,9 +292,11 @@ class MediaFileField(FileField):
     def to_representation(self, value):
         if not value:
             return None
-        # Return serialized data of the existing Media object
-        media_serializer = MediaSerializer(value)
-        return media_serializer.data
+        # Return serialized data of the existing Media object, reusing one serializer for every row
+        media_serializer = self.__dict__.get("_media_serializer")
+        if media_serializer is None:
+            media_serializer = self._media_serializer = MediaSerializer(context=self.context)
+        return media_serializer.to_representation(value)
 
 
 class UnixTimestampField(serializers.Field):
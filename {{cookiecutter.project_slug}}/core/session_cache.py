@@ -0,0 +1,220 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from core.metrics import cache_requests
+from users.models.user import UserSession
+
+
+class LocalLRUCache:
+    """
+    Bounded, thread-safe in-process LRU cache with a per-entry time to live.
+
+    Entries are evicted in least-recently-used order once `maxsize` is reached and
+    are treated as missing once they are older than `ttl` seconds. A `maxsize` or
+    `ttl` of zero disables the cache entirely.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expire_at, value = entry
+            if expire_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SessionCache:
+    """
+    Resolve JWT session ids to `UserSession` instances with their `user` preloaded.
+
+    Lookups go through three tiers: an optional bounded in-process LRU, an optional
+    shared Django cache (e.g. Redis) and finally a single `select_related` query on
+    the primary. Both cache tiers use short TTLs and are invalidated explicitly
+    whenever a session or its user changes (see `users.signals`).
+
+    An invalidation replaces the shared entry with a tombstone for `TTL` seconds, and a
+    lookup only fills the shared tier with `add()`, so a lookup that read the row before
+    a revocation committed cannot write it back over the tombstone. Every process
+    therefore sees a revocation as soon as it is committed.
+
+    The local tier is per process: other workers keep a revoked entry for up to
+    `LOCAL_TTL` seconds. It is therefore off by default; enable it only where that
+    window is acceptable.
+
+    Example:
+    ```
+    session = session_cache.get(session_id)
+    user = session.user
+    ```
+    """
+
+    key_prefix = "user-session"
+    # Stored by `invalidate()` in place of a session; lookups treat it as a miss.
+    tombstone = "invalidated"
+
+    def __init__(self, maxsize=10000, local_ttl=0, cache_alias=None, ttl=60):
+        self.local = LocalLRUCache(maxsize, local_ttl)
+        self.cache_alias = cache_alias or None
+        self.ttl = ttl
+        # Bumped on every invalidation so that a lookup racing with an invalidation
+        # never writes the stale row it read back into the local tier.
+        self._generation = 0
+
+    @classmethod
+    def from_settings(cls):
+        options = getattr(settings, "USER_SESSION_CACHE", {})
+        return cls(
+            maxsize=options.get("MAXSIZE", 10000),
+            local_ttl=options.get("LOCAL_TTL", 0),
+            cache_alias=options.get("CACHE_ALIAS"),
+            ttl=options.get("TTL", 60),
+        )
+
+    @property
+    def shared(self):
+        if self.cache_alias is None:
+            return None
+        return caches[self.cache_alias]
+
+    def make_key(self, session_id):
+        return f"{self.key_prefix}:{session_id}"
+
+    def get_queryset(self):
+        # Always the primary: a lagging replica could still return a session revoked moments
+        # ago, or miss one created moments ago, and the row would then be cached for TTL.
+        return UserSession.objects.using(DEFAULT_DB_ALIAS).select_related("user")
+
+    def get(self, session_id):
+        """
+        Return the `UserSession` for `session_id`, raising `UserSession.DoesNotExist` if missing.
+        """
+        key = str(session_id)
+        generation = self._generation
+
+        value = self.local.get(key)
+        if value is not None:
+            cache_requests.inc("user_session", "hit")
+            return pickle.loads(value)
+
+        shared = self.shared
+        if shared is not None:
+            session = shared.get(self.make_key(key))
+            if session is not None and session != self.tombstone:
+                cache_requests.inc("user_session", "hit")
+                self._set_local(key, session, generation)
+                return session
+
+        cache_requests.inc("user_session", "miss")
+        session = self.get_queryset().get(id=session_id)
+        if shared is not None:
+            shared.add(self.make_key(key), session, self.ttl)
+        self._set_local(key, session, generation)
+        return session
+
+    async def aget(self, session_id):
+        """
+        Async counterpart of `get` using the async cache and ORM APIs.
+
+        A hit in the local tier is served on the event loop. On Django 4.2 `BaseCache.aget`
+        and `QuerySet.aget` are `sync_to_async(thread_sensitive=True)` wrappers, so the
+        shared tier and the database are still queried in a thread, one hop per call.
+        """
+        key = str(session_id)
+        generation = self._generation
+
+        value = self.local.get(key)
+        if value is not None:
+            cache_requests.inc("user_session", "hit")
+            return pickle.loads(value)
+
+        shared = self.shared
+        if shared is not None:
+            session = await shared.aget(self.make_key(key))
+            if session is not None and session != self.tombstone:
+                cache_requests.inc("user_session", "hit")
+                self._set_local(key, session, generation)
+                return session
+
+        cache_requests.inc("user_session", "miss")
+        session = await self.get_queryset().aget(id=session_id)
+        if shared is not None:
+            await shared.aadd(self.make_key(key), session, self.ttl)
+        self._set_local(key, session, generation)
+        return session
+
+    def _set_local(self, key, session, generation):
+        if generation == self._generation:
+            self.local.set(key, pickle.dumps(session, pickle.HIGHEST_PROTOCOL))
+
+    def invalidate(self, *session_ids):
+        """
+        Drop the given sessions from the local tier and tombstone them in the shared tier.
+        """
+        keys = [str(session_id) for session_id in session_ids]
+        if not keys:
+            return
+        self._generation += 1
+        for key in keys:
+            self.local.delete(key)
+        shared = self.shared
+        if shared is not None:
+            shared.set_many({self.make_key(key): self.tombstone for key in keys}, self.ttl)
+
+    def invalidate_user(self, *users):
+        """
+        Drop every cached session belonging to `users`.
+        """
+        session_ids = UserSession.objects.filter(user__in=users).values_list("id", flat=True)
+        self.invalidate(*session_ids)
+
+    def invalidate_on_commit(self, *session_ids):
+        transaction.on_commit(lambda: self.invalidate(*session_ids))
+
+    def invalidate_user_on_commit(self, *users):
+        transaction.on_commit(lambda: self.invalidate_user(*users))
+
+    def clear(self):
+        self._generation += 1
+        self.local.clear()
+
+
+session_cache = SessionCache.from_settings()
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.blobs import attach_blob, release_blob
+from core.cache import bump_generation_on_commit, tracked_models
+from core.managers import post_bulk_save
+from core.models import Media, MediaRendition
+from core.queries import record_query
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Let `core.queries.collect_queries` see the queries of every new database connection.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(pre_save, sender=Media)
+def deduplicate_media_file(sender, instance, raw=False, **kwargs):
+    """
+    Store a newly assigned media file content-addressed when `MEDIA_CONTENT_ADDRESSED` is enabled.
+    """
+    if raw or not settings.MEDIA_CONTENT_ADDRESSED:
+        return
+    if instance.file_path and not instance.file_path._committed:
+        attach_blob(instance)
+
+
+@receiver(post_delete, sender=Media)
+def release_media_blob(sender, instance, **kwargs):
+    """
+    Drop the reference of a deleted media row to its blob.
+
+    A soft-deleted media keeps its reference, so `restore()` brings it back with its file;
+    the blob is released when `core.archive` deletes the row for good.
+    """
+    if instance.blob_id is not None:
+        release_blob(instance.blob_id)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+@receiver(post_bulk_save)
+def invalidate_cached_responses(sender, **kwargs):
+    """
+    Bump the cache generation of models tracked by `core.cache.track_model` once a change is committed.
+    """
+    label = sender._meta.label_lower
+    if label in tracked_models:
+        bump_generation_on_commit(label)
+
+
+@receiver(post_delete, sender=MediaRendition)
+def delete_rendition_file(sender, instance, **kwargs):
+    """
+    Delete the file of a rendition once its deletion is committed.
+    """
+    if instance.file:
+        storage, name = instance.file.storage, instance.file.name
+        transaction.on_commit(lambda: storage.delete(name))
+{%- if cookiecutter.use_django_rq == "y" %}
+
+
+@receiver(post_save, sender=Media)
+def process_saved_media(sender, instance, created, raw=False, **kwargs):
+    """
+    Queue metadata extraction and renditions for a new file once it is committed.
+
+    The tracker still holds the values from before the save while post_save runs.
+    """
+    if raw or not settings.MEDIA_RENDITIONS["ENABLED"]:
+        return
+    if created or instance.tracker.has_changed("file_path"):
+        from core.jobs import enqueue_process_media
+
+        transaction.on_commit(lambda: enqueue_process_media(instance.pk))
+{%- endif %}
@@ -0,0 +1,66 @@
+from contextlib import contextmanager
+{%- if cookiecutter.use_django_rq == "y" %}
+from datetime import timedelta
+
+from django.utils.timezone import now
+from rq import SimpleWorker
+{%- endif %}
+
+from core.queries import QueryBudgetExceeded, collect_queries
+from users.models.user import User
+
+
+@contextmanager
+def assert_query_budget(max_queries=None, max_time=None, max_duplicates=None):
+    """
+    Fail the test when the block exceeds the given query count, database time (ms) or statement repeats.
+
+    Unlike `assertNumQueries` the count is an upper bound, and an N+1 is reported with
+    the repeated SQL even while the total stays within budget.
+
+    Example:
+    ```
+    def test_list_media(self):
+        with assert_query_budget(max_queries=5, max_duplicates=1):
+            self.client.get("/api/v1/media/")
+    ```
+    """
+    with collect_queries() as collector:
+        yield collector
+    problems = collector.check(max_queries, max_time, max_duplicates)
+    if problems:
+        raise QueryBudgetExceeded("Query budget exceeded: " + "; ".join(problems))
+
+
+def make_user(name, **fields):
+    """
+    Save a user with the password "password", deriving the login field and email from `name`.
+
+    Returns:
+    - User: The saved user.
+    """
+    fields.setdefault("email", f"{name}@example.com")
+    fields.setdefault(User.USERNAME_FIELD, fields["email"] if User.USERNAME_FIELD == "email" else name)
+    user = User(**fields)
+    user.set_password("password")
+    user.save()
+    return user
+{%- if cookiecutter.use_django_rq == "y" %}
+
+
+def run_scheduled_jobs(queue):
+    """
+    Move every scheduled job of `queue` to the queue, whatever its due time, and work them off.
+
+    Returns:
+    - list: The ids of the jobs that ran.
+    """
+    registry = queue.scheduled_job_registry
+    job_ids = registry.get_jobs_to_schedule(timestamp=int((now() + timedelta(days=365)).timestamp()))
+    for job_id in job_ids:
+        job = queue.fetch_job(job_id)
+        registry.remove(job)
+        queue.enqueue_job(job)
+    SimpleWorker([queue], connection=queue.connection).work(burst=True)
+    return job_ids
+{%- endif %}
@@ -1,3 +1,1376 @@
-from django.test import TestCase
+{% if cookiecutter.use_drf == "y" and cookiecutter.use_simple_jwt == "y" %}import asyncio
+{% endif %}import json
+import logging
+{% if cookiecutter.use_django_rq == "y" %}import multiprocessing
+{% endif %}import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from base64 import urlsafe_b64encode
+{% if cookiecutter.use_drf == "y" %}from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+{% else %}from datetime import timedelta
+{% endif %}from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+from uuid import uuid4
 
-# Create your tests here.
+{% if cookiecutter.use_drf == "y" and cookiecutter.use_simple_jwt == "y" %}from asgiref.sync import async_to_sync
+{% endif %}from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+{% if cookiecutter.use_django_rq == "y" %}from django.core.files.base import ContentFile
+{% endif %}from django.core.management import CommandError, call_command
+from django.core.management.commands.migrate import Command as MigrateCommand
+from django.db import DatabaseError, connection, connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from django.views import View
+{% if cookiecutter.use_drf == "y" %}from django.utils.translation import gettext_lazy
+{% endif %}
+{% if cookiecutter.use_django_rq == "y" %}import fakeredis
+from PIL import Image
+{% endif %}{% if cookiecutter.use_redis == "y" %}from redis.exceptions import ConnectionError as RedisConnectionError
+{% endif %}{% if cookiecutter.use_drf == "y" %}from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+{% endif %}{% if cookiecutter.use_drf == "y" and cookiecutter.use_simple_jwt == "y" %}from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+from rest_framework.views import exception_handler
+{% endif %}{% if cookiecutter.use_django_rq == "y" %}from rq import Queue
+{% endif %}
+from config import gunicorn as gunicorn_config
+from core.archive import archive_removed
+{% if cookiecutter.use_redis == "y" %}from core.cache_backends import FallbackRedisCache
+{% endif %}{% if cookiecutter.use_drf == "y" and cookiecutter.use_simple_jwt == "y" %}from core.authentications import CustomJWTAuthentication
+{% endif %}from core.cache import bump_generation, get_generations
+{% if cookiecutter.use_django_rq == "y" %}from core.jobs import ARCHIVE_REMOVED_JOB_ID_PREFIX, process_media, schedule_archive_removed_rows
+{% endif %}from core.log import LogListener, ProcessRotatingFileHandler, QueueHandler, get_listener
+from core.management.commands.migrate_with_lock import MIGRATE_LOCK_ID
+from core.metrics import Registry
+from core.managers import post_bulk_save
+from core.middleware import QueryBudgetMiddleware, ReplicaPinningMiddleware
+from core.models import ArchivedRow, Media, MediaBlob, MediaRendition, MediaUpload
+{% if cookiecutter.use_drf == "y" %}from core.pagination import KeysetPagination
+{% endif %}{% if cookiecutter.use_drf == "y" and cookiecutter.use_simple_jwt == "y" %}from core.permissions import IsAdminUser
+{% endif %}{% if cookiecutter.use_drf == "y" %}from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+{% endif %}from core.queries import QueryBudgetExceeded, collect_queries, query_budget
+from core.routers import ReplicaLagMonitor, ReplicaRouter, pin_primary, use_replicas
+{% if cookiecutter.use_drf == "y" %}from core.serializers import MediaSerializer
+{% endif %}from core.session_cache import LocalLRUCache, SessionCache, session_cache
+{% if cookiecutter.use_django_rq == "y" %}from core.testing import assert_query_budget, make_user, run_scheduled_jobs
+{% else %}from core.testing import assert_query_budget, make_user
+{% endif %}{% if cookiecutter.use_drf == "y" and cookiecutter.use_simple_jwt == "y" %}from core.tokens import SessionTokenObtainPairSerializer
+{% endif %}{% if cookiecutter.use_drf == "y" %}from core.uploads import UploadOffsetConflict, staging_path, write_chunk
+from core.views import {% if cookiecutter.use_simple_jwt == "y" %}AsyncAPIView, {% endif %}MediaUploadViewSet, MediaViewSet
+{% endif %}from users.models.user import User, UserSession
+
+
+def remove_long_ago(instance):
+    instance.delete()
+    removed_at = now() - settings.ARCHIVE_REMOVED["RETENTION"] - timedelta(days=1)
+    type(instance).all_objects.filter(pk=instance.pk).update(removed_at=removed_at)
+
+
+class BaseModelSaveTestCase(TestCase):
+    def setUp(self):
+        self.media = Media.objects.create(title="Original", file_path="media/original.png")
+        self.media = Media.objects.get(pk=self.media.pk)
+
+    def test_save_without_changes_skips_the_query(self):
+        modified = self.media.modified
+        with self.assertNumQueries(0):
+            self.media.save()
+        self.media.refresh_from_db()
+        self.assertEqual(self.media.modified, modified)
+
+    def test_save_writes_changed_fields_and_modified_only(self):
+        modified = self.media.modified
+        self.media.title = "Changed"
+        with CaptureQueriesContext(connection) as queries:
+            self.media.save()
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]["sql"]
+        self.assertIn('"title"', sql)
+        self.assertIn('"modified"', sql)
+        self.assertNotIn('"media_type"', sql)
+
+        self.media.refresh_from_db()
+        self.assertEqual(self.media.title, "Changed")
+        self.assertGreater(self.media.modified, modified)
+        with self.assertNumQueries(0):
+            self.media.save()
+
+    def test_save_writes_fields_derived_from_a_changed_field(self):
+        self.media.file_path = "media/other.png"
+        with CaptureQueriesContext(connection) as queries:
+            self.media.save()
+        self.assertIn('"blob"', queries[0]["sql"])
+
+    def test_explicit_update_fields_are_honoured(self):
+        self.media.title = "Changed"
+        self.media.save(update_fields=["modified"])
+        self.media.refresh_from_db()
+        self.assertEqual(self.media.title, "Original")
+
+
+class BulkWriteTestCase(TestCase):
+    def build_media(self, count):
+        return [Media(title=f"Media {i}", file_path=f"media/{i}.png") for i in range(count)]
+
+    def test_create_many_inserts_in_batches_and_marks_instances_saved(self):
+        sent = []
+        post_bulk_save.connect(lambda **kwargs: sent.append(kwargs), sender=Media, weak=False, dispatch_uid="test")
+        self.addCleanup(post_bulk_save.disconnect, sender=Media, dispatch_uid="test")
+
+        media = self.build_media(5)
+        self.assertEqual(Media.objects.create_many(iter(media), batch_size=2), 5)
+
+        self.assertEqual(Media.objects.count(), 5)
+        self.assertEqual([len(kwargs["created"]) for kwargs in sent], [2, 2, 1])
+        for item in media:
+            self.assertEqual(item.tracker.changed(), {})
+            self.assertEqual(item.modified, item.created)
+
+    def test_update_many_writes_changed_instances_only(self):
+        Media.objects.create_many(self.build_media(3))
+        media = list(Media.objects.order_by("title"))
+        media[0].title = "First"
+        media[2].title = "Last"
+        modified = media[1].modified
+
+        self.assertEqual(Media.objects.update_many(media), 2)
+
+        self.assertEqual(sorted(Media.objects.values_list("title", flat=True)), ["First", "Last", "Media 1"])
+        self.assertEqual(Media.objects.get(pk=media[1].pk).modified, modified)
+        for item in media:
+            self.assertEqual(item.tracker.changed(), {})
+        with self.assertNumQueries(0):
+            self.assertEqual(Media.objects.update_many(media), 0)
+
+    def test_update_many_needs_fields_without_a_tracker(self):
+        with self.assertRaises(ValueError):
+            UserSession.objects.update_many([])
+
+    def test_upsert_many_keeps_existing_rows_and_marks_instances_saved(self):
+        existing = MediaBlob.objects.create(digest="a" * 64, file="blobs/a.png", size=1)
+        blobs = [
+            MediaBlob(digest="a" * 64, file="blobs/a.png", size=2),
+            MediaBlob(digest="b" * 64, file="blobs/b.png", size=3),
+        ]
+        counts = MediaBlob.objects.upsert_many(blobs, unique_fields=["digest"], update_fields=["size"])
+
+        self.assertEqual(counts, (1, 1))
+
+        self.assertEqual(blobs[0].pk, existing.pk)
+        self.assertEqual(blobs[0].created, existing.created)
+        self.assertEqual(MediaBlob.objects.get(pk=existing.pk).size, 2)
+        self.assertEqual(MediaBlob.objects.get(pk=blobs[1].pk).size, 3)
+        for blob in blobs:
+            self.assertEqual(blob.tracker.changed(), {})
+        blobs[0].ref_count = 5
+        with CaptureQueriesContext(connection) as queries:
+            blobs[0].save()
+        self.assertIn('"ref_count"', queries[0]["sql"])
+        self.assertNotIn('"size"', queries[0]["sql"])
+
+
+class ArchiveRemovedTestCase(TestCase):
+    def setUp(self):
+        self.blob = MediaBlob.objects.create(digest="0" * 64, file="blobs/00/00/blob.png", size=1, ref_count=1)
+        self.media = Media.objects.create(title="Archived", file_path=self.blob.file.name, blob=self.blob)
+        self.rendition = MediaRendition.objects.create(
+            media=self.media, name="thumbnail", file="mediarendition/thumbnail.webp", width=1, height=1
+        )
+
+    def test_soft_delete_keeps_the_blob_and_renditions_for_restore(self):
+        self.media.delete()
+        self.assertFalse(Media.objects.filter(pk=self.media.pk).exists())
+        self.assertEqual(MediaBlob.objects.get(pk=self.blob.pk).ref_count, 1)
+        self.assertTrue(MediaRendition.objects.filter(pk=self.rendition.pk).exists())
+
+        self.media.restore()
+        self.assertEqual(Media.objects.get(pk=self.media.pk).blob, self.blob)
+
+    def test_archive_releases_the_blob_and_deletes_renditions(self):
+        remove_long_ago(self.media)
+        with mock.patch.object(MediaBlob._meta.get_field("file").storage, "delete") as delete_file:
+            with self.captureOnCommitCallbacks(execute=True):
+                archived = archive_removed(before=now(), models=[Media])
+
+        self.assertEqual(archived, {"core.Media": 1})
+        self.assertFalse(Media.all_objects.filter(pk=self.media.pk).exists())
+        self.assertFalse(MediaBlob.objects.filter(pk=self.blob.pk).exists())
+        self.assertFalse(MediaRendition.objects.filter(pk=self.rendition.pk).exists())
+        delete_file.assert_any_call(self.blob.file.name)
+        row = ArchivedRow.objects.get(object_id=str(self.media.pk))
+        self.assertEqual(row.data["fields"]["title"], "Archived")
+
+    def test_archive_leaves_recently_removed_rows(self):
+        self.media.delete()
+        self.assertEqual(archive_removed(before=now() - timedelta(days=1), models=[Media]), {"core.Media": 0})
+        self.assertTrue(Media.all_objects.filter(pk=self.media.pk).exists())
+
+{%- if cookiecutter.use_drf == "y" %}
+
+
+class ORJSONRendererTestCase(SimpleTestCase):
+    def test_matches_json_renderer(self):
+        data = {
+            "id": uuid4(),
+            "day": now().date(),
+            "price": Decimal("1.50"),
+            "label": gettext_lazy("Invalid cursor"),
+            "text": "caf\u00e9 \u2028 \u2029 </script>",
+            "items": [1, 2.5, None, True],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_escapes_line_separators(self):
+        rendered = ORJSONRenderer().render({"text": "a\u2028b\u2029c"})
+        self.assertEqual(rendered, b'{"text":"a\\u2028b\\u2029c"}')
+        self.assertEqual(json.loads(rendered), {"text": "a\u2028b\u2029c"})
+
+    def test_datetimes_match_json_renderer(self):
+        data = {
+            "utc": datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+            "offset": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=2))),
+            "naive": datetime(2024, 1, 2, 3, 4, 5, 6),
+        }
+        rendered = ORJSONRenderer().render(data)
+        self.assertEqual(rendered, JSONRenderer().render(data))
+        self.assertIn(b'"2024-01-02T03:04:05.678901Z"', rendered)
+
+    def test_non_finite_floats_become_null(self):
+        self.assertEqual(ORJSONRenderer().render({"a": float("nan")}), b'{"a":null}')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({"a": float("nan")})
+
+    def test_indent_and_empty(self):
+        renderer = ORJSONRenderer()
+        self.assertEqual(renderer.render(None), b"")
+        self.assertEqual(renderer.render({"a": 1}, "application/json; indent=4"), b'{\n  "a": 1\n}')
+
+
+class ORJSONParserTestCase(SimpleTestCase):
+    def parse(self, body, encoding="utf-8"):
+        return ORJSONParser().parse(BytesIO(body), "application/json", {"encoding": encoding})
+
+    def test_round_trip(self):
+        data = {"id": str(uuid4()), "text": "caf\u00e9 \u2028", "items": [1, 2.5, None]}
+        self.assertEqual(self.parse(ORJSONRenderer().render(data)), data)
+
+    def test_transcodes_other_charsets(self):
+        self.assertEqual(self.parse('{"text": "caf\u00e9"}'.encode("latin-1"), "latin-1"), {"text": "caf\u00e9"})
+
+    def test_invalid_body(self):
+        with self.assertRaises(ParseError):
+            self.parse(b'{"a": ')
+        with self.assertRaises(ParseError):
+            self.parse(b"{}", "no-such-charset")
+
+
+class MediaSerializerTestCase(TestCase):
+    def setUp(self):
+        for i in range(3):
+            media = Media.objects.create(title=f"Media {i}", file_path=f"media/{i}.png")
+            MediaRendition.objects.create(media=media, name="thumbnail", file=f"thumbnail/{i}.webp", width=1, height=2)
+
+    def test_list_reads_prefetched_renditions(self):
+        with self.assertNumQueries(2):
+            data = MediaSerializer(Media.objects.prefetch_related("renditions"), many=True).data
+        self.assertEqual(len(data), 3)
+        for item in data:
+            rendition = item["renditions"]["thumbnail"]
+            self.assertEqual((rendition["width"], rendition["height"]), (1, 2))
+            self.assertTrue(rendition["url"].endswith(".webp"))
+
+    def test_renditions_are_read_only(self):
+        serializer = MediaSerializer(data={"title": "New", "media_type": "image", "renditions": {"x": {}}})
+        serializer.is_valid()
+        self.assertNotIn("renditions", serializer.validated_data)
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        created = now()
+        self.media = [
+            Media.objects.create(title=f"Media {i}", file_path=f"media/{i}.png", created=created) for i in range(5)
+        ]
+        self.media.sort(key=lambda media: (media.created, media.pk))
+
+    def paginate(self, url):
+        paginator = KeysetPagination()
+        paginator.page_size = 2
+        request = Request(self.factory.get(url))
+        page = paginator.paginate_queryset(Media.objects.all(), request)
+        return page, paginator
+
+    def test_cursors_walk_every_row_once_in_both_directions(self):
+        seen, url = [], "/media/"
+        while url:
+            page, paginator = self.paginate(url)
+            seen += page
+            url = paginator.get_next_link()
+        self.assertEqual(seen, self.media)
+
+        page, paginator = self.paginate(paginator.get_previous_link())
+        self.assertEqual(page, self.media[2:4])
+
+    def test_tampered_cursor_is_not_found(self):
+        tampered = [
+            "not base64!",
+            urlsafe_b64encode(b"[]").decode(),
+            urlsafe_b64encode(json.dumps({"v": "yesterday", "pk": str(uuid4())}).encode()).decode(),
+            urlsafe_b64encode(json.dumps({"v": now().isoformat(), "pk": "1 OR 1=1"}).encode()).decode(),
+            urlsafe_b64encode(json.dumps({"v": now().isoformat(), "pk": 1}).encode()).decode(),
+        ]
+        for cursor in tampered:
+            with self.subTest(cursor=cursor), self.assertRaises(NotFound):
+                self.paginate(f"/media/?cursor={cursor}")
+
+
+class MediaViewSetTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(caches["default"].clear)
+        self.factory = APIRequestFactory()
+        self.user = make_user("viewer")
+        self.media = Media.objects.create(title="Mine", file_path="media/mine.png")
+        MediaUpload.objects.create(user=self.user, filename="mine.png", size=1, media=self.media)
+        other = Media.objects.create(title="Other", file_path="media/other.png")
+        MediaUpload.objects.create(user=make_user("other"), filename="other.png", size=1, media=other)
+
+    def get(self, action="list", **kwargs):
+        request = self.factory.get("/media/")
+        force_authenticate(request, user=self.user)
+        return MediaViewSet.as_view({"get": action})(request, **kwargs)
+
+    def test_list_shows_the_media_of_the_user_only(self):
+        self.assertEqual([item["title"] for item in self.get().data["results"]], ["Mine"])
+
+    def test_responses_are_cached_until_a_dependency_changes(self):
+        self.get()
+        # Only the aggregate query of the conditional GET check.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get().data["results"][0]["renditions"], {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MediaRendition.objects.create(media=self.media, name="thumbnail", file="t.webp", width=1, height=1)
+        self.assertIn("thumbnail", self.get().data["results"][0]["renditions"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.media.title = "Renamed"
+            self.media.save()
+        self.assertEqual(self.get("retrieve", pk=self.media.pk).data["title"], "Renamed")
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(caches["default"].clear)
+        self.factory = APIRequestFactory()
+        self.user = make_user("conditional")
+        self.media = Media.objects.create(title="Mine", file_path="media/mine.png")
+        MediaUpload.objects.create(user=self.user, filename="mine.png", size=1, media=self.media)
+
+    def get(self, action="list", **headers):
+        request = self.factory.get("/media/", **headers)
+        force_authenticate(request, user=self.user)
+        kwargs = {"pk": self.media.pk} if action == "retrieve" else {}
+        return MediaViewSet.as_view({"get": action})(request, **kwargs)
+
+    def add_rendition_later(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            rendition = MediaRendition.objects.create(media=self.media, name="small", file="s.webp", width=1, height=1)
+        MediaRendition.objects.filter(pk=rendition.pk).update(modified=now() + timedelta(seconds=5))
+
+    def test_matching_etag_is_not_modified(self):
+        for action in ("list", "retrieve"):
+            with self.subTest(action=action):
+                response = self.get(action)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response["ETag"].startswith('W/"'))
+                self.assertIn("Last-Modified", response)
+
+                response = self.get(action, HTTP_IF_NONE_MATCH=response["ETag"])
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.data)
+
+    def test_if_modified_since_is_not_modified(self):
+        for action in ("list", "retrieve"):
+            with self.subTest(action=action):
+                last_modified = self.get(action)["Last-Modified"]
+                self.assertEqual(self.get(action, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_changed_dependency_changes_the_validators(self):
+        before = {action: self.get(action) for action in ("list", "retrieve")}
+        self.add_rendition_later()
+        for action, response in before.items():
+            with self.subTest(action=action):
+                self.assertEqual(self.get(action, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+                response = self.get(action, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], before[action]["ETag"])
+
+    def test_etag_depends_on_the_user(self):
+        etag = self.get("list")["ETag"]
+        self.user = make_user("someone else")
+        self.assertNotEqual(self.get("list", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class MediaUploadTestCase(TestCase):
+    content = b"0123456789"
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_settings = override_settings(
+            MEDIA_ROOT=media_root,
+            MEDIA_UPLOAD={**settings.MEDIA_UPLOAD, "STAGING_DIR": os.path.join(media_root, ".uploads")},
+        )
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.factory = APIRequestFactory()
+        self.user = make_user("uploader")
+
+    def request(self, method, action, upload_id=None, **kwargs):
+        request = getattr(self.factory, method)("/media/uploads/", **kwargs)
+        force_authenticate(request, user=self.user)
+        view = MediaUploadViewSet.as_view({method: action})
+        return view(request, pk=upload_id) if upload_id else view(request)
+
+    def start(self):
+        data = {"filename": "clip.txt", "size": len(self.content), "media_type": "document", "title": "Clip"}
+        response = self.request("post", "create", data=data, format="json")
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+    def put_chunk(self, upload_id, start, end):
+        return self.request(
+            "put",
+            "update",
+            upload_id,
+            data=self.content[start:end],
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end - 1}/{len(self.content)}",
+        )
+
+    def test_upload_resumes_from_the_stored_offset(self):
+        upload_id = self.start()
+        self.assertEqual(self.put_chunk(upload_id, 0, 4).data["offset"], 4)
+
+        # The client lost the response; it asks where to resume.
+        self.assertEqual(self.request("get", "retrieve", upload_id).data["offset"], 4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.put_chunk(upload_id, 4, 10)
+        self.assertEqual(response.status_code, 201)
+        media = Media.objects.get(pk=response.data["media"]["id"])
+        with media.file_path.open("rb") as fh:
+            self.assertEqual(fh.read(), self.content)
+        self.assertFalse(os.path.exists(staging_path(MediaUpload.objects.get(pk=upload_id))))
+
+    def test_stale_writer_conflicts_before_writing(self):
+        upload_id = self.start()
+        stale = MediaUpload.objects.get(pk=upload_id)
+        self.put_chunk(upload_id, 0, 4)
+
+        with self.assertRaises(UploadOffsetConflict):
+            write_chunk(stale, BytesIO(b"xxxx"), 0, 4)
+        self.assertEqual(stale.offset, 4)
+        with open(staging_path(stale), "rb") as fh:
+            self.assertEqual(fh.read(), self.content[:4])
+
+    def test_lost_staging_file_restarts_the_upload(self):
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, 4)
+        os.remove(staging_path(MediaUpload.objects.get(pk=upload_id)))
+
+        response = self.put_chunk(upload_id, 4, 10)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(int(response.data["offset"]), 0)
+        self.assertEqual(MediaUpload.objects.get(pk=upload_id).offset, 0)
+
+        self.put_chunk(upload_id, 0, 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            media = self.put_chunk(upload_id, 4, 10).data["media"]
+        with Media.objects.get(pk=media["id"]).file_path.open("rb") as fh:
+            self.assertEqual(fh.read(), self.content)
+
+    def test_failed_completion_is_retried_by_the_next_put(self):
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, 4)
+        with mock.patch.object(Media, "save", side_effect=DatabaseError("insert failed")):
+            with self.assertRaises(DatabaseError):
+                self.put_chunk(upload_id, 4, 10)
+
+        upload = MediaUpload.objects.get(pk=upload_id)
+        self.assertEqual((upload.offset, upload.media_id), (10, None))
+        self.assertTrue(os.path.exists(staging_path(upload)))
+        files = [os.path.join(root, name) for root, _, names in os.walk(settings.MEDIA_ROOT) for name in names]
+        self.assertEqual(files, [staging_path(upload)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.request("put", "update", upload_id, data=b"", content_type="application/octet-stream")
+        self.assertEqual(response.status_code, 201)
+        with Media.objects.get(pk=response.data["media"]["id"]).file_path.open("rb") as fh:
+            self.assertEqual(fh.read(), self.content)
+        self.assertFalse(os.path.exists(staging_path(upload)))
+
+    def test_chunk_away_from_the_offset_is_a_conflict(self):
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0, 4)
+
+        for start, end in ((0, 4), (6, 10)):
+            response = self.put_chunk(upload_id, start, end)
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(int(response.data["offset"]), 4)
+        self.assertEqual(MediaUpload.objects.get(pk=upload_id).offset, 4)
+
+    def test_malformed_range_is_rejected(self):
+        upload_id = self.start()
+        response = self.request(
+            "put", "update", upload_id, data=b"x", content_type="application/octet-stream", HTTP_CONTENT_RANGE="0-1"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(MEDIA_CONTENT_ADDRESSED=True)
+    def test_identical_uploads_share_one_blob(self):
+        media = []
+        for _ in range(2):
+            upload_id = self.start()
+            self.put_chunk(upload_id, 0, 3)
+            media.append(self.put_chunk(upload_id, 3, 10).data["media"]["id"])
+
+        blobs = set(Media.objects.filter(pk__in=media).values_list("blob", flat=True))
+        self.assertEqual(len(blobs), 1)
+        self.assertEqual(MediaBlob.objects.get(pk=blobs.pop()).ref_count, 2)
+{%- if cookiecutter.use_simple_jwt == "y" %}
+
+
+class ProfileView(AsyncAPIView):
+    authentication_classes = [CustomJWTAuthentication]
+
+    async def get(self, request):
+        return Response({"email": request.user.email})
+
+
+class AdminProfileView(ProfileView):
+    permission_classes = [IsAdminUser]
+
+
+class AsyncAPIViewTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(caches["default"].clear)
+        self.factory = APIRequestFactory()
+        self.user = make_user("async")
+        self.session = UserSession.objects.create(user=self.user)
+
+    def get(self, view=ProfileView, session=None, **headers):
+        if session is not None:
+            token = SessionTokenObtainPairSerializer.get_token(session.user, session.pk).access_token
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+        return async_to_sync(view.as_view())(self.factory.get("/profile/", **headers))
+
+    def test_authenticated_request(self):
+        response = self.get(session=self.session)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"email": self.user.email})
+
+    def test_request_without_credentials_is_unauthenticated(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("WWW-Authenticate", response)
+
+    def test_invalid_token_is_rejected(self):
+        self.assertEqual(self.get(HTTP_AUTHORIZATION="Bearer not-a-token").status_code, 401)
+
+    def test_revoked_session_is_rejected(self):
+        self.assertEqual(self.get(session=self.session).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.session.revoke()
+        response = self.get(session=self.session)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("Session is expired", str(response.data))
+
+    def test_admin_permission_denies_other_users(self):
+        self.assertEqual(self.get(AdminProfileView, session=self.session).status_code, 403)
+        self.assertEqual(self.get(AdminProfileView).status_code, 401)
+
+        staff = make_user("staff", is_staff=True)
+        response = self.get(AdminProfileView, session=UserSession.objects.create(user=staff))
+        self.assertEqual(response.status_code, 200)
+
+    def test_sync_permissions_and_the_exception_handler_run_off_the_event_loop(self):
+        def off_loop():
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return True
+            return False
+
+        class SyncPermission(BasePermission):
+            def has_permission(self, request, view):
+                calls.append(("permission", off_loop()))
+                return False
+
+        def recording_exception_handler(exc, context):
+            calls.append(("exception handler", off_loop()))
+            return exception_handler(exc, context)
+
+        class View(ProfileView):
+            permission_classes = [SyncPermission]
+
+            def get_exception_handler(self):
+                return recording_exception_handler
+
+        calls = []
+        self.assertEqual(self.get(View, session=self.session).status_code, 403)
+        self.assertEqual(calls, [("permission", True), ("exception handler", True)])
+{%- endif %}
+{%- endif %}
+
+
+class CacheGenerationTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(caches["default"].clear)
+
+    def test_generations_start_at_the_current_time_and_stay(self):
+        before = time.time_ns()
+        first = get_generations([Media, MediaRendition])
+        self.assertTrue(all(generation >= before for generation in first))
+        self.assertEqual(get_generations([Media, MediaRendition]), first)
+
+    def test_bump_changes_only_the_given_generation(self):
+        media, rendition = get_generations([Media, MediaRendition])
+        bump_generation("core.media")
+        self.assertEqual(get_generations([Media, MediaRendition]), [media + 1, rendition])
+
+    def test_bump_of_an_evicted_generation_starts_a_new_one(self):
+        media = get_generations([Media])[0]
+        caches["default"].clear()
+        bump_generation("core.media")
+        self.assertGreater(get_generations([Media])[0], media)
+
+    def test_cache_get_or_set_is_keyed_by_the_row_version(self):
+        media = Media.objects.create(title="Cached", file_path="media/cached.png")
+        self.assertEqual(media.cache_get_or_set("title", lambda: media.title), "Cached")
+        self.assertEqual(media.cache_get_or_set("title", lambda: "computed again"), "Cached")
+
+        media.title = "Changed"
+        media.save()
+        self.assertEqual(media.cache_get_or_set("title", lambda: media.title), "Changed")
+{%- if cookiecutter.use_redis == "y" %}
+
+
+class FallbackRedisCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.cache = FallbackRedisCache("redis://localhost:6379/1", {"OPTIONS": {"FALLBACK_MAX_MISSED_KEYS": 3}})
+        self.cache._cache = mock.Mock()
+        self.cache._cache.get.side_effect = RedisConnectionError
+        self.cache._cache.delete.side_effect = RedisConnectionError
+
+    def recover(self):
+        self.cache.down_until = 0
+        self.cache._cache.get.side_effect = None
+        self.cache._cache.get.return_value = "cached"
+
+    def test_outage_serves_misses_and_stores_nothing(self):
+        self.assertIsNone(self.cache.get("session"))
+        self.assertGreater(self.cache.down_until, 0)
+        self.assertTrue(self.cache.add("session", "stale"))
+        self.assertIsNone(self.cache.get("session"))
+        self.assertEqual(self.cache._cache.get.call_count, 1)
+        with self.assertRaises(ValueError):
+            self.cache.incr("generation")
+
+    def test_keys_written_during_the_outage_are_deleted_on_recovery(self):
+        self.cache.delete("session")
+        self.cache.set_many({"response": 1, "other": 2})
+        self.recover()
+
+        self.assertEqual(self.cache.get("unrelated"), "cached")
+        deleted = self.cache._cache.delete_many.call_args.args[0]
+        self.assertEqual(
+            sorted(deleted), sorted(self.cache.make_and_validate_key(key) for key in ("session", "response", "other"))
+        )
+        self.cache.get("unrelated")
+        self.assertEqual(self.cache._cache.delete_many.call_count, 1)
+
+    def test_failed_replay_is_retried(self):
+        self.cache.delete("session")
+        self.recover()
+        self.cache._cache.delete_many.side_effect = RedisConnectionError
+        self.assertIsNone(self.cache.get("unrelated"))
+
+        self.cache.down_until = 0
+        self.cache._cache.delete_many.side_effect = None
+        self.assertEqual(self.cache.get("unrelated"), "cached")
+        self.cache._cache.delete_many.assert_called_with([self.cache.make_and_validate_key("session")])
+
+    def test_too_many_missed_keys_clear_the_cache_on_recovery(self):
+        self.cache.delete("session")
+        self.cache.delete_many(["a", "b", "c"])
+        self.recover()
+        self.cache.get("unrelated")
+        self.cache._cache.clear.assert_called_once_with()
+        self.cache._cache.delete_many.assert_not_called()
+{%- endif %}
+
+
+class ReplicaRouterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.router.replicas = ["replica_0"]
+        patcher = mock.patch("core.routers.lag_monitor.healthy", side_effect=lambda aliases: aliases)
+        self.healthy = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_use_the_primary_outside_a_replica_scope(self):
+        self.assertEqual(self.router.db_for_read(Media), "default")
+
+    def test_reads_use_a_replica_until_the_first_write(self):
+        with use_replicas() as state:
+            self.assertEqual(self.router.db_for_read(Media), "replica_0")
+            self.assertEqual(self.router.db_for_write(Media), "default")
+            self.assertTrue(state.written)
+            self.assertEqual(self.router.db_for_read(Media), "default")
+
+    def test_pinned_scope_reads_from_the_primary(self):
+        with use_replicas(pinned=True):
+            self.assertEqual(self.router.db_for_read(Media), "default")
+
+    def test_lagging_replicas_fall_back_to_the_primary(self):
+        self.healthy.side_effect = lambda aliases: []
+        with use_replicas():
+            self.assertEqual(self.router.db_for_read(Media), "default")
+
+    def test_replicas_are_never_migrated(self):
+        self.assertTrue(self.router.allow_migrate("default", "core"))
+        self.assertFalse(self.router.allow_migrate("replica_0", "core"))
+
+
+class ReplicaLagMonitorTestCase(SimpleTestCase):
+    @override_settings(DATABASE_REPLICA={**settings.DATABASE_REPLICA, "MAX_LAG": 2.0, "LAG_CHECK_INTERVAL": 60})
+    def test_lag_is_checked_once_per_interval(self):
+        monitor = ReplicaLagMonitor()
+        with mock.patch("core.routers.connections", {"replica_0": mock.MagicMock()}) as connections:
+            cursor = connections["replica_0"].cursor.return_value.__enter__.return_value
+            cursor.fetchone.return_value = (3.5,)
+            self.assertEqual(monitor.healthy(["replica_0"]), [])
+            self.assertEqual(monitor.lag("replica_0"), 3.5)
+        self.assertEqual(cursor.execute.call_count, 1)
+
+    def test_unreachable_replica_counts_as_lagging(self):
+        monitor = ReplicaLagMonitor()
+        with mock.patch("core.routers.connections", {"replica_0": mock.MagicMock()}) as connections:
+            connections["replica_0"].cursor.side_effect = DatabaseError
+            self.assertEqual(monitor.lag("replica_0"), float("inf"))
+            self.assertEqual(monitor.healthy(["replica_0"]), [])
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ReplicaPinningMiddlewareTestCase(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.addCleanup(caches["default"].clear)
+        self.router = ReplicaRouter()
+        self.router.replicas = ["replica_0"]
+        patchers = [
+            mock.patch("core.middleware.replica_aliases", return_value=["replica_0"]),
+            mock.patch("core.routers.lag_monitor.healthy", side_effect=lambda aliases: aliases),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.reads = []
+
+    def view(self, request):
+        self.reads.append(self.router.db_for_read(Media))
+        if request.method == "POST":
+            pin_primary()
+        return HttpResponse()
+
+    def test_write_pins_the_client_by_cookie(self):
+        middleware = ReplicaPinningMiddleware(self.view)
+        response = middleware(self.factory.post("/"))
+        cookie = settings.DATABASE_REPLICA["PIN_COOKIE"]
+        self.assertIn(cookie, response.cookies)
+        self.assertEqual(response.cookies[cookie]["max-age"], settings.DATABASE_REPLICA["PIN_SECONDS"])
+
+        self.factory.cookies[cookie] = "1"
+        middleware(self.factory.get("/"))
+        self.assertEqual(self.reads, ["default", "default"])
+
+    def test_write_pins_a_client_without_cookies_by_its_credentials(self):
+        middleware = ReplicaPinningMiddleware(self.view)
+        middleware(self.factory.post("/", HTTP_AUTHORIZATION="Bearer writer"))
+        middleware(self.factory.get("/", HTTP_AUTHORIZATION="Bearer writer"))
+        middleware(self.factory.get("/", HTTP_AUTHORIZATION="Bearer reader"))
+        self.assertEqual(self.reads, ["default", "default", "replica_0"])
+
+    async def test_async_requests_are_pinned_alike(self):
+        async def view(request):
+            return self.view(request)
+
+        middleware = ReplicaPinningMiddleware(view)
+        await middleware(self.factory.post("/", HTTP_AUTHORIZATION="Bearer writer"))
+        await middleware(self.factory.get("/", HTTP_AUTHORIZATION="Bearer writer"))
+        self.assertEqual(self.reads, ["default", "default"])
+
+
+class QueryBudgetTestCase(TestCase):
+    def setUp(self):
+        self.pks = [Media.objects.create(title=f"Media {i}", file_path=f"media/{i}.png").pk for i in range(3)]
+        self.factory = RequestFactory()
+
+    def budget(self, **overrides):
+        return override_settings(QUERY_BUDGET={**settings.QUERY_BUDGET, **overrides})
+
+    def n_plus_one(self, request=None):
+        for pk in self.pks:
+            Media.objects.get(pk=pk)
+        return HttpResponse()
+
+    def call(self, view):
+        def get_response(request):
+            # Django's handler calls process_view between the middleware and the view.
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = QueryBudgetMiddleware(get_response)
+        return middleware(self.factory.get("/media/"))
+
+    def test_collect_queries_nests(self):
+        with collect_queries() as outer:
+            Media.objects.count()
+            with collect_queries() as inner:
+                self.n_plus_one()
+        self.assertEqual((outer.count, inner.count), (4, 3))
+        self.assertEqual([count for sql, count in inner.duplicates(1)], [3])
+
+    def test_assert_query_budget(self):
+        with assert_query_budget(max_queries=3, max_duplicates=3):
+            self.n_plus_one()
+        with self.assertRaisesMessage(QueryBudgetExceeded, "4 queries (budget 3)"):
+            with assert_query_budget(max_queries=3):
+                self.n_plus_one()
+                Media.objects.count()
+
+    def test_assert_query_budget_reports_n_plus_one_within_the_count(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, "possible N+1, 3 times: SELECT"):
+            with assert_query_budget(max_queries=10, max_duplicates=2):
+                self.n_plus_one()
+
+    def test_middleware_raises_with_raise(self):
+        with self.budget(MAX_DUPLICATES=2, RAISE=True):
+            with self.assertRaisesMessage(QueryBudgetExceeded, "Query budget exceeded by GET /media/: possible N+1"):
+                self.call(self.n_plus_one)
+
+    def test_middleware_logs_without_raise(self):
+        with self.budget(MAX_QUERIES=2, RAISE=False), self.assertLogs("core.middleware", "WARNING") as logs:
+            response = self.call(self.n_plus_one)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("3 queries (budget 2)", logs.output[0])
+        self.assertEqual(logs.records[0].queries, 3)
+
+    def test_view_overrides_the_budget(self):
+        @query_budget(max_queries=3, max_duplicates=3)
+        def media_list(request):
+            return self.n_plus_one(request)
+
+        @query_budget(max_queries=3, max_duplicates=3)
+        class MediaView(View):
+            def get(view, request):
+                return self.n_plus_one(request)
+
+        @query_budget(max_queries=3)
+        def media_count(request):
+            return self.n_plus_one(request)
+
+        with self.budget(MAX_QUERIES=2, MAX_DUPLICATES=2, RAISE=True):
+            self.assertEqual(self.call(media_list).status_code, 200)
+            self.assertEqual(self.call(MediaView.as_view()).status_code, 200)
+            # Limits left out keep the value from settings.
+            with self.assertRaisesMessage(QueryBudgetExceeded, "possible N+1"):
+                self.call(media_count)
+
+    def test_server_timing(self):
+        def view(request):
+            response = self.n_plus_one(request)
+            response["Server-Timing"] = 'app;dur=1.0'
+            return response
+
+        with self.budget(SERVER_TIMING=True, RAISE=False):
+            response = self.call(view)
+        self.assertRegex(response["Server-Timing"], r'^app;dur=1.0, db;dur=\d+\.\d;desc="3 queries"$')
+
+        with self.budget(SERVER_TIMING=False, RAISE=False):
+            self.assertFalse(self.call(self.n_plus_one).has_header("Server-Timing"))
+
+    def test_disabled(self):
+        with self.budget(ENABLED=False), self.assertRaises(MiddlewareNotUsed):
+            QueryBudgetMiddleware(self.n_plus_one)
+
+
+class MetricsRegistryTestCase(SimpleTestCase):
+    live_pid = 101
+    exited_pid = 102
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        overridden = override_settings(METRICS={**settings.METRICS, "DIR": self.directory})
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        patcher = mock.patch("core.metrics.process_alive", side_effect=lambda pid: pid != self.exited_pid)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.registry = Registry()
+        self.requests = self.registry.counter("requests_total", "Requests.", ("view",))
+        self.in_progress = self.registry.gauge("in_progress", "Requests being served.")
+        self.duration = self.registry.histogram("duration_seconds", "Duration.", ("view",), buckets=(0.1, 1.0))
+
+    def write(self, pid, snapshot):
+        with open(os.path.join(self.directory, f"{pid}.json"), "w") as file:
+            json.dump(snapshot, file)
+
+    def test_collect_sums_live_processes(self):
+        self.requests.inc("media", amount=2)
+        self.in_progress.inc()
+        self.duration.observe(0.5, "media")
+        self.write(
+            self.live_pid,
+            {
+                "requests_total": [[["media"], 3], [["upload"], 1]],
+                "in_progress": [[[], 2]],
+                "duration_seconds": [[["media"], [1, 0, 1, 2.05]]],
+                "removed_metric": [[[], 7]],
+            },
+        )
+
+        totals = self.registry.collect()
+        self.assertEqual(totals["requests_total"], {("media",): 5, ("upload",): 1})
+        self.assertEqual(totals["in_progress"], {(): 3})
+        self.assertEqual(totals["duration_seconds"], {("media",): [1, 1, 1, 2.55]})
+        self.assertNotIn("removed_metric", totals)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, f"{os.getpid()}.json")))
+
+    def test_exited_processes_are_archived(self):
+        self.write(self.exited_pid, {"requests_total": [[["media"], 4]], "in_progress": [[[], 5]]})
+        totals = self.registry.collect()
+        self.assertEqual(totals["requests_total"], {("media",): 4})
+        # Gauges only count live processes.
+        self.assertEqual(totals["in_progress"], {})
+        self.assertFalse(os.path.exists(os.path.join(self.directory, f"{self.exited_pid}.json")))
+        self.assertTrue(os.path.exists(os.path.join(self.directory, "archive.json")))
+
+        # A restarted worker exits later: counters keep growing from the archive.
+        self.write(self.exited_pid, {"requests_total": [[["media"], 1]]})
+        self.assertEqual(self.registry.collect()["requests_total"], {("media",): 5})
+        self.assertEqual(self.registry.collect()["requests_total"], {("media",): 5})
+
+    def test_without_directory_only_this_process_is_reported(self):
+        self.write(self.live_pid, {"requests_total": [[["media"], 3]]})
+        self.requests.inc("media")
+        with override_settings(METRICS={**settings.METRICS, "DIR": ""}):
+            self.assertEqual(self.registry.collect()["requests_total"], {("media",): 1})
+
+    def test_render(self):
+        self.requests.inc('say "hi"\n')
+        for value in (0.05, 0.5, 5.0):
+            self.duration.observe(value, "media")
+        lines = self.registry.render().splitlines()
+        for line in [
+            "# HELP requests_total Requests.",
+            "# TYPE requests_total counter",
+            'requests_total{view="say \\"hi\\"\\n"} 1',
+            "# TYPE in_progress gauge",
+            "# TYPE duration_seconds histogram",
+            'duration_seconds_bucket{view="media",le="0.1"} 1',
+            'duration_seconds_bucket{view="media",le="1.0"} 2',
+            'duration_seconds_bucket{view="media",le="+Inf"} 3',
+            'duration_seconds_sum{view="media"} ' + str(0.05 + 0.5 + 5.0),
+            'duration_seconds_count{view="media"} 3',
+        ]:
+            self.assertIn(line, lines)
+
+
+@override_settings(METRICS={**settings.METRICS, "TOKEN": "scraper-token"})
+class MetricsViewTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        overridden = override_settings(METRICS={**settings.METRICS, "DIR": directory})
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+    def get(self, **headers):
+        return self.client.get("/admin/metrics/", **headers)
+
+    def test_staff_users(self):
+        self.assertEqual(self.get().status_code, 403)
+        self.client.force_login(make_user("member"))
+        self.assertEqual(self.get().status_code, 403)
+
+        self.client.force_login(make_user("staff", is_staff=True))
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        self.assertIn(b"# TYPE http_requests_total counter", response.content)
+
+    def test_token(self):
+        self.assertEqual(self.get(HTTP_AUTHORIZATION="Bearer scraper-token").status_code, 200)
+        self.assertEqual(self.get(HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.assertEqual(self.get(HTTP_AUTHORIZATION="scraper-token").status_code, 403)
+
+    def test_empty_token_is_not_accepted(self):
+        with override_settings(METRICS={**settings.METRICS, "TOKEN": ""}):
+            self.assertEqual(self.get(HTTP_AUTHORIZATION="Bearer ").status_code, 403)
+
+
+@skipUnless(os.path.exists("/proc/self/statm"), "Needs /proc")
+class GunicornMemoryWatchdogTestCase(SimpleTestCase):
+    def setUp(self):
+        self.worker = mock.Mock()
+        patcher = mock.patch.object(gunicorn_config, "memory_check_interval", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("config.gunicorn.os.kill")
+        self.kill = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_resident_memory(self):
+        memory = gunicorn_config.resident_memory()
+        # This process has Django loaded but is far from a GiB.
+        self.assertGreater(memory, 10)
+        self.assertLess(memory, 1024)
+
+    def test_restarts_the_worker_over_the_limit(self):
+        with mock.patch.object(gunicorn_config, "max_worker_memory", 1):
+            gunicorn_config.watch_memory(self.worker)
+        self.kill.assert_called_once_with(os.getpid(), signal.SIGTERM)
+        self.assertIn("restarting", self.worker.log.info.call_args.args[0])
+
+    def test_keeps_the_worker_under_the_limit(self):
+        checks = mock.Mock(side_effect=[1, 1, InterruptedError])
+        with mock.patch.object(gunicorn_config, "max_worker_memory", 1024):
+            with mock.patch("config.gunicorn.time.sleep", checks), self.assertRaises(InterruptedError):
+                gunicorn_config.watch_memory(self.worker)
+        self.assertEqual(checks.call_count, 3)
+        self.kill.assert_not_called()
+
+    def test_post_worker_init_starts_the_watchdog(self):
+        with mock.patch("config.gunicorn.threading.Thread") as thread:
+            gunicorn_config.post_worker_init(self.worker)
+            with mock.patch.object(gunicorn_config, "max_worker_memory", 0):
+                gunicorn_config.post_worker_init(self.worker)
+        thread.assert_called_once_with(
+            target=gunicorn_config.watch_memory, args=(self.worker,), name="memory-watchdog", daemon=True
+        )
+        thread.return_value.start.assert_called_once_with()
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self, block=False):
+        super().__init__()
+        self.records = []
+        self.entered = threading.Event()
+        self.unblocked = threading.Event()
+        if not block:
+            self.unblocked.set()
+
+    def emit(self, record):
+        self.entered.set()
+        self.unblocked.wait(5)
+        self.records.append(record.getMessage())
+
+
+@mock.patch.dict("core.log._listeners", {})
+class LoggingTestCase(SimpleTestCase):
+    def record(self, msg, *args):
+        return logging.makeLogRecord({"msg": msg, "args": args, "levelno": logging.ERROR})
+
+    def test_hung_mail_handler_does_not_hold_up_other_handlers(self):
+        mail, files = CollectingHandler(block=True), CollectingHandler()
+        mail_queue = QueueHandler([mail], listener="mail")
+        file_queue = QueueHandler([files])
+
+        mail_queue.handle(self.record("to mail"))
+        self.assertTrue(mail.entered.wait(5))
+        file_queue.handle(self.record("to %s", "file"))
+        get_listener(file_queue.queue_size).stop()
+        self.assertEqual(files.records, ["to file"])
+
+        mail.unblocked.set()
+        get_listener(mail_queue.queue_size, "mail").stop()
+        self.assertEqual(mail.records, ["to mail"])
+
+    def test_records_dropped_while_the_queue_is_full_are_reported(self):
+        target = CollectingHandler(block=True)
+        handler = QueueHandler([target])
+        listener = LogListener(maxsize=1)
+        listener.put(handler, self.record("first"))
+        self.assertTrue(target.entered.wait(5))
+        listener.put(handler, self.record("second"))
+        listener.put(handler, self.record("third"))
+
+        target.unblocked.set()
+        listener.stop()
+        self.assertEqual(target.records, ["first", "1 log records were dropped, the log queue was full", "second"])
+
+    def test_file_slots_are_reused_by_later_processes(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        template = os.path.join(directory, "app.{slot}.log")
+
+        def write(message):
+            handler = ProcessRotatingFileHandler(template, maxBytes=1024, backupCount=1)
+            handler.handle(self.record(message))
+            return handler
+
+        first, second = write("first"), write("second")
+        self.assertEqual(os.path.basename(first.baseFilename), "app.0.log")
+        self.assertEqual(os.path.basename(second.baseFilename), "app.1.log")
+
+        first.close()
+        third = write("third")
+        second.close()
+        third.close()
+        self.assertEqual(os.path.basename(third.baseFilename), "app.0.log")
+        with open(os.path.join(directory, "app.0.log")) as file:
+            self.assertEqual(file.read().split(), ["first", "third"])
+        self.assertEqual(
+            sorted(name for name in os.listdir(directory) if name.endswith(".log")), ["app.0.log", "app.1.log"]
+        )
+
+
+class MigrateWithLockTestCase(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(MigrateCommand, "handle", return_value="")
+        self.migrate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_models_match_the_shipped_migrations(self):
+        # Containers no longer run makemigrations; a model change without its migration would never be applied.
+        with override_settings(MIGRATION_MODULES={}):
+            call_command("makemigrations", "--check", "--dry-run", verbosity=0)
+
+    def fake_postgresql(self, locked):
+        fake = mock.MagicMock(vendor="postgresql")
+        cursor = fake.cursor.return_value.__enter__.return_value
+        cursor.fetchone.side_effect = [(not held,) for held in locked]
+        patcher = mock.patch("core.management.commands.migrate_with_lock.connections", {"default": fake})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return cursor
+
+    def test_waits_for_the_lock_then_migrates_and_unlocks(self):
+        cursor = self.fake_postgresql(locked=[True, False])
+        stdout = StringIO()
+        with mock.patch("time.sleep") as sleep:
+            call_command("migrate_with_lock", stdout=stdout)
+
+        sleep.assert_called_once_with(1)
+        self.assertIn("Waiting for another migration run", stdout.getvalue())
+        self.migrate.assert_called_once()
+        self.assertEqual(
+            [call.args for call in cursor.execute.call_args_list],
+            [
+                ("SELECT pg_try_advisory_lock(%s)", [MIGRATE_LOCK_ID]),
+                ("SELECT pg_try_advisory_lock(%s)", [MIGRATE_LOCK_ID]),
+                ("SELECT pg_advisory_unlock(%s)", [MIGRATE_LOCK_ID]),
+            ],
+        )
+
+    def test_gives_up_without_migrating_after_the_timeout(self):
+        self.fake_postgresql(locked=[True])
+        with self.assertRaisesMessage(CommandError, "still holds the lock after 0 seconds"):
+            call_command("migrate_with_lock", "--lock-timeout", "0", stdout=StringIO())
+        self.migrate.assert_not_called()
+
+    def test_unlocks_when_the_migration_fails(self):
+        cursor = self.fake_postgresql(locked=[False])
+        self.migrate.side_effect = CommandError("broken migration")
+        with self.assertRaises(CommandError):
+            call_command("migrate_with_lock")
+        self.assertEqual(cursor.execute.call_args.args, ("SELECT pg_advisory_unlock(%s)", [MIGRATE_LOCK_ID]))
+
+    @skipUnless(connection.vendor == "postgresql", "Advisory locks require PostgreSQL.")
+    def test_concurrent_run_holds_off_until_the_lock_is_released(self):
+        other = connections.create_connection("default")
+        self.addCleanup(other.close)
+        with other.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", [MIGRATE_LOCK_ID])
+        with self.assertRaises(CommandError):
+            call_command("migrate_with_lock", "--lock-timeout", "0", stdout=StringIO())
+        self.migrate.assert_not_called()
+
+        with other.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [MIGRATE_LOCK_ID])
+        call_command("migrate_with_lock")
+        self.migrate.assert_called_once()
+        with other.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [MIGRATE_LOCK_ID])
+            self.assertTrue(cursor.fetchone()[0])
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [MIGRATE_LOCK_ID])
+
+
+class SessionCacheTestCase(TestCase):
+    def setUp(self):
+        session_cache.clear()
+        self.addCleanup(session_cache.clear)
+        self.addCleanup(caches["default"].clear)
+        self.session = UserSession.objects.create(user=make_user("cached"))
+
+    def revoke(self, session):
+        with self.captureOnCommitCallbacks(execute=True):
+            session.revoke()
+
+    def test_get_serves_repeated_lookups_from_memory(self):
+        worker = SessionCache(local_ttl=5)
+        self.assertEqual(worker.get(self.session.pk), self.session)
+        with self.assertNumQueries(0):
+            cached = worker.get(self.session.pk)
+        self.assertEqual(cached.user, self.session.user)
+
+    def test_local_tier_is_off_by_default(self):
+        self.assertFalse(SessionCache.from_settings().local.enabled)
+        session_cache.get(self.session.pk)
+        with self.assertNumQueries(1):
+            session_cache.get(self.session.pk)
+
+    def test_revoke_drops_the_cached_session(self):
+        self.assertIsNone(session_cache.get(self.session.pk).expire_at)
+        self.revoke(self.session)
+        self.assertIsNotNone(session_cache.get(self.session.pk).expire_at)
+
+    def test_blocking_the_user_drops_the_cached_session(self):
+        session_cache.get(self.session.pk)
+        user = self.session.user
+        user.is_blocked = True
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertTrue(session_cache.get(self.session.pk).user.is_blocked)
+
+    def test_deleting_users_in_bulk_drops_their_cached_sessions(self):
+        session_cache.get(self.session.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(User.objects.filter(pk=self.session.user_id).delete(), (1, {"users.User": 1}))
+        self.assertTrue(session_cache.get(self.session.pk).user.is_removed)
+        self.assertEqual(User.objects.filter(pk=self.session.user_id).delete(), (0, {"users.User": 0}))
+
+    def test_lookups_read_from_the_primary(self):
+        with mock.patch.object(router, "db_for_read", return_value="replica_unknown"):
+            self.assertEqual(session_cache.get(self.session.pk), self.session)
+
+    def test_missing_session_raises_does_not_exist(self):
+        with self.assertRaises(UserSession.DoesNotExist):
+            session_cache.get(uuid4())
+
+    @override_settings(USER_SESSION_CACHE={"CACHE_ALIAS": "default"})
+    def test_revoke_reaches_every_worker_sharing_the_cache(self):
+        worker, other = SessionCache.from_settings(), SessionCache.from_settings()
+        other.get(self.session.pk)
+        with mock.patch.object(session_cache, "cache_alias", worker.cache_alias), mock.patch.object(
+            session_cache, "local", LocalLRUCache(0, 0)
+        ):
+            self.revoke(self.session)
+        self.assertIsNotNone(other.get(self.session.pk).expire_at)
+
+    def test_lookup_racing_a_revocation_does_not_cache_the_stale_row(self):
+        worker = SessionCache(cache_alias="default")
+        queryset = worker.get_queryset()
+
+        def read_then_revoke(**lookup):
+            session = queryset.get(**lookup)
+            with mock.patch.object(session_cache, "cache_alias", "default"):
+                self.revoke(self.session)
+            return session
+
+        with mock.patch.object(worker, "get_queryset", return_value=mock.Mock(get=read_then_revoke)):
+            self.assertIsNone(worker.get(self.session.pk).expire_at)
+        self.assertIsNotNone(worker.get(self.session.pk).expire_at)
+
+    async def test_aget_matches_get(self):
+        session = await session_cache.aget(self.session.pk)
+        self.assertEqual(session, self.session)
+        self.assertEqual(session.user, self.session.user)
+        with self.assertRaises(UserSession.DoesNotExist):
+            await session_cache.aget(uuid4())
+{%- if cookiecutter.use_django_rq == "y" %}
+
+
+class ArchiveRemovedRowsJobTestCase(TestCase):
+    def setUp(self):
+        self.queue = Queue("default", connection=fakeredis.FakeStrictRedis())
+        patcher = mock.patch("django_rq.get_queue", return_value=self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_job_reschedules_itself_under_a_new_id_every_run(self):
+        first = schedule_archive_removed_rows()
+        self.assertTrue(first.id.startswith(f"{ARCHIVE_REMOVED_JOB_ID_PREFIX}-"))
+        self.assertEqual(schedule_archive_removed_rows().id, first.id)
+
+        ran = []
+        for cycle in range(2):
+            user = make_user(f"archived{cycle}")
+            remove_long_ago(user)
+            ran += run_scheduled_jobs(self.queue)
+            self.assertFalse(User.all_objects.filter(pk=user.pk).exists())
+            self.assertTrue(ArchivedRow.objects.filter(object_id=str(user.pk)).exists())
+
+        self.assertEqual(len(ran), 2)
+        self.assertEqual(ran[0], first.id)
+        self.assertNotEqual(ran[1], first.id)
+        pending = self.queue.scheduled_job_registry.get_job_ids()
+        self.assertEqual(len(pending), 1)
+        self.assertNotIn(pending[0], ran)
+
+
+class ProcessMediaTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        buffer = BytesIO()
+        Image.new("RGB", (800, 600), "red").save(buffer, format="PNG")
+        self.media = Media.objects.create(title="Photo", file_path=ContentFile(buffer.getvalue(), name="photo.png"))
+
+    def process(self, processes):
+        with override_settings(MEDIA_RENDITIONS={**settings.MEDIA_RENDITIONS, "PROCESSES": processes}):
+            return process_media(self.media.pk)
+
+    def renditions(self):
+        return {rendition.name: (rendition.width, rendition.height) for rendition in self.media.renditions.all()}
+
+    def test_renditions_are_rendered_in_a_pool_that_does_not_outlive_the_job(self):
+        self.assertEqual(sorted(self.process(processes=2)), sorted(settings.MEDIA_RENDITIONS["SIZES"]))
+        self.assertEqual(multiprocessing.active_children(), [])
+        self.assertEqual(self.renditions(), {"thumbnail": (160, 120), "small": (480, 360), "medium": (800, 600)})
+        media = Media.objects.get(pk=self.media.pk)
+        self.assertEqual((media.width, media.height), (800, 600))
+
+    def test_processing_again_replaces_the_renditions(self):
+        self.process(processes=0)
+        storage = MediaRendition._meta.get_field("file").storage
+        old_files = {rendition.file.name for rendition in self.media.renditions.all()}
+        self.process(processes=0)
+        new_files = {rendition.file.name for rendition in self.media.renditions.all()}
+        self.assertEqual(len(new_files), len(settings.MEDIA_RENDITIONS["SIZES"]))
+        self.assertTrue(all(storage.exists(name) for name in new_files))
+        self.assertFalse(any(storage.exists(name) for name in old_files - new_files))
+
+    def test_missing_media_is_skipped(self):
+        self.assertEqual(process_media(uuid4()), [])
+{%- endif %}
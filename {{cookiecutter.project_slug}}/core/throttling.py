@@ -0,0 +1,12 @@
+from rest_framework.throttling import AnonRateThrottle
+
+
+class LoginRateThrottle(AnonRateThrottle):
+    """
+    Limit token requests per client IP to the "login" rate in `DEFAULT_THROTTLE_RATES`.
+
+    Every attempt costs a password hash, so this bounds the hashing work one client can
+    cause; `users.hashing` bounds it for all clients together.
+    """
+
+    scope = "login"
@@ -3,6 +3,8 @@ from django.conf import settings
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from core.throttling import LoginRateThrottle
+
 USER_CLAIM_ID = settings.SIMPLE_JWT.get("USER_ID_CLAIM", "user_id")
 
 
@@ -45,6 +47,7 @@ class SessionTokenObtainPairView(TokenObtainPairView):
     """
 
     serializer_class = SessionTokenObtainPairSerializer
+    throttle_classes = [LoginRateThrottle]
 
 
 class PasswordResetTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -86,6 +89,7 @@ class PasswordResetTokenObtainPairView(TokenObtainPairView):
     """
 
     serializer_class = PasswordResetTokenObtainPairSerializer
+    throttle_classes = [LoginRateThrottle]
 
 
 class PasswordChangeTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -128,3 +132,4 @@ class PasswordChangeTokenObtainPairView(TokenObtainPairView):
     """
 
     serializer_class = PasswordChangeTokenObtainPairSerializer
+    throttle_classes = [LoginRateThrottle]
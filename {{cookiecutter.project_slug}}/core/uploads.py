@@ -0,0 +1,265 @@
+import os
+import re
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import DatabaseError, transaction
+from django.utils.translation import gettext as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from core.blobs import (
+    BLOCK_SIZE,
+    DIGEST_LENGTH,
+    ContentHasher,
+    acquire_blob,
+    combine_digests,
+    content_hash,
+    split_block_hashes,
+)
+from core.models import Media, MediaUpload
+
+CONTENT_RANGE_RE = re.compile(r"^bytes (?P<start>\d+)-(?P<end>\d+)/(?P<total>\d+|\*)$")
+
+
+class UploadOffsetConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _("Chunk does not start at the current upload offset.")
+    default_code = "upload_offset_conflict"
+
+
+def parse_content_range(header, upload):
+    """
+    Parse a `Content-Range: bytes <start>-<end>/<total>` header for `upload`.
+
+    Args:
+    - header: The raw header value.
+    - upload: The `MediaUpload` the chunk belongs to.
+
+    Returns:
+    - tuple: The inclusive start and exclusive end offsets of the chunk.
+
+    Raises:
+    - ValidationError: If the header is missing, malformed or out of bounds.
+    - UploadOffsetConflict: If the chunk does not start at `upload.offset`.
+    """
+    match = CONTENT_RANGE_RE.match(header or "")
+    if match is None:
+        raise ValidationError({"content_range": [_("Expected 'bytes <start>-<end>/<total>'.")]})
+
+    start, end = int(match["start"]), int(match["end"]) + 1
+    if match["total"] != "*" and int(match["total"]) != upload.size:
+        raise ValidationError({"content_range": [_("Total size does not match the upload.")]})
+    if end <= start or end > upload.size:
+        raise ValidationError({"content_range": [_("Range is outside of the upload.")]})
+    if end - start > settings.MEDIA_UPLOAD["MAX_CHUNK_SIZE"]:
+        raise ValidationError({"content_range": [_("Chunk is larger than the maximum chunk size.")]})
+    if start != upload.offset:
+        raise UploadOffsetConflict({"offset": upload.offset})
+    return start, end
+
+
+def staging_path(upload):
+    return os.path.join(settings.MEDIA_UPLOAD["STAGING_DIR"], f"{upload.pk.hex}.part")
+
+
+def write_chunk(upload, stream, start, end):
+    """
+    Stream the bytes `[start, end)` of `upload` from `stream` into its staging file.
+
+    The body is copied through a buffer of `MEDIA_UPLOAD["BUFFER_SIZE"]` bytes, so memory use
+    is constant regardless of chunk or file size. The upload row is locked (`NOWAIT`) while
+    the chunk is written, so concurrent writers of the same upload are serialized: a second
+    writer gets a conflict instead of truncating the bytes of the first, and the offset is
+    checked again under the lock before anything is written.
+
+    When the staging file of a partial upload is gone (e.g. lost with a container), the
+    offset is reset to 0 and the conflict tells the client to start over, instead of the
+    gap being filled with zeros.
+
+    With `MEDIA_CONTENT_ADDRESSED` the chunk is hashed while it is written and the digests of
+    the completed 4 MiB blocks are stored with the offset. A chunk that starts inside a block
+    re-reads only the start of that block from the staging file.
+
+    Returns:
+    - MediaUpload: The upload with its new offset.
+
+    Raises:
+    - UploadOffsetConflict: If the chunk does not start at the stored offset, another
+      request is writing to the upload, or the staged bytes were lost.
+    - ValidationError: If the body is shorter than the declared range.
+    """
+    path = staging_path(upload)
+    with transaction.atomic():
+        rows = MediaUpload.objects.select_for_update(nowait=True).filter(pk=upload.pk)
+        try:
+            offset = rows.values_list("offset", flat=True).get()
+        except DatabaseError:
+            raise UploadOffsetConflict({"offset": upload.offset})
+        if offset != start:
+            upload.offset = offset
+            raise UploadOffsetConflict({"offset": offset})
+
+        if start and not os.path.exists(path):
+            changes = {"offset": 0, "block_hashes": ""}
+        else:
+            changes = _write_staged(upload, path, stream, start, end)
+        MediaUpload.objects.filter(pk=upload.pk).update(**changes)
+
+    for field, value in changes.items():
+        setattr(upload, field, value)
+    if upload.offset != end:
+        raise UploadOffsetConflict({"offset": upload.offset})
+    return upload
+
+
+def _write_staged(upload, path, stream, start, end):
+    """
+    Write the chunk to the staging file and return the changes to store on the upload.
+    """
+    buffer_size = settings.MEDIA_UPLOAD["BUFFER_SIZE"]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    hasher = None
+    block_start = start - start % BLOCK_SIZE
+    if settings.MEDIA_CONTENT_ADDRESSED:
+        hasher = ContentHasher()
+
+    remaining = end - start
+    with open(path, "r+b" if os.path.exists(path) else "wb") as fh:
+        if hasher is not None and block_start < start:
+            fh.seek(block_start)
+            prefix = start - block_start
+            while prefix:
+                data = fh.read(min(buffer_size, prefix))
+                if not data:
+                    break
+                hasher.update(data)
+                prefix -= len(data)
+        fh.seek(start)
+        while remaining:
+            data = stream.read(min(buffer_size, remaining)) if stream is not None else b""
+            if not data:
+                break
+            fh.write(data)
+            if hasher is not None:
+                hasher.update(data)
+            remaining -= len(data)
+        # Drop bytes left behind by an earlier, interrupted attempt at a later chunk.
+        fh.truncate()
+
+    if remaining:
+        raise ValidationError({"content_range": [_("Request body is shorter than the declared range.")]})
+
+    changes = {"offset": end}
+    if hasher is not None:
+        known_blocks = upload.block_hashes[: block_start // BLOCK_SIZE * DIGEST_LENGTH * 2]
+        digests = hasher.digests(final=end == upload.size)
+        changes["block_hashes"] = known_blocks + "".join(digest.hex() for digest in digests)
+    return changes
+
+
+def upload_digest(upload):
+    """
+    Return the content hash of a completed `upload`.
+
+    Uses the stored block digests when they cover the whole file, and only re-reads the
+    staging file when they do not (e.g. content addressing was enabled mid-upload).
+    """
+    blocks = split_block_hashes(upload.block_hashes)
+    if len(blocks) == -(-upload.size // BLOCK_SIZE):
+        return combine_digests(blocks)
+    with open(staging_path(upload), "rb") as fh:
+        return content_hash(File(fh))
+
+
+def store_staged_file(upload, name):
+    """
+    Store the staging file of `upload` in the storage of `Media.file_path` under `name`.
+
+    On a local `FileSystemStorage` the file is hard-linked into place, so it is never
+    re-read. Other storages receive it as a stream. The staging file is kept either way,
+    so that a completion that fails can be retried; `complete_upload` removes it once the
+    `Media` row is committed.
+
+    Returns:
+    - str: The name the file was actually stored under.
+    """
+    field = Media._meta.get_field("file_path")
+    storage = field.storage
+    path = staging_path(upload)
+
+    if isinstance(storage, FileSystemStorage):
+        name = storage.get_available_name(name, max_length=field.max_length)
+        destination = storage.path(name)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        try:
+            os.link(path, destination)
+        except OSError:
+            # Staging directory on another device; fall through to a streamed copy.
+            pass
+        else:
+            if storage.file_permissions_mode is not None:
+                os.chmod(destination, storage.file_permissions_mode)
+            return name
+
+    with open(path, "rb") as fh:
+        return storage.save(name, File(fh), max_length=field.max_length)
+
+
+def complete_upload(upload):
+    """
+    Turn a fully received `upload` into a `Media` row with a single INSERT.
+
+    With `MEDIA_CONTENT_ADDRESSED` the staged file is only stored when no `MediaBlob`
+    with the same content exists; otherwise the new row points at the existing blob.
+
+    Completion is retryable: the upload row is locked, a stored file is deleted again if
+    the transaction fails, and the staging file is only removed once it has committed.
+    An upload whose offset reached its size without a `Media` is completed by the next
+    `PUT` (see `core.views.MediaUploadViewSet`).
+
+    Returns:
+    - Media: The created media, or the one created by a concurrent completion.
+    """
+    field = Media._meta.get_field("file_path")
+    media = Media(title=upload.title, media_type=upload.media_type)
+    stored = []
+
+    def store(name):
+        stored.append(store_staged_file(upload, name))
+        return stored[-1]
+
+    try:
+        with transaction.atomic():
+            media_id = MediaUpload.objects.select_for_update().values_list("media", flat=True).get(pk=upload.pk)
+            if media_id is not None:
+                upload.media = Media.objects.get(pk=media_id)
+                return upload.media
+
+            if settings.MEDIA_CONTENT_ADDRESSED:
+                media.blob = acquire_blob(upload_digest(upload), upload.size, upload.filename, store)
+                media.file_path = media.blob.file.name
+            else:
+                media.file_path = store(field.generate_filename(media, upload.filename))
+            media.save()
+            upload.media = media
+            upload.save(update_fields=["media"])
+            transaction.on_commit(lambda: discard_upload(upload))
+    except Exception:
+        for name in stored:
+            field.storage.delete(name)
+        raise
+    return media
+
+
+def discard_upload(upload):
+    """
+    Remove the staging file of an abandoned `upload`.
+    """
+    try:
+        os.remove(staging_path(upload))
+    except FileNotFoundError:
+        pass
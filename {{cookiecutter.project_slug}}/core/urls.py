@@ -0,0 +1,9 @@
+from rest_framework.routers import SimpleRouter
+
+from core.views import MediaUploadViewSet, MediaViewSet
+
+router = SimpleRouter()
+router.register("media/uploads", MediaUploadViewSet, basename="media-upload")
+router.register("media", MediaViewSet, basename="media")
+
+urlpatterns = router.urls
@@ -0,0 +1,235 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework import exceptions, mixins, status, viewsets
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.metrics import registry
+from core.mixins import CachedResponseMixin, ConditionalGetMixin
+from core.models import Media, MediaRendition, MediaUpload
+from core.pagination import KeysetPagination
+from core.serializers import MediaSerializer, MediaUploadSerializer
+from core.uploads import complete_upload, discard_upload, parse_content_range, write_chunk
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose request cycle runs on the event loop when served through ASGI.
+
+    Handlers must be declared with `async def`. Authentication and permission checks
+    await the `aauthenticate`, `ahas_permission` and `ahas_object_permission` hooks when
+    a class provides them (see `core.authentications.CustomJWTAuthentication` and
+    `core.permissions`). With the default stack a request whose session is in the local
+    session cache is authenticated on the event loop; a cache miss awaits Django's async
+    cache and ORM APIs, which Django 4.2 still runs in a thread through `sync_to_async`.
+    Classes without async hooks still work, but are run in a thread through `sync_to_async`,
+    and so is the exception handler.
+
+    Example:
+    ```
+    class ProfileView(AsyncAPIView):
+        async def get(self, request):
+            return Response({"email": request.user.email})
+    ```
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        """
+        Async version of `APIView.dispatch` with the same hooks for startup, finalize and exception handling.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+
+            # Get the appropriate handler method
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if hasattr(response, "__await__"):
+                response = await response
+
+        except Exception as exc:
+            # The exception handler is configurable and may do I/O (error reporting, a rollback), so it gets a thread.
+            response = await sync_to_async(self.handle_exception)(exc)
+
+        # Only sets headers and the negotiated renderer; Django renders the response in a thread.
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        """
+        Async version of `APIView.initial`.
+        """
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+
+        # Perform content negotiation and store the accepted info on the request
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+
+        # Determine the API version, if versioning is in use.
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        # Ensure that the incoming request is permitted
+        await self.aperform_authentication(request)
+        await self.acheck_permissions(request)
+        if self.throttle_classes:
+            await sync_to_async(self.check_throttles)(request)
+
+    async def aperform_authentication(self, request):
+        """
+        Authenticate the request with each authenticator in turn and set `request.user` and `request.auth`.
+        """
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, "aauthenticate"):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+    async def acheck_permissions(self, request):
+        """
+        Check if the request should be permitted, raising an exception if not.
+        """
+        for permission in self.get_permissions():
+            if hasattr(permission, "ahas_permission"):
+                allowed = await permission.ahas_permission(request, self)
+            else:
+                allowed = await sync_to_async(permission.has_permission)(request, self)
+            if not allowed:
+                self.permission_denied(
+                    request,
+                    message=getattr(permission, "message", None),
+                    code=getattr(permission, "code", None),
+                )
+
+    async def acheck_object_permissions(self, request, obj):
+        """
+        Check if the request should be permitted for a given object, raising an exception if not.
+        """
+        for permission in self.get_permissions():
+            if hasattr(permission, "ahas_object_permission"):
+                allowed = await permission.ahas_object_permission(request, self, obj)
+            else:
+                allowed = await sync_to_async(permission.has_object_permission)(request, self, obj)
+            if not allowed:
+                self.permission_denied(
+                    request,
+                    message=getattr(permission, "message", None),
+                    code=getattr(permission, "code", None),
+                )
+
+
+class MediaPagination(KeysetPagination):
+    ordering = "-created"
+
+
+class MediaViewSet(ConditionalGetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    The media created by the uploads of the user.
+
+    - `GET /media/` lists them, newest first, with keyset pagination.
+    - `GET /media/<id>/` returns one, with the URLs of its renditions.
+
+    Conditional requests are answered with `304 Not Modified` (see
+    `core.mixins.ConditionalGetMixin`), and responses are cached per user until a `Media`
+    or `MediaRendition` changes (see `core.mixins.CachedResponseMixin`).
+    """
+
+    queryset = Media.objects.prefetch_related("renditions")
+    serializer_class = MediaSerializer
+    pagination_class = MediaPagination
+    cache_dependencies = [MediaRendition]
+    conditional_dependencies = ["renditions"]
+    lookup_value_regex = "[0-9a-f-]{36}"
+
+    def get_queryset(self):
+        return super().get_queryset().filter(upload__user=self.request.user)
+
+
+class MediaUploadPagination(KeysetPagination):
+    ordering = "-created"
+
+
+class MediaUploadViewSet(
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Resumable chunked uploads for `Media`.
+
+    - `GET /media/uploads/` lists the uploads of the user, newest first, with keyset pagination.
+    - `POST /media/uploads/` with `filename`, `size`, `media_type` and `title` starts an upload.
+    - `PUT /media/uploads/<id>/` with a raw body and `Content-Range: bytes <start>-<end>/<size>`
+      appends a chunk. The body is streamed to disk and never parsed or buffered in full.
+    - `GET /media/uploads/<id>/` returns the current `offset` to resume from after a failure.
+    - `DELETE /media/uploads/<id>/` abandons the upload.
+
+    The response to the last chunk contains the created `Media` under `media`. If creating
+    it failed, repeating the last `PUT` completes the upload without resending the chunk.
+    """
+
+    serializer_class = MediaUploadSerializer
+    pagination_class = MediaUploadPagination
+
+    def get_queryset(self):
+        return (
+            MediaUpload.objects.filter(user=self.request.user)
+            .select_related("media")
+            .prefetch_related("media__renditions")
+        )
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def update(self, request, *args, **kwargs):
+        upload = self.get_object()
+        if upload.media_id is not None:
+            return Response(self.get_serializer(upload).data)
+
+        if not upload.is_complete:
+            start, end = parse_content_range(request.META.get("HTTP_CONTENT_RANGE"), upload)
+            upload = write_chunk(upload, request.stream, start, end)
+        if upload.is_complete:
+            complete_upload(upload)
+            return Response(self.get_serializer(upload).data, status=status.HTTP_201_CREATED)
+        return Response(self.get_serializer(upload).data)
+
+    def perform_destroy(self, instance):
+        discard_upload(instance)
+        instance.delete()
+
+
+def metrics(request):
+    """
+    Serve `core.metrics` in the Prometheus text format to staff users and holders of `METRICS["TOKEN"]`.
+    """
+    token = settings.METRICS["TOKEN"]
+    has_token = bool(token) and constant_time_compare(request.META.get("HTTP_AUTHORIZATION", ""), f"Bearer {token}")
+    if not has_token and not request.user.is_staff:
+        raise PermissionDenied
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
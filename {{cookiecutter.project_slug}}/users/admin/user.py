@@ -9,7 +9,7 @@ from users.models.user import User
 class UserAdmin(UserAdmin):
     model = User
     list_display = ('id', '{{ cookiecutter.username_type }}', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
-    list_filter = ('is_active', 'is_staff', 'is_superuser')
+    list_filter = ('is_active', 'is_blocked', 'is_staff', 'is_superuser')
     search_fields = ('{{ cookiecutter.username_type }}', 'first_name', 'last_name')
     
     fieldsets = (
@@ -25,6 +25,7 @@ class UserAdmin(UserAdmin):
             {
                 "fields": (
                     "is_active",
+                    "is_blocked",
                     "is_staff",
                     "is_superuser",
                     "groups",
@@ -0,0 +1,272 @@
+"""
+Password hashing on a bounded pool of worker processes.
+
+Hashing is deliberately slow CPU work; done on the request threads, a burst of logins
+takes every thread of every server process and starves the other endpoints. Here each
+server process sends its hashes to a pool of `PASSWORD_HASHING["WORKERS"]` processes,
+and lets at most `MAX_PENDING` more callers queue for them. A caller that cannot get a
+slot within `QUEUE_TIMEOUT` seconds fails with `HashingPoolBusy` (503), so overload
+turns into fast rejections rather than a growing backlog.
+
+The pool belongs to one server process, so a host runs `GUNICORN_WORKERS * WORKERS`
+hashing processes (plus `MAX_PENDING` queued hashes per server process). More hashing
+processes than CPUs only makes every hash slower; the default `WORKERS` therefore
+shares the CPUs among the server processes, with at least one each.
+
+`User.set_password` and `User.check_password` go through the pool, which covers
+`UserManager.create_user`, `ModelBackend` and the JWT token views. With `WORKERS` set
+to 0 everything is hashed inline, as in the tests.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+{%- if cookiecutter.use_drf == "y" %}
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+{%- endif %}
+
+{% if cookiecutter.use_drf == "y" %}
+class HashingPoolBusy(APIException):
+    """
+    Raised when no hashing slot frees up within `PASSWORD_HASHING["QUEUE_TIMEOUT"]` seconds.
+    """
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Too many sign-ins at the moment, try again shortly.")
+    default_code = "hashing_pool_busy"
+    # Sent as Retry-After by the DRF exception handler.
+    wait = 1
+{% else %}
+class HashingPoolBusy(Exception):
+    """
+    Raised when no hashing slot frees up within `PASSWORD_HASHING["QUEUE_TIMEOUT"]` seconds.
+    """
+{% endif %}
+
+def _make_password(password):
+    return hashers.make_password(password)
+
+
+def _check_password(password, encoded):
+    upgrade = []
+    valid = hashers.check_password(password, encoded, setter=upgrade.append)
+    return valid, bool(upgrade)
+
+
+class HashingPool:
+    """
+    A process pool with a bounded number of hashes running or queued.
+
+    A worker that dies (e.g. killed by the OOM killer) breaks a `ProcessPoolExecutor` for
+    good: every pending and later task fails with `BrokenProcessPool`. The pool then drops
+    the executor, starts a new one and runs the hash again, so one lost process costs a
+    retry instead of failing every sign-in until the server process restarts.
+
+    Args:
+    - workers: Worker processes, started on first use.
+    - max_pending: Hashes allowed to wait for a worker on top of the running ones.
+    - timeout: Seconds a caller waits for a slot before `HashingPoolBusy`.
+    - start_method: The `multiprocessing` start method; "forkserver" does not copy the
+      threads and connections of the server process into the workers.
+    """
+
+    def __init__(self, workers, max_pending, timeout, start_method):
+        self.workers = workers
+        self.timeout = timeout
+        self.start_method = start_method
+        self.slots = threading.BoundedSemaphore(workers + max_pending)
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def get_executor(self):
+        if self.executor is None:
+            with self.lock:
+                if self.executor is None:
+                    self.executor = ProcessPoolExecutor(
+                        self.workers, mp_context=multiprocessing.get_context(self.start_method)
+                    )
+        return self.executor
+
+    def discard_executor(self, executor):
+        """
+        Drop a broken `executor`, unless another caller has already replaced it.
+        """
+        with self.lock:
+            if self.executor is executor:
+                self.executor = None
+        executor.shutdown(wait=False)
+
+    def submit(self, func, *args, timeout=None):
+        """
+        Run `func(*args)` on the pool once a slot is free; return its future.
+
+        Raises:
+        - HashingPoolBusy: If no slot frees up within `timeout` (default `self.timeout`) seconds.
+        """
+        if not self.slots.acquire(timeout=self.timeout if timeout is None else timeout):
+            raise HashingPoolBusy()
+        try:
+            executor = self.get_executor()
+            try:
+                future = executor.submit(func, *args)
+            except BrokenProcessPool:
+                self.discard_executor(executor)
+                executor = self.get_executor()
+                future = executor.submit(func, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda future: self.done(executor, future))
+        return future
+
+    def done(self, executor, future):
+        self.slots.release()
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self.discard_executor(executor)
+
+    def run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        try:
+            return self.submit(func, *args).result()
+        except BrokenProcessPool:
+            # The worker died with this hash; submit() starts a new executor.
+            return self.submit(func, *args).result()
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                options = settings.PASSWORD_HASHING
+                _pool = HashingPool(
+                    options["WORKERS"], options["MAX_PENDING"], options["QUEUE_TIMEOUT"], options["START_METHOD"]
+                )
+    return _pool
+
+
+def _reset_after_fork():
+    # The executor's processes and threads belong to the parent; a forked child starts its own pool.
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def make_password(password):
+    """
+    Hash `password` with the preferred hasher on the pool; `None` gives an unusable password.
+    """
+    if password is None:
+        return hashers.make_password(None)
+    return get_pool().run(_make_password, password)
+
+
+def check_password(password, encoded):
+    """
+    Check `password` against `encoded` on the pool.
+
+    Returns:
+    - tuple: Whether the password matches, and whether `encoded` should be upgraded to
+      the preferred hasher or work factor (only ever true for a match).
+    """
+    if password is None or not hashers.is_password_usable(encoded):
+        return False, False
+    return get_pool().run(_check_password, password, encoded)
+
+
+def _store_upgrade(user_id, encoded, upgraded):
+    from django.contrib.auth import get_user_model
+
+    # Only replaces the hash that was checked, never a password changed in the meantime.
+    get_user_model().objects.filter(pk=user_id, password=encoded).update(password=upgraded)
+
+
+def _store_upgrade_when_done(user_id, encoded, future):
+    from django.db import connections
+
+    try:
+        _store_upgrade(user_id, encoded, future.result())
+    finally:
+        connections.close_all()
+
+
+def upgrade_password(user_id, password, encoded):
+    """
+    Rehash a correct `password` of a user whose `encoded` hash is outdated, in the background.
+
+    The upgrade only uses a free slot and is skipped when the pool is busy; the next
+    sign-in tries again.
+    """
+    pool = get_pool()
+    if not pool.workers:
+        _store_upgrade(user_id, encoded, _make_password(password))
+        return
+    try:
+        future = pool.submit(_make_password, password, timeout=0)
+    except HashingPoolBusy:
+        return
+    threading.Thread(
+        target=_store_upgrade_when_done, args=(user_id, encoded, future), name="password-upgrade", daemon=True
+    ).start()
+
+
+@contextmanager
+def bulk_hasher(workers=None):
+    """
+    Yield a function hashing a list of passwords in parallel on `workers` processes.
+
+    Meant for offline work such as imports: the processes (one per CPU by default, none
+    when `PASSWORD_HASHING["WORKERS"]` is 0) are started once for the block, apart from
+    the bounded pool serving requests. `None` passwords give unusable passwords.
+
+    Example:
+    ```
+    with bulk_hasher() as hash_passwords:
+        for batch in batches:
+            hashes = hash_passwords([row["password"] for row in batch])
+    ```
+    """
+    if workers is None:
+        workers = os.cpu_count() if settings.PASSWORD_HASHING["WORKERS"] else 1
+    if workers <= 1:
+        yield lambda passwords: [_make_password(password) for password in passwords]
+        return
+
+    context = multiprocessing.get_context(settings.PASSWORD_HASHING["START_METHOD"])
+    with ProcessPoolExecutor(workers, mp_context=context) as executor:
+
+        def hash_passwords(passwords):
+            chunksize = max(1, len(passwords) // (workers * 4))
+            return list(executor.map(_make_password, passwords, chunksize=chunksize))
+
+        yield hash_passwords
+
+
+def hash_many(passwords, workers=None):
+    """
+    Hash `passwords` in parallel, see `bulk_hasher`; return the hashes in order.
+    """
+    with bulk_hasher(workers) as hash_passwords:
+        return hash_passwords(list(passwords))
@@ -0,0 +1,64 @@
+import csv
+import json
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.models.user import User
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users from a CSV file with a header row or a JSON Lines file, in batches. Rows that are invalid "
+        "or name an existing user are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="The file to import, or - for standard input.")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--copy", action="store_true", help="Insert with PostgreSQL COPY instead of INSERT.")
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Password hashing processes, default one per CPU."
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or FORMATS.get(Path(path).suffix.lower())
+        if file_format is None:
+            raise CommandError("Cannot tell the format from the file name, pass --format.")
+
+        self.invalid_lines = 0
+        file = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        with file:
+            rows = self.read_csv(file) if file_format == "csv" else self.read_jsonl(file)
+            created, skipped = User.objects.bulk_create_users(
+                rows,
+                batch_size=options["batch_size"],
+                use_copy=options["copy"],
+                workers=options["workers"],
+                on_reject=self.report,
+            )
+        self.stdout.write(self.style.SUCCESS(f"Created {created} users, skipped {skipped + self.invalid_lines}."))
+
+    def read_csv(self, file):
+        for row in csv.DictReader(file):
+            # Empty cells leave the field to its default.
+            yield {field: value for field, value in row.items() if value != ""}
+
+    def read_jsonl(self, file):
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as exc:
+                self.invalid_lines += 1
+                self.stderr.write(f"Skipped line {number}: {exc}.")
+
+    def report(self, row, reason):
+        name = row.get(User.USERNAME_FIELD) if isinstance(row, dict) else None
+        self.stderr.write(f"Skipped {name or repr(row)}: {reason}")
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+
+from users.models.user import UserSession
+
+
+class Command(BaseCommand):
+    help = "Delete revoked user sessions in bounded batches, or schedule the recurring purge job."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="Schedule the recurring django_rq purge job instead of purging now.",
+        )
+        parser.add_argument("--batch-size", type=int, default=settings.USER_SESSION_PURGE["BATCH_SIZE"])
+        parser.add_argument("--max-batches", type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options["schedule"]:
+            if "django_rq" not in settings.INSTALLED_APPS:
+                raise CommandError("Scheduling the purge job requires django_rq.")
+            from users.jobs import schedule_purge_expired_sessions
+
+            job = schedule_purge_expired_sessions()
+            self.stdout.write(self.style.SUCCESS(f"Scheduled purge job {job.id}."))
+            return
+
+        deleted = UserSession.objects.purge_expired(
+            before=now() - settings.USER_SESSION_PURGE["RETENTION"],
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired sessions."))
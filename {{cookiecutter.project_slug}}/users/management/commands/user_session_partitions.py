@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, NotSupportedError
+
+from users.partitions import UserSessionPartitioner
+
+
+class Command(BaseCommand):
+    help = "Convert UserSession to a month-partitioned table and create or expire its partitions."
+
+    def add_arguments(self, parser):
+        options = settings.USER_SESSION_PARTITIONING
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Convert the existing UserSession table into a partitioned table (one-off).",
+        )
+        parser.add_argument("--months-ahead", type=int, default=options["MONTHS_AHEAD"])
+        parser.add_argument("--retention-months", type=int, default=options["RETENTION_MONTHS"])
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            default=options["DROP_EXPIRED"],
+            help="Drop expired partitions instead of detaching them.",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        if not settings.USER_SESSION_PARTITIONING["ENABLED"]:
+            raise CommandError("Set USER_SESSION_PARTITIONING=True to manage UserSession partitions.")
+
+        try:
+            partitioner = UserSessionPartitioner(using=options["database"])
+            if options["convert"]:
+                created = partitioner.convert(options["months_ahead"])
+                self.stdout.write(self.style.SUCCESS(f"Converted {partitioner.table} to a partitioned table."))
+            else:
+                if not partitioner.is_partitioned():
+                    raise CommandError(f"{partitioner.table} is not partitioned yet, run with --convert first.")
+                created = partitioner.create_partitions(options["months_ahead"])
+            expired = partitioner.expire_partitions(options["retention_months"], drop=options["drop"])
+        except NotSupportedError as exc:
+            raise CommandError(exc)
+
+        for name in created:
+            self.stdout.write(f"Created partition {name}.")
+        for name in expired:
+            self.stdout.write(f"{'Dropped' if options['drop'] else 'Detached'} partition {name}.")
@@ -1,11 +1,39 @@
+from io import StringIO
+from itertools import islice
+
 from django.contrib.auth.base_user import BaseUserManager
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connections, models, router, transaction
 from django.utils.translation import gettext_lazy as _
 
+from core.managers import SoftDeleteManagerMixin, SoftDeleteQuerySet
+from users import hashing
+
+
+# Spellings from CSV exports that BooleanField.to_python does not accept.
+BOOLEAN_STRINGS = {"true": True, "false": False, "yes": True, "no": False}
+
+
+def _format_errors(exc):
+    if hasattr(exc, "error_dict"):
+        return "; ".join(f"{field}: {' '.join(messages)}" for field, messages in exc.message_dict.items())
+    return " ".join(exc.messages)
+
 
-class UserManager(BaseUserManager):
+def _copy_value(value):
+    # PostgreSQL COPY text format.
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+class UserManager(SoftDeleteManagerMixin, BaseUserManager.from_queryset(SoftDeleteQuerySet)):
     """
     Custom user model manager where email is the unique identifiers
-    for authentication instead of usernames.
+    for authentication instead of usernames. Soft-deleted users are left out
+    unless created with `include_removed=True`.
     """
     def create_user(self, email, password, **extra_fields):
         if not email:
@@ -26,3 +54,140 @@ class UserManager(BaseUserManager):
         if extra_fields.get("is_superuser") is not True:
             raise ValueError(_("Superuser must have is_superuser=True."))
         return self.create_user(email, password, **extra_fields)
+
+    def bulk_create_users(self, rows, batch_size=1000, use_copy=False, workers=None, on_reject=None):
+        """
+        Create users from an iterable of dicts, a batch at a time.
+
+        Rows are consumed lazily, so memory use does not grow with the input. A row holds
+        the username field, an optional `password` (unusable when missing) and other
+        `User` fields, as strings or values. Each batch is validated with `clean_fields`,
+        checked against existing users in one query, hashed in parallel (see
+        `users.hashing.bulk_hasher`) and inserted in its own transaction, with
+        `bulk_create` or, when `use_copy` is set on PostgreSQL, with COPY. As with
+        `bulk_create`, no signals are sent.
+
+        Invalid rows and rows whose username field is taken, also by a user created by
+        someone else while the batch is inserted, are passed to `on_reject(row, reason)`
+        and skipped; the run goes on.
+
+        Args:
+        - rows: Iterable of dicts.
+        - batch_size: Rows validated, hashed and inserted together.
+        - use_copy: Insert with PostgreSQL COPY instead of INSERT.
+        - workers: Hashing processes, by default one per CPU.
+        - on_reject: Called with every skipped row and the reason.
+
+        Returns:
+        - tuple: The number of created and of skipped rows.
+
+        Example:
+        ```
+        rows = ({"email": line.strip()} for line in open("emails.txt"))
+        created, skipped = User.objects.bulk_create_users(rows, on_reject=lambda row, reason: print(row, reason))
+        ```
+        """
+        using = self._db or router.db_for_write(self.model)
+        key = self.model.USERNAME_FIELD
+        taken_message = _("A user with this %(field)s already exists.") % {"field": key}
+        created = skipped = 0
+        rows = iter(rows)
+
+        def reject(row, reason):
+            nonlocal skipped
+            skipped += 1
+            if on_reject is not None:
+                on_reject(row, reason)
+
+        with hashing.bulk_hasher(workers) as hash_passwords:
+            while batch := list(islice(rows, batch_size)):
+                pending = {}
+                for row in batch:
+                    try:
+                        user, password = self._build_user(row)
+                    except ValidationError as exc:
+                        reject(row, _format_errors(exc))
+                        continue
+                    if getattr(user, key) in pending:
+                        reject(row, _("Repeated in the input."))
+                        continue
+                    pending[getattr(user, key)] = (row, user, password)
+
+                # Removed users keep their username until they are archived.
+                taken = self.model.all_objects.db_manager(using).filter(**{f"{key}__in": list(pending)})
+                taken = taken.values_list(key, flat=True)
+                for value in set(taken):
+                    reject(pending.pop(value)[0], taken_message)
+
+                users = [user for row, user, password in pending.values()]
+                hashes = hash_passwords([password for row, user, password in pending.values()])
+                for user, encoded in zip(users, hashes):
+                    user.password = encoded
+                inserted = {id(user) for user in self._insert_users(users, using, use_copy)}
+                created += len(inserted)
+                for row, user, password in pending.values():
+                    if id(user) not in inserted:
+                        reject(row, taken_message)
+        return created, skipped
+
+    def _build_user(self, row):
+        """
+        Return an unsaved user for `row` and its raw password; raise `ValidationError` for an invalid row.
+        """
+        if not isinstance(row, dict):
+            raise ValidationError(_("Expected an object of user fields."))
+        row = dict(row)
+        password = row.pop("password", None) or None
+        fields = {field.name for field in self.model._meta.concrete_fields if not field.primary_key}
+        unknown = set(row) - fields
+        if unknown:
+            raise ValidationError(_("Unknown fields: %(fields)s.") % {"fields": ", ".join(sorted(unknown))})
+        if not row.get(self.model.USERNAME_FIELD):
+            raise ValidationError({self.model.USERNAME_FIELD: [_("This field is required.")]})
+        if row.get("email"):
+            row["email"] = self.normalize_email(row["email"])
+        for field in self.model._meta.concrete_fields:
+            if isinstance(field, models.BooleanField) and isinstance(row.get(field.name), str):
+                row[field.name] = BOOLEAN_STRINGS.get(row[field.name].lower(), row[field.name])
+        user = self.model(**row)
+        user.clean_fields(exclude=["password"])
+        return user, password
+
+    def _insert_users(self, users, using, use_copy):
+        """
+        Insert `users`, skipping those that conflict with an existing row; return the inserted users.
+        """
+        if not users:
+            return []
+        connection = connections[using]
+        if use_copy and connection.vendor == "postgresql":
+            try:
+                with transaction.atomic(using=using):
+                    self._copy_users(users, connection)
+                return users
+            except IntegrityError:
+                # A conflicting user appeared since the batch was checked; fall back to skipping conflicts.
+                pass
+        key = self.model.USERNAME_FIELD
+        with transaction.atomic(using=using):
+            self.db_manager(using).bulk_create(users, ignore_conflicts=True)
+            # bulk_create returns every object when ignoring conflicts. A row was inserted from
+            # this batch when it holds the password hash of the instance, which is salted.
+            stored = self.model.all_objects.db_manager(using).filter(
+                **{f"{key}__in": [getattr(user, key) for user in users]}
+            )
+            stored = dict(stored.values_list(key, "password"))
+        return [user for user in users if stored.get(getattr(user, key)) == user.password]
+
+    def _copy_users(self, users, connection):
+        fields = [field for field in self.model._meta.concrete_fields if not isinstance(field, models.AutoField)]
+        buffer = StringIO()
+        for user in users:
+            values = (field.get_db_prep_save(field.pre_save(user, True), connection) for field in fields)
+            buffer.write("\t".join(_copy_value(value) for value in values) + "\n")
+        buffer.seek(0)
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+        # copy_expert goes straight to the psycopg2 cursor, bypassing Django's error translation.
+        with connection.cursor() as cursor, connection.wrap_database_errors:
+            cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN", buffer)
@@ -0,0 +1,109 @@
+from django.db import connections, models, router
+from django.utils.timezone import now
+
+from core.managers import BaseManager, BaseQuerySet
+
+
+class UserSessionQuerySet(BaseQuerySet):
+    """
+    QuerySet for `UserSession` with lifecycle helpers.
+
+    A session is active while `expire_at` is NULL; revoking a session sets `expire_at`
+    and the row is removed later by `UserSessionManager.purge_expired`.
+    """
+
+    def active(self):
+        return self.filter(expire_at__isnull=True)
+
+    def expired(self, before=None):
+        if before is None:
+            return self.filter(expire_at__isnull=False)
+        return self.filter(expire_at__lt=before)
+
+    def revoke(self):
+        """
+        Revoke every active session in the queryset with a single UPDATE.
+
+        The ids of the affected sessions are read first so that they can be dropped from
+        `core.session_cache` once the UPDATE is committed.
+
+        Returns:
+        - int: The number of revoked sessions.
+        """
+        from core.session_cache import session_cache
+
+        session_ids = list(self.active().values_list("id", flat=True))
+        if not session_ids:
+            return 0
+
+        timestamp = now()
+        revoked = self.model._default_manager.filter(id__in=session_ids, expire_at__isnull=True).update(
+            expire_at=timestamp, modified=timestamp
+        )
+        session_cache.invalidate_on_commit(*session_ids)
+        return revoked
+
+
+class UserSessionManager(BaseManager.from_queryset(UserSessionQuerySet)):
+    """
+    Manager for `UserSession` adding bulk revocation and batched purging of expired rows.
+    """
+
+    def revoke_for_users(self, users):
+        """
+        Revoke all active sessions of one or more users ("log out everywhere").
+
+        Args:
+        - users: A `User` instance, a user id, or an iterable / queryset of either.
+
+        Returns:
+        - int: The number of revoked sessions.
+        """
+        if isinstance(users, (models.Model, int, str)):
+            users = [users]
+        return self.filter(user__in=users).revoke()
+
+    def purge_expired_batch(self, before, batch_size):
+        """
+        Hard-delete at most `batch_size` sessions that expired before `before`.
+
+        Runs as one short DELETE statement so that locks are only held for a single batch,
+        on the database that `router.db_for_write` picks rather than a read replica.
+        Expired sessions are already revoked, so no cache invalidation is needed.
+
+        Returns:
+        - int: The number of deleted sessions.
+        """
+        connection = connections[self._db or router.db_for_write(self.model)]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        pk = connection.ops.quote_name(self.model._meta.pk.column)
+        expire_at = connection.ops.quote_name(self.model._meta.get_field("expire_at").column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE {pk} IN "
+                f"(SELECT {pk} FROM {table} WHERE {expire_at} < %s LIMIT %s)",
+                [before, batch_size],
+            )
+            return cursor.rowcount
+
+    def purge_expired(self, before, batch_size=5000, max_batches=None):
+        """
+        Hard-delete every session that expired before `before`, one bounded batch at a time.
+
+        Args:
+        - before: Sessions with `expire_at` older than this datetime are deleted.
+        - batch_size: Maximum number of rows deleted per statement.
+        - max_batches: Optional cap on the number of batches for a single run.
+
+        Returns:
+        - int: The total number of deleted sessions.
+        """
+        deleted = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            count = self.purge_expired_batch(before, batch_size)
+            deleted += count
+            batches += 1
+            if count < batch_size:
+                break
+        return deleted
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.7 on 2026-10-18 03:49
+
+from django.conf import settings
+{%- if cookiecutter.username_type == "username" %}
+import django.contrib.auth.validators
+{%- endif %}
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+{%- if cookiecutter.username_type == "username" %}
+                ('username', models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='email address')),
+{%- endif %}
+                ('is_removed', models.BooleanField(default=False)),
+                ('removed_at', models.DateTimeField(blank=True, db_column='removed_at', editable=False, null=True, verbose_name='Removed At')),
+                ('first_name', models.CharField(blank=True, max_length=200, null=True, verbose_name='First name')),
+                ('last_name', models.CharField(blank=True, max_length=200, null=True, verbose_name='Last name')),
+{%- if cookiecutter.username_type == "email" %}
+                ('email', models.EmailField(max_length=254, unique=True, verbose_name='Email address')),
+{%- endif %}
+                ('is_blocked', models.BooleanField(db_column='is_blocked', default=False, verbose_name='Blocked')),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions')),
+            ],
+            options={
+                'verbose_name': 'user',
+                'verbose_name_plural': 'users',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='UserSession',
+            fields=[
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('is_removed', models.BooleanField(default=False)),
+                ('id', model_utils.fields.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('removed_at', models.DateTimeField(blank=True, db_column='removed_at', editable=False, null=True, verbose_name='Removed At')),
+                ('ip_address', models.GenericIPAddressField(blank=True, db_column='ip_address', null=True, verbose_name='IP Address')),
+                ('agent', models.JSONField(db_column='agent', null=True, verbose_name='Agent')),
+                ('expire_at', models.DateTimeField(blank=True, db_column='expire_at', null=True, verbose_name='Expire At')),
+                ('user', models.ForeignKey(db_column='user', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='user_sessions', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'User Session',
+                'verbose_name_plural': 'User Sessions',
+                'db_table': 'UserSession',
+                'ordering': ['created'],
+                'abstract': False,
+                'indexes': [models.Index(condition=models.Q(('is_removed', False)), fields=['created', 'id'], name='usersession_created_idx'), models.Index(condition=models.Q(('is_removed', True)), fields=['removed_at'], name='usersession_removed_idx'), models.Index(fields=['user', 'expire_at'], name='usersession_user_expire_idx'), models.Index(condition=models.Q(('expire_at__isnull', False)), fields=['expire_at'], name='usersession_expired_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_removed', True)), fields=['removed_at'], name='user_removed_idx'),
+        ),
+    ]
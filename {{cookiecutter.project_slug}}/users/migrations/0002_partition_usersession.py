@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def partition_user_sessions(apps, schema_editor):
+    """
+    Convert UserSession into a partitioned table when `USER_SESSION_PARTITIONING` is enabled.
+
+    Running the conversion as a migration records it in the migration history, so later
+    migrations touching UserSession apply after it everywhere, and databases built from
+    migrations match. Deployments that enable partitioning later convert with
+    `manage.py user_session_partitions --convert`.
+    """
+    options = settings.USER_SESSION_PARTITIONING
+    if not options["ENABLED"] or schema_editor.connection.vendor != "postgresql":
+        return
+
+    from users.partitions import UserSessionPartitioner
+
+    partitioner = UserSessionPartitioner(
+        using=schema_editor.connection.alias, model=apps.get_model("users", "UserSession")
+    )
+    if not partitioner.is_partitioned():
+        partitioner.convert(options["MONTHS_AHEAD"])
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction; convert() opens its own.
+    atomic = False
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_user_sessions, migrations.RunPython.noop, atomic=False),
+    ]
@@ -3,10 +3,22 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.utils.timezone import now
 
+from users import hashing
 from users.managers.user import UserManager
-from core.models import BaseModel
+from users.managers.user_session import UserSessionManager
+from core.models import BaseModel, SoftDeleteModel
+
+class User(SoftDeleteModel, AbstractUser):
+    """
+    The user model, signing in with its `USERNAME_FIELD`.
+
+    Deleting a user soft-deletes it (see `core.models.SoftDeleteModel`): `objects`, and
+    with it authentication, leaves removed users out, while `all_objects` includes them.
+    A removed user keeps its username until `core.archive` moves the row away, and
+    `validate_unique()` reports it as taken. Blocked users stay visible but can no longer
+    authenticate with a token.
+    """
 
-class User(AbstractUser):
     first_name = models.CharField(
         max_length=200,
         verbose_name=_('First name'),
@@ -26,11 +38,33 @@ class User(AbstractUser):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
     {%- endif %}
+    is_blocked = models.BooleanField(verbose_name=_("Blocked"), default=False, db_column="is_blocked")
+
     objects = UserManager()
+    all_objects = UserManager(include_removed=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=["removed_at"], name="user_removed_idx", condition=models.Q(is_removed=True)),
+        ]
 
     def __str__(self):
         return f'{self.email} -#{self.id}'
 
+    def set_password(self, raw_password):
+        # Hashed on the users.hashing process pool instead of the request thread.
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """
+        Check `raw_password` on the hashing pool; an outdated hash is upgraded in the background.
+        """
+        valid, must_update = hashing.check_password(raw_password, self.password)
+        if must_update and self.pk:
+            hashing.upgrade_password(self.pk, raw_password, self.password)
+        return valid
+
 
 class UserSession(BaseModel):
     """
@@ -43,16 +77,18 @@ class UserSession(BaseModel):
     - `user`: ForeignKey to the User model.
     - `ip_address`: IP address of the user during the session.
     - `agent`: User agent information stored as JSON.
-    - `expire_at`: Date and time when the session will expire.
+    - `expire_at`: Date and time when the session was revoked; NULL while the session is active.
 
     Methods:
     - `__str__`: Returns a string representation of the user session.
+    - `revoke`: Marks the session as expired; expired rows are purged in batches by `users.jobs`.
 
     Meta:
     - `verbose_name`: "User Session"
     - `verbose_name_plural`: "User Sessions"
     - `db_table`: "UserSession"
     - `ordering`: Default ordering based on the 'created' field.
+    - `indexes`: `(created, id)` from `BaseModel`, active sessions per user, and expired sessions for the purge job.
 
     Example:
     ```
@@ -68,6 +104,8 @@ class UserSession(BaseModel):
         on_delete=models.CASCADE,
         db_column="user",
         related_name="user_sessions",
+        # Covered by the leading column of the (user, expire_at) index below.
+        db_index=False,
     )
     ip_address = models.GenericIPAddressField(
         verbose_name=_("IP Address"), protocol="both", unpack_ipv4=False, null=True, blank=True, db_column="ip_address"
@@ -75,15 +113,30 @@ class UserSession(BaseModel):
     agent = models.JSONField(verbose_name=_("Agent"), null=True, db_column="agent")
     expire_at = models.DateTimeField(verbose_name=_("Expire At"), blank=True, null=True, db_column="expire_at")
 
+    objects = UserSessionManager()
+
+    # Loaded on every authenticated request; revoke() names its fields, so the tracker would only cost time.
+    track_changes = False
+    # Sessions are revoked with revoke() and purged by users.jobs; delete() removes the row at once.
+    soft_delete = False
+
     def __str__(self):
         return str(self.ip_address) + "(" + str(self.agent) + ")"
 
-    class Meta:
+    class Meta(BaseModel.Meta):
         verbose_name = "User Session"
         verbose_name_plural = "User Sessions"
         db_table = "UserSession"
         ordering = ["created"]
-
-    def delete(self):
-        self.expire_at = now()
-        super().delete()
+        indexes = [
+            *BaseModel.Meta.indexes,
+            models.Index(fields=["user", "expire_at"], name="usersession_user_expire_idx"),
+            models.Index(
+                fields=["expire_at"], name="usersession_expired_idx", condition=models.Q(expire_at__isnull=False)
+            ),
+        ]
+
+    def revoke(self):
+        if self.expire_at is None:
+            self.expire_at = now()
+            self.save(update_fields=["expire_at"])
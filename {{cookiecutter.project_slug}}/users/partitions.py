@@ -0,0 +1,310 @@
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db import NotSupportedError, connections, transaction
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
+
+from users.models.user import UserSession
+
+PARTITION_BOUND_RE = re.compile(r"FROM \((?P<lower>[^)]*)\) TO \((?P<upper>[^)]*)\)")
+
+
+def month_start(value, months=0):
+    """
+    Return midnight UTC on the first day of the month `months` months after the month of `value`.
+    """
+    month = value.year * 12 + value.month - 1 + months
+    return datetime(month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def parse_bound(value):
+    value = value.strip()
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return parse_datetime(value.strip("'"))
+
+
+class UserSessionPartitioner:
+    """
+    Manage `UserSession` as a PostgreSQL table range-partitioned by `created` month.
+
+    `convert` turns the existing table into a partitioned one. The original table
+    becomes the `<table>_legacy` partition, which covers everything created before
+    next month, and `<table>_default` catches rows no monthly partition covers yet.
+    Monthly partitions are named `<table>_pYYYYMM`. `create_partitions` creates them
+    ahead of time and `expire_partitions` detaches or drops whole months once they are
+    past retention. Dropping a month replaces millions of row-level deletes with one
+    catalog change, and each partition keeps its own small indexes.
+
+    PostgreSQL requires unique keys to include the partition key, so the primary key
+    becomes `(id, created)`. The model (and Django's migration state) still declares `id`
+    as the primary key: ids stay unique in practice (UUID4) but are no longer enforced
+    across partitions, and migrations that alter `id` or the primary key need hand-written
+    SQL on a converted database. A lookup by `id` alone cannot be pruned and probes the
+    primary key index of every partition, so keep their number small with
+    `RETENTION_MONTHS` and filter on `created` as well where it is known.
+
+    Example:
+    ```
+    partitioner = UserSessionPartitioner()
+    partitioner.create_partitions(months_ahead=3)
+    partitioner.expire_partitions(retention_months=3, drop=True)
+    ```
+    """
+
+    model = UserSession
+
+    def __init__(self, using="default", model=None, lock_timeout="5s"):
+        self.using = using
+        self.connection = connections[using]
+        if self.connection.vendor != "postgresql":
+            raise NotSupportedError("UserSession partitioning requires PostgreSQL.")
+        if model is not None:
+            # The historical model, when run from a migration.
+            self.model = model
+        self.table = self.model._meta.db_table
+        self.lock_timeout = lock_timeout
+
+    def quote(self, name):
+        return self.connection.ops.quote_name(name)
+
+    def column(self, field_name):
+        return self.quote(self.model._meta.get_field(field_name).column)
+
+    def partition_name(self, month):
+        return f"{self.table}_p{month:%Y%m}"
+
+    @property
+    def default_partition_name(self):
+        return f"{self.table}_default"
+
+    @contextmanager
+    def locking(self):
+        """
+        Run the block in a transaction whose lock waits give up after `lock_timeout`.
+
+        Waiting on a lock queues every later query on the table behind it, so DDL that
+        meets a long-running transaction fails fast instead (and can be retried).
+        """
+        with transaction.atomic(using=self.using), self.connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('lock_timeout', %s, true)", [self.lock_timeout])
+            yield cursor
+
+    def is_partitioned(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [self.quote(self.table)])
+            row = cursor.fetchone()
+        return row is not None and row[0] == "p"
+
+    def attached(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+                FROM pg_inherits
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE pg_inherits.inhparent = to_regclass(%s)
+                """,
+                [self.quote(self.table)],
+            )
+            return cursor.fetchall()
+
+    def partitions(self, attached=None):
+        """
+        Return `(name, lower, upper)` for every attached range partition; open bounds are None.
+        """
+        partitions = []
+        for name, bound in self.attached() if attached is None else attached:
+            match = PARTITION_BOUND_RE.search(bound)
+            if match is None:
+                continue
+            partitions.append((name, parse_bound(match["lower"]), parse_bound(match["upper"])))
+        return sorted(partitions, key=lambda partition: partition[2] or datetime.max.replace(tzinfo=timezone.utc))
+
+    def convert(self, months_ahead=3):
+        """
+        Convert the regular `UserSession` table into a partitioned table.
+
+        Existing rows are not copied: the old table is attached as the `<table>_legacy`
+        partition for everything created before next month (or the month after, within a
+        day of the month end, so that the conversion cannot straddle it). The slow steps run
+        first, while the table stays writable: the `(id, created)` unique index is built
+        concurrently, and a `CHECK` on the legacy range is added `NOT VALID` and validated,
+        which only takes a SHARE UPDATE EXCLUSIVE lock. The swap then runs in one
+        transaction under an ACCESS EXCLUSIVE lock and only changes the catalog: the index
+        becomes the legacy primary key, the check lets ATTACH PARTITION skip its scan, and
+        the legacy indexes and foreign key match those of the new parent, so they are
+        attached as they are.
+
+        Must run outside a transaction (CREATE INDEX CONCURRENTLY); a failed run can be
+        retried.
+
+        Raises:
+        - NotSupportedError: If the table is already partitioned or a transaction is open.
+        """
+        if self.is_partitioned():
+            raise NotSupportedError(f"{self.table} is already partitioned.")
+        if self.connection.in_atomic_block:
+            raise NotSupportedError(f"{self.table} cannot be converted inside a transaction.")
+
+        table = self.quote(self.table)
+        legacy_name = f"{self.table}_legacy"
+        legacy = self.quote(legacy_name)
+        key_index = self.quote(f"{self.table}_id_created_key")
+        legacy_check = self.quote(f"{legacy_name}_created_check")
+        pk = self.column("id")
+        created = self.column("created")
+        user_field = self.model._meta.get_field("user")
+        user_table = self.quote(user_field.related_model._meta.db_table)
+        user_pk = self.quote(user_field.target_field.column)
+        legacy_upper = month_start(now() + timedelta(days=1), 1)
+
+        with self.connection.cursor() as cursor:
+            # An interrupted run leaves an invalid index behind; build it from scratch.
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {key_index}")
+            cursor.execute(f"CREATE UNIQUE INDEX CONCURRENTLY {key_index} ON {table} ({pk}, {created})")
+        with self.locking() as cursor:
+            cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {legacy_check}")
+            cursor.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {legacy_check} CHECK ({created} < %s) NOT VALID", [legacy_upper]
+            )
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {legacy_check}")
+
+        with self.locking() as cursor:
+            cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+            cursor.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+
+            # The (id) primary key is replaced by the prebuilt (id, created) index, which matches the key of
+            # the parent. Index names are unique per schema, so the legacy ones are moved out of the way;
+            # the foreign key keeps the name Django gave it, on the parent too.
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'", [legacy]
+            )
+            (pk_constraint,) = cursor.fetchone()
+            cursor.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {self.quote(pk_constraint)}")
+            cursor.execute(
+                f"ALTER TABLE {legacy} ADD CONSTRAINT {self.quote(legacy_name + '_pkey')} "
+                f"PRIMARY KEY USING INDEX {key_index}"
+            )
+            for index in self.model._meta.indexes:
+                cursor.execute(
+                    f"ALTER INDEX IF EXISTS {self.quote(index.name)} RENAME TO {self.quote(index.name + '_legacy')}"
+                )
+            cursor.execute(
+                "SELECT conname FROM pg_constraint "
+                "WHERE conrelid = to_regclass(%s) AND confrelid = to_regclass(%s) AND contype = 'f'",
+                [legacy, user_table],
+            )
+            (fk_constraint,) = cursor.fetchone()
+
+            cursor.execute(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ({created})")
+            cursor.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {self.quote(self.table + '_pkey')} PRIMARY KEY ({pk}, {created})"
+            )
+            cursor.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {self.quote(fk_constraint)} FOREIGN KEY ({self.column('user')}) "
+                f"REFERENCES {user_table} ({user_pk}) DEFERRABLE INITIALLY DEFERRED"
+            )
+
+            with self.connection.schema_editor(atomic=False) as editor:
+                for index in self.model._meta.indexes:
+                    editor.add_index(self.model, index)
+
+            cursor.execute(
+                f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO (%s)", [legacy_upper]
+            )
+            cursor.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {legacy_check}")
+            cursor.execute(f"CREATE TABLE {self.quote(self.default_partition_name)} PARTITION OF {table} DEFAULT")
+
+            return self.create_partitions(months_ahead)
+
+    def create_partitions(self, months_ahead=3):
+        """
+        Create the monthly partitions for the current month and the next `months_ahead` months.
+
+        Months already covered by a partition (including the legacy one) are skipped. Rows
+        that landed in the default partition for a new month are moved into it.
+
+        Returns:
+        - list: The names of the partitions created.
+        """
+        attached = self.attached()
+        existing = self.partitions(attached)
+        default = next((name for name, bound in attached if bound == "DEFAULT"), None)
+        current = now()
+        created = []
+
+        for offset in range(months_ahead + 1):
+            lower = month_start(current, offset)
+            upper = month_start(current, offset + 1)
+            covered = any(
+                (start is None or start <= lower) and (end is None or lower < end) for _, start, end in existing
+            )
+            if covered:
+                continue
+            name = self.partition_name(lower)
+            with self.locking() as cursor:
+                self.create_partition(cursor, name, lower, upper, default)
+            created.append(name)
+        return created
+
+    def create_partition(self, cursor, name, lower, upper, default=None):
+        table = self.quote(self.table)
+        partition = f"{self.quote(name)} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)"
+        if default is None:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {partition}", [lower, upper])
+            return
+
+        # A new partition may not cover rows already in the default one: detach it, move them, reattach.
+        default = self.quote(default)
+        in_range = f"{self.column('created')} >= %s AND {self.column('created')} < %s"
+        cursor.execute(f"SELECT 1 FROM {default} WHERE {in_range} LIMIT 1", [lower, upper])
+        if cursor.fetchone() is None:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {partition}", [lower, upper])
+            return
+        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default}")
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {partition}", [lower, upper])
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {default} WHERE {in_range}", [lower, upper])
+        cursor.execute(f"DELETE FROM {default} WHERE {in_range}", [lower, upper])
+        cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT")
+
+    def expire_partitions(self, retention_months=3, drop=False):
+        """
+        Detach (or drop) every partition whose whole range is older than `retention_months` months.
+
+        Detached partitions are left in place as plain tables so that they can be archived
+        before being dropped manually. The default partition is never expired.
+
+        Returns:
+        - list: The names of the partitions detached or dropped.
+        """
+        cutoff = month_start(now(), -retention_months)
+        expired = [name for name, _, upper in self.partitions() if upper is not None and upper <= cutoff]
+
+        with self.connection.cursor() as cursor:
+            for name in expired:
+                if drop:
+                    cursor.execute(f"DROP TABLE {self.quote(name)}")
+                else:
+                    cursor.execute(f"ALTER TABLE {self.quote(self.table)} DETACH PARTITION {self.quote(name)}")
+        return expired
+
+
+def maintain_partitions(using="default"):
+    """
+    Create upcoming partitions and expire old ones according to `USER_SESSION_PARTITIONING`.
+
+    Returns:
+    - tuple: The names of the created and of the expired partitions.
+    """
+    options = settings.USER_SESSION_PARTITIONING
+    partitioner = UserSessionPartitioner(using=using)
+    if not partitioner.is_partitioned():
+        return [], []
+    created = partitioner.create_partitions(options["MONTHS_AHEAD"])
+    expired = partitioner.expire_partitions(options["RETENTION_MONTHS"], drop=options["DROP_EXPIRED"])
+    return created, expired
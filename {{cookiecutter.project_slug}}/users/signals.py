@@ -0,0 +1,46 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.managers import post_bulk_save
+from core.session_cache import session_cache
+from users.models.user import User, UserSession
+
+
+@receiver(post_save, sender=UserSession)
+@receiver(post_delete, sender=UserSession)
+def invalidate_cached_session(sender, instance, **kwargs):
+    """
+    Drop a session from the session cache once a change to it is committed.
+    """
+    session_cache.invalidate_on_commit(instance.pk)
+
+
+@receiver(post_bulk_save, sender=UserSession)
+def invalidate_cached_sessions(sender, instances, **kwargs):
+    """
+    Drop a batch of sessions written by the `BaseQuerySet` bulk methods from the session cache.
+    """
+    session_cache.invalidate_on_commit(*(instance.pk for instance in instances))
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user_sessions(sender, instance, created, **kwargs):
+    """
+    Drop every cached session of a user once a change to the user is committed.
+
+    This covers deactivation as well as any other change to the cached user row.
+    """
+    if not created:
+        session_cache.invalidate_user_on_commit(instance)
+
+
+@receiver(post_bulk_save, sender=User)
+def invalidate_cached_users_sessions(sender, instances, **kwargs):
+    """
+    Drop every cached session of a batch of users written in bulk.
+
+    `User.objects.filter(...).delete()` and the admin "delete selected" action soft-delete
+    users this way.
+    """
+    if instances:
+        session_cache.invalidate_user_on_commit(*instances)
@@ -1,3 +1,432 @@
-from django.test import TestCase
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import NotSupportedError, connection, router
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils.timezone import now
+{%- if cookiecutter.use_django_rq == "y" %}
+
+import fakeredis
+from rq import Queue
+{%- endif %}
+
+{% if cookiecutter.use_django_rq == "y" %}from core.testing import make_user, run_scheduled_jobs
+from users.jobs import PURGE_EXPIRED_SESSIONS_JOB_ID_PREFIX, schedule_purge_expired_sessions
+{% else %}from core.testing import make_user
+{% endif %}from users import hashing
+from users.hashing import HashingPool, HashingPoolBusy
+from users.models.user import User, UserSession
+from users.partitions import UserSessionPartitioner, maintain_partitions, month_start, parse_bound
+
+
+class UserTestCase(TestCase):
+    def test_delete_hides_the_user_and_restore_brings_it_back(self):
+        user = make_user("removed")
+        user.delete()
+        self.assertFalse(User.objects.filter(pk=user.pk).exists())
+        self.assertIsNotNone(User.all_objects.get(pk=user.pk).removed_at)
+
+        user.restore()
+        self.assertTrue(User.objects.filter(pk=user.pk).exists())
+
+    def test_username_of_a_removed_user_is_reported_as_taken(self):
+        removed = make_user("taken")
+        removed.delete()
+        username = getattr(removed, User.USERNAME_FIELD)
+
+        user = User(**{"email": removed.email, User.USERNAME_FIELD: username})
+        user.set_password("password")
+        with self.assertRaises(ValidationError) as raised:
+            user.full_clean()
+        self.assertIn(User.USERNAME_FIELD, raised.exception.message_dict)
+
+        removed.full_clean()
+
+    def test_username_of_a_live_user_is_reported_once(self):
+        live = make_user("live")
+        user = User(**{"email": live.email, User.USERNAME_FIELD: getattr(live, User.USERNAME_FIELD)})
+        with self.assertRaises(ValidationError) as raised:
+            user.validate_unique()
+        self.assertEqual(len(raised.exception.message_dict[User.USERNAME_FIELD]), 1)
+
+
+class ImportUsersTestCase(TestCase):
+    def import_csv(self, *names, **options):
+        columns = list(dict.fromkeys([User.USERNAME_FIELD, "email"]))
+        lines = [",".join(columns)]
+        for name in names:
+            lines.append(",".join(f"{name}@example.com" if column == "email" else name for column in columns))
+        stdout, stderr = StringIO(), StringIO()
+        with mock.patch("sys.stdin", StringIO("\n".join(lines) + "\n")):
+            call_command("import_users", "-", format="csv", workers=0, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_rejects_invalid_repeated_and_taken_rows(self):
+        make_user("existing")
+        make_user("removed").delete()
+
+        stdout, stderr = self.import_csv("new", "not an email", "new", "existing", "removed")
+
+        self.assertIn("Created 1 users, skipped 4.", stdout)
+        self.assertEqual(len(stderr.splitlines()), 4)
+        self.assertIn("Repeated in the input.", stderr)
+        self.assertEqual(stderr.count("already exists"), 2)
+        self.assertFalse(User.objects.get(email="new@example.com").has_usable_password())
+
+    def test_rejects_rows_taken_while_the_batch_is_inserted(self):
+        @contextmanager
+        def racing_hasher(workers=None):
+            def hash_passwords(passwords):
+                make_user("racer")
+                return [make_password(password) for password in passwords]
+
+            yield hash_passwords
+
+        with mock.patch("users.hashing.bulk_hasher", racing_hasher):
+            stdout, stderr = self.import_csv("racer", "winner")
+
+        self.assertIn("Created 1 users, skipped 1.", stdout)
+        self.assertIn("racer", stderr)
+        self.assertIn("already exists", stderr)
+        self.assertTrue(User.objects.filter(email="winner@example.com").exists())
+
+
+OUTDATED_HASHER = "django.contrib.auth.hashers.UnsaltedMD5PasswordHasher"
+
+
+class HashingPoolTestCase(TransactionTestCase):
+    def setUp(self):
+        # Forked workers see the test settings, unlike forkserver ones.
+        self.pool = HashingPool(workers=1, max_pending=1, timeout=0.1, start_method="fork")
+        self.addCleanup(self.pool.shutdown)
+        patcher = mock.patch("users.hashing.get_pool", return_value=self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fill(self):
+        return [self.pool.submit(time.sleep, 0.5) for _ in range(2)]
+
+    def outdated_user(self):
+        user = make_user("outdated")
+        User.objects.filter(pk=user.pk).update(password=make_password("password", hasher="unsalted_md5"))
+        user.refresh_from_db()
+        return user
+
+    def wait_for_upgrades(self):
+        for thread in threading.enumerate():
+            if thread.name == "password-upgrade":
+                thread.join(5)
+
+    def test_passwords_are_hashed_on_worker_processes(self):
+        self.assertNotEqual(self.pool.run(os.getpid), os.getpid())
+        encoded = hashing.make_password("secret")
+        self.assertEqual(hashing.check_password("secret", encoded), (True, False))
+        self.assertEqual(hashing.check_password("wrong", encoded), (False, False))
+
+    def test_callers_are_turned_away_once_every_slot_is_taken(self):
+        running = self.fill()
+        with self.assertRaises(HashingPoolBusy):
+            hashing.make_password("secret")
+        for future in running:
+            future.result()
+        self.assertTrue(hashing.make_password("secret"))
+
+    def test_a_killed_worker_is_replaced(self):
+        pid = self.pool.run(os.getpid)
+        os.kill(pid, signal.SIGKILL)
+        encoded = hashing.make_password("secret")
+        self.assertEqual(hashing.check_password("secret", encoded), (True, False))
+        self.assertNotEqual(self.pool.run(os.getpid), pid)
+
+    @override_settings(PASSWORD_HASHERS=[*settings.PASSWORD_HASHERS, OUTDATED_HASHER])
+    def test_outdated_hash_is_upgraded_in_the_background(self):
+        user = self.outdated_user()
+        self.assertTrue(user.check_password("password"))
+        self.wait_for_upgrades()
+        upgraded = User.objects.get(pk=user.pk)
+        self.assertTrue(upgraded.password.startswith("md5$"))
+        self.assertTrue(upgraded.check_password("password"))
+
+    @override_settings(PASSWORD_HASHERS=[*settings.PASSWORD_HASHERS, OUTDATED_HASHER])
+    def test_upgrade_is_skipped_while_the_pool_is_busy(self):
+        user = self.outdated_user()
+        running = self.fill()
+        hashing.upgrade_password(user.pk, "password", user.password)
+        for future in running:
+            future.result()
+        self.wait_for_upgrades()
+        self.assertEqual(User.objects.get(pk=user.pk).password, user.password)
+
+
+class UserSessionTestCase(TestCase):
+    def setUp(self):
+        self.user = make_user("session")
+
+    def test_revoke_keeps_the_row_until_it_is_purged(self):
+        session = UserSession.objects.create(user=self.user)
+        session.revoke()
+        session.refresh_from_db()
+        self.assertIsNotNone(session.expire_at)
+
+        UserSession.objects.filter(pk=session.pk).update(expire_at=now() - timedelta(days=30))
+        self.assertEqual(UserSession.objects.purge_expired(before=now() - timedelta(days=7)), 1)
+        self.assertFalse(UserSession.objects.filter(pk=session.pk).exists())
+
+    def test_purge_deletes_on_the_write_database(self):
+        UserSession.objects.create(user=self.user, expire_at=now() - timedelta(days=30))
+        with mock.patch.object(router, "db_for_read", return_value="replica_unknown"):
+            self.assertEqual(UserSession.objects.purge_expired_batch(now(), batch_size=10), 1)
+
+    def test_delete_removes_the_row(self):
+        session = UserSession.objects.create(user=self.user)
+        self.assertEqual(session.delete(), (1, {"users.UserSession": 1}))
+        self.assertFalse(UserSession.objects.filter(pk=session.pk).exists())
+
+    def test_revoke_for_users_revokes_active_sessions_only(self):
+        active = UserSession.objects.create(user=self.user)
+        UserSession.objects.create(user=self.user, expire_at=now())
+        self.assertEqual(UserSession.objects.revoke_for_users(self.user), 1)
+        self.assertFalse(UserSession.objects.active().filter(pk=active.pk).exists())
+
+
+PARTITIONING = {"ENABLED": True, "MONTHS_AHEAD": 2, "RETENTION_MONTHS": 3, "DROP_EXPIRED": False}
+
+
+def month_bound(month):
+    lower, upper = month_start(month), month_start(month, 1)
+    return f"FOR VALUES FROM ('{lower:%Y-%m-%d} 00:00:00+00') TO ('{upper:%Y-%m-%d} 00:00:00+00')"
+
+
+class UserSessionPartitionerTestCase(TestCase):
+    """
+    SQL generated against a stand-in PostgreSQL connection; see `UserSessionConversionTestCase` for the real thing.
+    """
+
+    def setUp(self):
+        self.connection = mock.MagicMock(vendor="postgresql", in_atomic_block=False)
+        self.connection.ops.quote_name = lambda name: f'"{name}"'
+        self.cursor = self.connection.cursor.return_value.__enter__.return_value
+        self.cursor.fetchone.return_value = None
+        self.today = datetime(2026, 11, 15, 12, tzinfo=timezone.utc)
+        patchers = [
+            mock.patch("users.partitions.connections", {"default": self.connection}),
+            mock.patch("users.partitions.now", return_value=self.today),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def statements(self, prefix=""):
+        statements = [(" ".join(call.args[0].split()), *call.args[1:]) for call in self.cursor.execute.call_args_list]
+        return [statement for statement in statements if statement[0].startswith(prefix)]
+
+    def attach(self, *partitions):
+        self.cursor.fetchall.return_value = list(partitions)
+
+    def test_month_start_wraps_around_years(self):
+        self.assertEqual(month_start(self.today), datetime(2026, 11, 1, tzinfo=timezone.utc))
+        self.assertEqual(month_start(self.today, 2), datetime(2027, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual(month_start(self.today, -11), datetime(2025, 12, 1, tzinfo=timezone.utc))
+        self.assertEqual(month_start(self.today, -23), datetime(2024, 12, 1, tzinfo=timezone.utc))
+
+    def test_bounds_are_parsed_and_open_bounds_are_none(self):
+        self.assertIsNone(parse_bound(" MINVALUE"))
+        self.assertEqual(parse_bound("'2026-11-01 00:00:00+00'"), datetime(2026, 11, 1, tzinfo=timezone.utc))
+
+    def test_partitions_are_sorted_by_upper_bound_without_the_default(self):
+        self.attach(
+            ("UserSession_p202612", month_bound(datetime(2026, 12, 1))),
+            ("UserSession_default", "DEFAULT"),
+            ("UserSession_legacy", "FOR VALUES FROM (MINVALUE) TO ('2026-12-01 00:00:00+00')"),
+        )
+        self.assertEqual(
+            UserSessionPartitioner().partitions(),
+            [
+                ("UserSession_legacy", None, datetime(2026, 12, 1, tzinfo=timezone.utc)),
+                (
+                    "UserSession_p202612",
+                    datetime(2026, 12, 1, tzinfo=timezone.utc),
+                    datetime(2027, 1, 1, tzinfo=timezone.utc),
+                ),
+            ],
+        )
+
+    def test_create_partitions_skips_covered_months(self):
+        self.attach(
+            ("UserSession_legacy", "FOR VALUES FROM (MINVALUE) TO ('2026-12-01 00:00:00+00')"),
+            ("UserSession_default", "DEFAULT"),
+        )
+        self.assertEqual(
+            UserSessionPartitioner().create_partitions(months_ahead=2), ["UserSession_p202612", "UserSession_p202701"]
+        )
+        self.assertEqual(
+            self.statements("CREATE"),
+            [
+                (
+                    'CREATE TABLE IF NOT EXISTS "UserSession_p202612" PARTITION OF "UserSession" '
+                    "FOR VALUES FROM (%s) TO (%s)",
+                    [datetime(2026, 12, 1, tzinfo=timezone.utc), datetime(2027, 1, 1, tzinfo=timezone.utc)],
+                ),
+                (
+                    'CREATE TABLE IF NOT EXISTS "UserSession_p202701" PARTITION OF "UserSession" '
+                    "FOR VALUES FROM (%s) TO (%s)",
+                    [datetime(2027, 1, 1, tzinfo=timezone.utc), datetime(2027, 2, 1, tzinfo=timezone.utc)],
+                ),
+            ],
+        )
+        self.assertEqual(len(self.statements("SELECT set_config('lock_timeout'")), 2)
+
+    def test_create_partitions_moves_rows_out_of_the_default_partition(self):
+        self.attach(("UserSession_default", "DEFAULT"))
+        self.cursor.fetchone.return_value = (1,)
+        UserSessionPartitioner().create_partitions(months_ahead=0)
+        self.assertEqual(
+            [statement for statement, *_ in self.statements()[2:]],
+            [
+                'SELECT 1 FROM "UserSession_default" WHERE "created" >= %s AND "created" < %s LIMIT 1',
+                'ALTER TABLE "UserSession" DETACH PARTITION "UserSession_default"',
+                'CREATE TABLE IF NOT EXISTS "UserSession_p202611" PARTITION OF "UserSession" '
+                "FOR VALUES FROM (%s) TO (%s)",
+                'INSERT INTO "UserSession" SELECT * FROM "UserSession_default" '
+                'WHERE "created" >= %s AND "created" < %s',
+                'DELETE FROM "UserSession_default" WHERE "created" >= %s AND "created" < %s',
+                'ALTER TABLE "UserSession" ATTACH PARTITION "UserSession_default" DEFAULT',
+            ],
+        )
+
+    def test_expire_partitions_only_takes_whole_months_past_retention(self):
+        self.attach(
+            ("UserSession_legacy", "FOR VALUES FROM (MINVALUE) TO ('2026-08-01 00:00:00+00')"),
+            ("UserSession_p202608", month_bound(datetime(2026, 8, 1))),
+            ("UserSession_default", "DEFAULT"),
+        )
+        partitioner = UserSessionPartitioner()
+        self.assertEqual(partitioner.expire_partitions(retention_months=3), ["UserSession_legacy"])
+        self.assertEqual(
+            partitioner.expire_partitions(retention_months=2, drop=True), ["UserSession_legacy", "UserSession_p202608"]
+        )
+        self.assertEqual(
+            [statement for statement, *_ in self.statements("ALTER") + self.statements("DROP")],
+            [
+                'ALTER TABLE "UserSession" DETACH PARTITION "UserSession_legacy"',
+                'DROP TABLE "UserSession_legacy"',
+                'DROP TABLE "UserSession_p202608"',
+            ],
+        )
+
+    def test_convert_refuses_to_run_inside_a_transaction(self):
+        self.connection.in_atomic_block = True
+        self.cursor.fetchone.return_value = ("r",)
+        with self.assertRaisesMessage(NotSupportedError, "inside a transaction"):
+            UserSessionPartitioner().convert()
+        self.assertEqual(self.statements("CREATE"), [])
+
+    @override_settings(USER_SESSION_PARTITIONING=PARTITIONING)
+    def test_maintain_partitions_leaves_a_regular_table_alone(self):
+        self.cursor.fetchone.return_value = ("r",)
+        self.assertEqual(maintain_partitions(), ([], []))
+        self.assertEqual(self.statements("CREATE"), [])
+
+    @override_settings(USER_SESSION_PARTITIONING=PARTITIONING)
+    def test_maintain_partitions_creates_and_expires_months(self):
+        self.cursor.fetchone.side_effect = [("p",), None, None, None]
+        self.attach(("UserSession_p202607", month_bound(datetime(2026, 7, 1))), ("UserSession_default", "DEFAULT"))
+        created, expired = maintain_partitions()
+        self.assertEqual(created, ["UserSession_p202611", "UserSession_p202612", "UserSession_p202701"])
+        self.assertEqual(expired, ["UserSession_p202607"])
+
+    def test_command_requires_partitioning_to_be_enabled(self):
+        with override_settings(USER_SESSION_PARTITIONING={**PARTITIONING, "ENABLED": False}):
+            with self.assertRaisesMessage(CommandError, "USER_SESSION_PARTITIONING"):
+                call_command("user_session_partitions")
+
+        self.cursor.fetchone.return_value = ("r",)
+        with override_settings(USER_SESSION_PARTITIONING=PARTITIONING):
+            with self.assertRaisesMessage(CommandError, "--convert"):
+                call_command("user_session_partitions")
+
+    @override_settings(USER_SESSION_PARTITIONING=PARTITIONING)
+    def test_command_reports_created_and_expired_partitions(self):
+        self.attach(("UserSession_p202607", month_bound(datetime(2026, 7, 1))))
+        self.cursor.fetchone.side_effect = [("p",)]
+        stdout = StringIO()
+        call_command("user_session_partitions", "--months-ahead", "0", "--drop", stdout=stdout)
+        self.assertEqual(
+            stdout.getvalue().splitlines(),
+            ["Created partition UserSession_p202611.", "Dropped partition UserSession_p202607."],
+        )
+
+
+@skipUnless(connection.vendor == "postgresql", "Partitioning requires PostgreSQL.")
+class UserSessionConversionTestCase(TransactionTestCase):
+    def setUp(self):
+        self.user = make_user("partitioned")
+        self.session = UserSession.objects.create(user=self.user)
+        self.addCleanup(self.restore_table)
+
+    def restore_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {connection.ops.quote_name(UserSession._meta.db_table)} CASCADE")
+        with connection.schema_editor() as editor:
+            editor.create_model(UserSession)
+
+    def test_convert_keeps_rows_and_routes_new_ones_by_month(self):
+        partitioner = UserSessionPartitioner()
+        created = partitioner.convert(months_ahead=1)
+        self.assertTrue(partitioner.is_partitioned())
+        self.assertEqual(len(created), 1)
+        self.assertEqual(UserSession.objects.get(pk=self.session.pk).user, self.user)
+
+        late = UserSession.objects.create(user=self.user)
+        UserSession.objects.filter(pk=late.pk).update(created=month_start(now(), 6))
+        self.assertIn("UserSession_default", [name for name, _ in partitioner.attached()])
+
+        created = partitioner.create_partitions(months_ahead=6)
+        self.assertIn(partitioner.partition_name(month_start(now(), 6)), created)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM "UserSession" WHERE id = %s', [late.pk])
+            self.assertEqual(cursor.fetchone()[0], f'"{partitioner.partition_name(month_start(now(), 6))}"')
+            cursor.execute('SELECT count(*) FROM "UserSession_default"')
+            self.assertEqual(cursor.fetchone()[0], 0)
+{%- if cookiecutter.use_django_rq == "y" %}
+
+
+class PurgeExpiredSessionsJobTestCase(TestCase):
+    def setUp(self):
+        self.queue = Queue("default", connection=fakeredis.FakeStrictRedis())
+        patcher = mock.patch("django_rq.get_queue", return_value=self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = make_user("purge")
+
+    def expired_session(self):
+        return UserSession.objects.create(user=self.user, expire_at=now() - timedelta(days=30))
+
+    def test_job_reschedules_itself_under_a_new_id_every_run(self):
+        first = schedule_purge_expired_sessions()
+        self.assertTrue(first.id.startswith(f"{PURGE_EXPIRED_SESSIONS_JOB_ID_PREFIX}-"))
+        self.assertEqual(schedule_purge_expired_sessions().id, first.id)
+
+        ran = []
+        for _ in range(2):
+            session = self.expired_session()
+            ran += run_scheduled_jobs(self.queue)
+            self.assertFalse(UserSession.objects.filter(pk=session.pk).exists())
+
+        self.assertEqual(len(ran), 2)
+        self.assertEqual(ran[0], first.id)
+        self.assertNotEqual(ran[1], first.id)
+        pending = self.queue.scheduled_job_registry.get_job_ids()
+        self.assertEqual(len(pending), 1)
+        self.assertNotIn(pending[0], ran)
+{%- endif %}